@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import FileResponse
+from typing import Optional
+from ..config import settings
+from ..services.profiling import profile_store, is_authorized
+from ..services.query_stats import slow_query_log
+
+router = APIRouter()
+
+
+def require_profiling_access(x_profile_token: Optional[str] = Header(None)):
+    """Profiles are only reachable when profiling is on and the secret matches"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not is_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_access)])
+def list_profiles():
+    """List captured request profiles, newest first"""
+    return profile_store.list()
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_profiling_access)])
+def download_profile(name: str):
+    """Download a captured profile (.prof is pstats, .collapsed is flamegraph input)"""
+    path = profile_store.path_for(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name, media_type="application/octet-stream")
+
+
+def require_query_stats_access(x_profile_token: Optional[str] = Header(None)):
+    """Slow query capture must be on; the profiling secret guards it when configured"""
+    if not settings.query_stats_enabled:
+        raise HTTPException(status_code=404, detail="Query stats are disabled")
+    if settings.profiling_secret and not is_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/slow-queries", dependencies=[Depends(require_query_stats_access)])
+def list_slow_queries():
+    """Slowest statements seen by this worker, with EXPLAIN output"""
+    return slow_query_log.entries()
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..models.film_stock import FilmStock
+from ..models.gallery import Gallery
 from ..schemas import film_stock as schemas
+from ..services import film_inventory, film_ledger
 
 router = APIRouter()
 
@@ -15,6 +17,31 @@ def get_film_stocks(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
     return film_stocks
 
 
+@router.get("/summary", response_model=schemas.FilmStockSummary)
+def get_film_stock_summary(
+    expiring_within_days: int = Query(30, ge=0, le=3650),
+    db: Session = Depends(get_db)
+):
+    """Inventory totals by format and model, plus expiring and expired stock"""
+    return film_inventory.summary(db, expiring_within_days)
+
+
+@router.get("/usage", response_model=List[schemas.FilmStockUsage])
+def get_film_stock_usage(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    """Rolls shot per film stock, most used first"""
+    return film_ledger.usage_by_stock(db, skip, limit)
+
+
+@router.get("/usage/monthly", response_model=List[schemas.MonthlyUsage])
+def get_monthly_usage(
+    months: int = Query(12, ge=1, le=120),
+    film_stock_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Rolls shot per calendar month (months without rolls are omitted)"""
+    return film_ledger.rolls_per_month(db, months, film_stock_id)
+
+
 @router.get("/{film_stock_id}", response_model=schemas.FilmStock)
 def get_film_stock(film_stock_id: int, db: Session = Depends(get_db)):
     """Get single film stock"""
@@ -24,11 +51,34 @@ def get_film_stock(film_stock_id: int, db: Session = Depends(get_db)):
     return film_stock
 
 
+@router.get("/{film_stock_id}/ledger", response_model=schemas.FilmStockLedger)
+def get_film_stock_ledger(
+    film_stock_id: int,
+    before: Optional[int] = Query(None, description="Event id to page back from"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Ledger events of a film stock, newest first, with the balance after each"""
+    if not db.query(FilmStock.id).filter(FilmStock.id == film_stock_id).first():
+        raise HTTPException(status_code=404, detail="Film stock not found")
+    
+    balance, rolls_shot = film_ledger.balance(db, film_stock_id)
+    return {
+        "film_stock_id": film_stock_id,
+        "balance": balance,
+        "rolls_shot": rolls_shot,
+        "events": film_ledger.history(db, film_stock_id, before, limit)
+    }
+
+
 @router.post("/", response_model=schemas.FilmStock)
 def create_film_stock(film_stock: schemas.FilmStockCreate, db: Session = Depends(get_db)):
     """Create new film stock"""
     db_film_stock = FilmStock(**film_stock.model_dump())
     db.add(db_film_stock)
+    db.flush()
+    film_inventory.record_change(db, None, film_inventory.bucket_of(db_film_stock))
+    film_ledger.append(db, db_film_stock.id, "opening", db_film_stock.quantity or 0)
     db.commit()
     db.refresh(db_film_stock)
     return db_film_stock
@@ -41,12 +91,19 @@ def update_film_stock(
     db: Session = Depends(get_db)
 ):
     """Update film stock"""
-    db_film_stock = db.query(FilmStock).filter(FilmStock.id == film_stock_id).first()
+    # Locked so concurrent edits move the summary from the state they saw
+    db_film_stock = db.query(FilmStock).filter(FilmStock.id == film_stock_id).with_for_update().first()
     if not db_film_stock:
         raise HTTPException(status_code=404, detail="Film stock not found")
     
+    old = film_inventory.bucket_of(db_film_stock)
     for key, value in film_stock.model_dump(exclude_unset=True).items():
         setattr(db_film_stock, key, value)
+    new = film_inventory.bucket_of(db_film_stock)
+    film_inventory.record_change(db, old, new)
+    if new[3] != old[3]:
+        # Hand edits (restocking, a lost roll) go on the ledger too
+        film_ledger.append(db, film_stock_id, "restock" if new[3] > old[3] else "adjust", new[3] - old[3])
     
     db.commit()
     db.refresh(db_film_stock)
@@ -56,10 +113,15 @@ def update_film_stock(
 @router.delete("/{film_stock_id}")
 def delete_film_stock(film_stock_id: int, db: Session = Depends(get_db)):
     """Delete film stock"""
-    db_film_stock = db.query(FilmStock).filter(FilmStock.id == film_stock_id).first()
+    db_film_stock = db.query(FilmStock).filter(FilmStock.id == film_stock_id).with_for_update().first()
     if not db_film_stock:
         raise HTTPException(status_code=404, detail="Film stock not found")
     
+    film_inventory.record_change(db, film_inventory.bucket_of(db_film_stock), None)
+    # Ledger events stay as history; galleries just lose the reference
+    db.query(Gallery).filter(Gallery.film_stock_id == film_stock_id).update(
+        {Gallery.film_stock_id: None, Gallery.updated_at: Gallery.updated_at}, synchronize_session=False
+    )
     db.delete(db_film_stock)
     db.commit()
     
@@ -1,20 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Header, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+from typing import List, Optional, Tuple, Union
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+import re
+import secrets
+from starlette.concurrency import run_in_threadpool
+from ..database import get_db, SessionLocal
 from ..models.gallery import Gallery
 from ..models.photo import Photo
+from ..models.photo_rendition import PhotoRendition
+from ..models.upload_session import UploadSession
 from ..schemas import gallery as schemas
-from ..schemas.photo import Photo as PhotoSchema
+from ..schemas.photo import Photo as PhotoSchema, PhotoRendition as RenditionSchema, PhotoColumns
+from ..schemas import upload_session as upload_schemas
 from ..services.storage import storage_service
+from ..services.similarity import similarity_index
+from ..services.renditions import attach_renditions
+from ..services.image_proxy import square_url
+from ..services.archive import stream_zip, open_archive
+from ..services import upload_sessions, film_ledger
+from ..services.tiles import tile_service, needs_tiles
+from ..services.decode_scheduler import ImageTooLarge, DecodeBudgetExceeded
+from ..services.contact_sheet import contact_sheet_service, sheet_key
+from ..services.serialization import fields_of, columns_of, to_columns, json_response, JSON_OBJECT
+from ..config import settings
 
 router = APIRouter()
 
+# Columns selected by the photo listing fast path
+PHOTO_FIELDS = fields_of(PhotoSchema, exclude=("renditions", "square_url"))
+RENDITION_FIELDS = fields_of(RenditionSchema)
 
-@router.get("/", response_model=List[schemas.Gallery])
+
+@router.get("/", response_model=List[schemas.GallerySummary])
 def get_galleries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all galleries"""
-    galleries = db.query(Gallery).order_by(Gallery.created_at.desc()).offset(skip).limit(limit).all()
+    # The frame map can be hundreds of entries per gallery and is not listed
+    galleries = db.query(Gallery).options(defer(Gallery.contact_sheet_map)).order_by(
+        Gallery.created_at.desc()
+    ).offset(skip).limit(limit).all()
     return galleries
 
 
@@ -32,6 +61,9 @@ def create_gallery(gallery: schemas.GalleryCreate, db: Session = Depends(get_db)
     """Create new gallery"""
     db_gallery = Gallery(**gallery.model_dump())
     db.add(db_gallery)
+    if db_gallery.film_stock_id is not None:
+        db.flush()
+        _take_roll(db, db_gallery.film_stock_id, db_gallery.id)
     db.commit()
     db.refresh(db_gallery)
     return db_gallery
@@ -40,11 +72,23 @@ def create_gallery(gallery: schemas.GalleryCreate, db: Session = Depends(get_db)
 @router.put("/{gallery_id}", response_model=schemas.Gallery)
 def update_gallery(gallery_id: int, gallery: schemas.GalleryUpdate, db: Session = Depends(get_db)):
     """Update gallery"""
-    db_gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    # Locked so two concurrent edits cannot both move the roll
+    db_gallery = db.query(Gallery).filter(Gallery.id == gallery_id).with_for_update().first()
     if not db_gallery:
         raise HTTPException(status_code=404, detail="Gallery not found")
     
-    for key, value in gallery.model_dump(exclude_unset=True).items():
+    updates = gallery.model_dump(exclude_unset=True)
+    if "film_stock_id" in updates and updates["film_stock_id"] != db_gallery.film_stock_id:
+        # Moving the roll to another stock: take the new one first, as it may be out
+        if updates["film_stock_id"] is not None:
+            _take_roll(db, updates["film_stock_id"], gallery_id)
+        if db_gallery.film_stock_id is not None:
+            try:
+                film_ledger.give_back(db, db_gallery.film_stock_id, gallery_id)
+            except film_ledger.FilmStockNotFound:
+                pass
+    
+    for key, value in updates.items():
         setattr(db_gallery, key, value)
     
     db.commit()
@@ -52,6 +96,15 @@ def update_gallery(gallery_id: int, gallery: schemas.GalleryUpdate, db: Session
     return db_gallery
 
 
+def _take_roll(db: Session, film_stock_id: int, gallery_id: int):
+    try:
+        film_ledger.consume(db, film_stock_id, gallery_id)
+    except film_ledger.FilmStockNotFound:
+        raise HTTPException(status_code=404, detail="Film stock not found")
+    except film_ledger.OutOfStock:
+        raise HTTPException(status_code=409, detail="Film stock is out of stock")
+
+
 @router.delete("/{gallery_id}")
 def delete_gallery(gallery_id: int, db: Session = Depends(get_db)):
     """Delete gallery and all its photos"""
@@ -66,31 +119,170 @@ def delete_gallery(gallery_id: int, db: Session = Depends(get_db)):
     if photos:
         storage_keys = [photo.storage_key for photo in photos if photo.storage_key]
         if storage_keys:
-            storage_service.delete_batch(storage_keys)
+            rendition_keys = [key for (key,) in db.query(PhotoRendition.storage_key).filter(
+                PhotoRendition.photo_id.in_([photo.id for photo in photos])
+            )]
+            storage_service.delete_batch(storage_keys, rendition_keys)
+        for photo in photos:
+            if photo.tile_manifest_url:
+                storage_service.delete_prefix(storage_service.tile_prefix(photo.storage_key))
+    if db_gallery.contact_sheet_url:
+        storage_service.delete_batch([sheet_key(gallery_id)])
     
     # Delete from database
+    photo_ids = [photo.id for photo in photos]
+    if photo_ids:
+        db.query(PhotoRendition).filter(
+            PhotoRendition.photo_id.in_(photo_ids)
+        ).delete(synchronize_session=False)
     db.query(Photo).filter(Photo.gallery_id == gallery_id).delete()
     db.delete(db_gallery)
     db.commit()
+    similarity_index.remove(photo_ids)
     
     return {"message": "Gallery deleted successfully"}
 
 
 # Photo endpoints
-@router.get("/{gallery_id}/photos", response_model=List[PhotoSchema])
-def get_gallery_photos(gallery_id: int, db: Session = Depends(get_db)):
+# Documents both shapes; the handler serializes itself, so nothing is validated against this
+@router.get("/{gallery_id}/photos", response_model=Union[List[PhotoSchema], PhotoColumns])
+def get_gallery_photos(
+    request: Request,
+    gallery_id: int,
+    sort: str = Query("display_order", pattern="^(display_order|taken_at|camera)$"),
+    camera: Optional[str] = Query(None, description="Only photos from this camera/scanner model"),
+    response_format: str = Query(
+        "objects",
+        alias="format",
+        pattern="^(objects|columnar)$",
+        description="columnar: one array per field instead of one object per photo"
+    ),
+    db: Session = Depends(get_db)
+):
     """Get all photos in a gallery"""
+    if not db.query(Gallery.id).filter(Gallery.id == gallery_id).first():
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    conditions = [Photo.gallery_id == gallery_id]
+    if camera:
+        conditions.append(Photo.camera_model == camera)
+    
+    # Photos without EXIF dates go last
+    if sort == "taken_at":
+        order = [Photo.taken_at.is_(None), Photo.taken_at, Photo.display_order]
+    elif sort == "camera":
+        order = [Photo.camera_model.is_(None), Photo.camera_model, Photo.taken_at, Photo.display_order]
+    else:
+        order = [Photo.display_order]
+    
+    # Plain rows of just the response columns; this listing can be thousands of photos.
+    # storage_key rides along last (zip() with PHOTO_FIELDS drops it) for square_url
+    rows = db.execute(
+        select(*columns_of(Photo, PHOTO_FIELDS), Photo.storage_key).where(*conditions).order_by(*order)
+    ).all()
+    square_urls = [square_url(row[-1]) for row in rows]
+    id_index = PHOTO_FIELDS.index("id")
+    renditions = {row[id_index]: [] for row in rows}
+    if rows:
+        for photo_id, *rendition in db.execute(
+            select(PhotoRendition.photo_id, *columns_of(PhotoRendition, RENDITION_FIELDS))
+            .join(Photo, Photo.id == PhotoRendition.photo_id)
+            .where(*conditions)
+            .order_by(PhotoRendition.width)
+        ):
+            renditions[photo_id].append(rendition)
+    
+    if response_format == "columnar":
+        return json_response(request, {
+            "count": len(rows),
+            "fields": PHOTO_FIELDS + ["square_url"],
+            "columns": {**to_columns(PHOTO_FIELDS, rows), "square_url": square_urls},
+            # Per photo, a list of [size, format, width, height, url] (see rendition_fields)
+            "rendition_fields": RENDITION_FIELDS,
+            "renditions": [renditions[row[id_index]] for row in rows]
+        }, JSON_OBJECT)
+    
+    return json_response(request, [
+        {
+            **dict(zip(PHOTO_FIELDS, row)),
+            "renditions": [dict(zip(RENDITION_FIELDS, rendition)) for rendition in renditions[row[id_index]]],
+            "square_url": square
+        }
+        for row, square in zip(rows, square_urls)
+    ])
+
+
+@router.get("/{gallery_id}/export.zip")
+def export_gallery(
+    gallery_id: int,
+    size: Optional[int] = Query(None, description="Export this rendition size instead of originals"),
+    db: Session = Depends(get_db)
+):
+    """Download a whole roll as a ZIP, streamed while it is being built"""
     gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
     if not gallery:
         raise HTTPException(status_code=404, detail="Gallery not found")
+    if size is not None and size not in settings.rendition_sizes:
+        raise HTTPException(status_code=400, detail=f"Size must be one of {settings.rendition_sizes}")
+    
+    photos = db.query(Photo).filter(
+        Photo.gallery_id == gallery_id,
+        Photo.storage_key.isnot(None)
+    ).order_by(Photo.display_order).all()
+    
+    rendition_keys = {}
+    if size is not None and photos:
+        rendition_keys = dict(db.query(PhotoRendition.photo_id, PhotoRendition.storage_key).filter(
+            PhotoRendition.photo_id.in_([photo.id for photo in photos]),
+            PhotoRendition.size == size,
+            PhotoRendition.format == "jpeg"
+        ).all())
+    
+    slug = re.sub(r"[^\w-]+", "_", gallery.name).strip("_") or f"gallery_{gallery_id}"
+    entries = []
+    for frame, photo in enumerate(photos, start=1):
+        # Photos predating this rendition size fall back to the original
+        key = rendition_keys.get(photo.id, photo.storage_key)
+        ext = key.rsplit(".", 1)[-1] if "." in key else "jpg"
+        entries.append((f"{slug}/{frame:03d}.{ext}", key, photo.uploaded_at))
     
-    photos = db.query(Photo).filter(Photo.gallery_id == gallery_id).order_by(Photo.display_order).all()
-    return photos
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{slug}.zip"'}
+    )
+
+
+@router.get("/{gallery_id}/duplicates", response_model=List[List[PhotoSchema]])
+def get_gallery_duplicates(
+    gallery_id: int,
+    max_distance: int = Query(6, ge=0, le=32),
+    db: Session = Depends(get_db)
+):
+    """Find groups of near-identical frames (e.g. re-scans) within a gallery"""
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    hashes = dict(db.query(Photo.id, Photo.phash).filter(
+        Photo.gallery_id == gallery_id,
+        Photo.phash.isnot(None)
+    ).all())
+    groups = similarity_index.duplicate_groups(db, hashes, max_distance)
+    if not groups:
+        return []
+    
+    photo_ids = [photo_id for group in groups for photo_id in group]
+    photos = {photo.id: photo for photo in attach_renditions(
+        db, db.query(Photo).filter(Photo.id.in_(photo_ids)).all()
+    )}
+    return [[photos[photo_id] for photo_id in group] for group in groups]
 
 
 @router.post("/{gallery_id}/photos", response_model=PhotoSchema)
 async def upload_photo(
     gallery_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
@@ -109,39 +301,217 @@ async def upload_photo(
     
     # Upload to S3
     try:
-        original_url, thumbnail_url, storage_key = await storage_service.upload_image(
-            file_data, storage_path
+        uploaded = await storage_service.upload_image(
+            file_data, storage_path, rendition_sizes=settings.rendition_sizes
         )
+    except (ImageTooLarge, DecodeBudgetExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
     
     # Get next display order
     max_order = db.query(Photo).filter(Photo.gallery_id == gallery_id).count()
     
-    # Create photo record
+    db_photo = _save_photo(db, gallery, uploaded, len(file_data), max_order)
+    if needs_tiles(db_photo.width, db_photo.height):
+        background_tasks.add_task(tile_service.generate_for_photo, db_photo.id, file_data)
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
+    return attach_renditions(db, [db_photo])[0]
+
+
+def _save_photo(db: Session, gallery: Gallery, uploaded, file_size: int, display_order: int) -> Photo:
+    """Record an uploaded photo with its renditions and update the gallery"""
     db_photo = Photo(
-        gallery_id=gallery_id,
-        original_url=original_url,
-        thumbnail_url=thumbnail_url,
-        storage_key=storage_key,
-        file_size=len(file_data),
-        display_order=max_order
+        gallery_id=gallery.id,
+        original_url=uploaded.original_url,
+        thumbnail_url=uploaded.thumbnail_url,
+        storage_key=uploaded.storage_key,
+        file_size=file_size,
+        display_order=display_order,
+        **uploaded.image_info,
+        **uploaded.image_metadata
     )
     db.add(db_photo)
+    db.flush()
+    
+    renditions = [PhotoRendition(photo_id=db_photo.id, **r) for r in uploaded.renditions]
+    db.add_all(renditions)
     
     # Update gallery photo count and cover image
     gallery.photo_count = gallery.photo_count + 1
     if not gallery.cover_image_url:
-        gallery.cover_image_url = thumbnail_url
+        gallery.cover_image_url = uploaded.thumbnail_url
     
     db.commit()
     db.refresh(db_photo)
+    similarity_index.add(db_photo.id, db_photo.phash)
     
     return db_photo
 
 
+def _save_imported_photo(gallery_id: int, uploaded, file_size: int, display_order: int) -> Tuple[int, Optional[int], Optional[int]]:
+    """
+    Record one imported entry in its own session (imports save several photos
+    at once from the threadpool). The gallery row is locked so concurrent saves
+    do not lose photo_count increments.
+    Returns: (photo_id, width, height)
+    """
+    db = SessionLocal()
+    try:
+        gallery = db.query(Gallery).filter(Gallery.id == gallery_id).with_for_update().one()
+        db_photo = _save_photo(db, gallery, uploaded, file_size, display_order)
+        return db_photo.id, db_photo.width, db_photo.height
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _order_imported(photos: List[Tuple[str, int]], base_order: int):
+    """Give photos imported in stream order (tars) their lexical filename order"""
+    db = SessionLocal()
+    try:
+        db.bulk_update_mappings(Photo, [
+            {"id": photo_id, "display_order": base_order + index}
+            for index, (_, photo_id) in enumerate(sorted(photos))
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _import_progress(archive, gallery_id: int, base_order: int, background_tasks: BackgroundTasks):
+    """
+    Ingest entries with bounded parallelism as they are read off the archive,
+    yielding an NDJSON line as each one finishes
+    """
+    semaphore = asyncio.Semaphore(settings.import_concurrency)
+    finished: asyncio.Queue = asyncio.Queue()
+    tasks = []
+    imported: List[Tuple[str, int]] = []
+    
+    async def ingest(result: dict, data: bytes, display_order: int):
+        try:
+            filename = storage_service.generate_unique_filename(result["name"].rsplit("/", 1)[-1])
+            while True:
+                try:
+                    uploaded = await storage_service.upload_image(
+                        data, f"galleries/{gallery_id}/{filename}", rendition_sizes=settings.rendition_sizes
+                    )
+                    break
+                except DecodeBudgetExceeded as e:
+                    # Back-pressure from other decodes, not a bad entry: wait for room
+                    await asyncio.sleep(e.retry_after)
+            photo_id, width, height = await run_in_threadpool(
+                _save_imported_photo, gallery_id, uploaded, len(data), display_order
+            )
+            result.update(status="imported", photo_id=photo_id)
+            imported.append((result["name"], photo_id))
+            if needs_tiles(width, height):
+                # Re-read from S3 later rather than keeping every entry in memory
+                background_tasks.add_task(tile_service.generate_for_photo, photo_id)
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+        finally:
+            semaphore.release()
+            finished.put_nowait(result)
+    
+    async def read_entries():
+        index = 0
+        try:
+            while True:
+                # At most import_concurrency entries are held in memory at once
+                await semaphore.acquire()
+                entry = await run_in_threadpool(archive.next_entry)
+                if entry is None:
+                    semaphore.release()
+                    return
+                
+                result = {"name": entry.name, "size": entry.size}
+                if entry.data is None:
+                    semaphore.release()
+                    result.update(status="failed", error=entry.error)
+                    finished.put_nowait(result)
+                else:
+                    tasks.append(asyncio.create_task(ingest(result, entry.data, base_order + index)))
+                index += 1
+        finally:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            finished.put_nowait(None)
+    
+    counts = {"imported": 0, "failed": 0}
+    reader = asyncio.create_task(read_entries())
+    try:
+        while True:
+            result = await finished.get()
+            if result is None:
+                break
+            counts[result["status"]] += 1
+            yield json.dumps(result) + "\n"
+        
+        summary = {**counts, "skipped": len(archive.skipped), "done": True}
+        try:
+            await reader
+        except ValueError as e:
+            # A corrupt tar stream ends the import at that point
+            summary["error"] = str(e)
+        if imported and not archive.sorted:
+            await run_in_threadpool(_order_imported, imported, base_order)
+        
+        for name, reason in archive.skipped:
+            yield json.dumps({"name": name, "status": "skipped", "error": reason}) + "\n"
+        yield json.dumps(summary) + "\n"
+    finally:
+        # A client that disconnects stops further entries; ones in flight still finish
+        reader.cancel()
+        await asyncio.gather(reader, *tasks, return_exceptions=True)
+        await run_in_threadpool(archive.close)
+
+
+@router.post("/{gallery_id}/import")
+async def import_archive(
+    gallery_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a lab's ZIP/tar of scans into a gallery. Entries are read one at a
+    time from the (disk-spooled) upload and ingested with bounded parallelism
+    as they are read; lexical filename order becomes display order.
+    
+    Progress is streamed as NDJSON: one line per entry as it finishes
+    ({name, size, status, photo_id | error}), then one line per skipped
+    entry, then a summary ({imported, failed, skipped, done: true}, plus
+    error when a corrupt tar stream cut the import short).
+    """
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    try:
+        # Reads the ZIP central directory or the first tar header
+        archive = await run_in_threadpool(open_archive, file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    base_order = db.query(Photo).filter(Photo.gallery_id == gallery_id).count()
+    # One rebuild for the whole roll, after every entry is in
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
+    return StreamingResponse(
+        _import_progress(archive, gallery_id, base_order, background_tasks),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.delete("/{gallery_id}/photos/{photo_id}")
-def delete_photo(gallery_id: int, photo_id: int, db: Session = Depends(get_db)):
+def delete_photo(
+    gallery_id: int,
+    photo_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Delete a photo"""
     photo = db.query(Photo).filter(
         Photo.id == photo_id,
@@ -153,9 +523,15 @@ def delete_photo(gallery_id: int, photo_id: int, db: Session = Depends(get_db)):
     
     # Delete from S3
     if photo.storage_key:
-        storage_service.delete(photo.storage_key)
+        rendition_keys = [key for (key,) in db.query(PhotoRendition.storage_key).filter(
+            PhotoRendition.photo_id == photo.id
+        )]
+        storage_service.delete(photo.storage_key, rendition_keys)
+        if photo.tile_manifest_url:
+            storage_service.delete_prefix(storage_service.tile_prefix(photo.storage_key))
     
     # Delete from database
+    db.query(PhotoRendition).filter(PhotoRendition.photo_id == photo.id).delete()
     db.delete(photo)
     
     # Update gallery photo count
@@ -169,10 +545,49 @@ def delete_photo(gallery_id: int, photo_id: int, db: Session = Depends(get_db)):
             gallery.cover_image_url = remaining_photo.thumbnail_url if remaining_photo else None
     
     db.commit()
+    similarity_index.remove([photo_id])
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
     
     return {"message": "Photo deleted successfully"}
 
 
+@router.put("/{gallery_id}/photos/order")
+def reorder_photos(
+    gallery_id: int,
+    order: schemas.PhotoOrder,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Set display order from a complete list of the gallery's photo IDs"""
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    photo_ids = {photo_id for (photo_id,) in db.query(Photo.id).filter(Photo.gallery_id == gallery_id)}
+    if set(order.photo_ids) != photo_ids or len(order.photo_ids) != len(photo_ids):
+        raise HTTPException(status_code=400, detail="photo_ids must list every photo in the gallery exactly once")
+    
+    db.bulk_update_mappings(Photo, [
+        {"id": photo_id, "display_order": index}
+        for index, photo_id in enumerate(order.photo_ids)
+    ])
+    db.commit()
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
+    
+    return {"message": "Photo order updated successfully"}
+
+
+@router.post("/{gallery_id}/contact-sheet", status_code=202)
+def rebuild_contact_sheet(gallery_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Regenerate the gallery's contact sheet in the background"""
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
+    return {"message": "Contact sheet rebuild scheduled"}
+
+
 @router.put("/{gallery_id}/cover/{photo_id}")
 def set_cover_photo(gallery_id: int, photo_id: int, db: Session = Depends(get_db)):
     """Set a photo as the gallery cover"""
@@ -194,3 +609,195 @@ def set_cover_photo(gallery_id: int, photo_id: int, db: Session = Depends(get_db
     
     return {"message": "Cover photo updated successfully", "cover_image_url": gallery.cover_image_url}
 
+
+
+# Resumable uploads: create a session, PATCH chunks at the current offset
+# (HEAD reports it after a dropped connection), then complete
+def _get_upload_session(db: Session, gallery_id: int, upload_id: str, lock: bool = False) -> UploadSession:
+    """With lock, the row stays locked until the caller commits or rolls back"""
+    query = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.gallery_id == gallery_id
+    )
+    if lock:
+        query = query.with_for_update()
+    upload = query.first()
+    if not upload or upload.expires_at < datetime.utcnow():
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return upload
+
+
+def _reject_upload(db: Session, upload: UploadSession, detail: str):
+    """409 with the current offset, releasing the row lock first"""
+    headers = _offset_headers(upload)
+    db.rollback()
+    raise HTTPException(status_code=409, detail=detail, headers=headers)
+
+
+def _offset_headers(upload: UploadSession) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.total_size),
+        "Upload-Expires": upload.expires_at.isoformat(),
+        "Cache-Control": "no-store"
+    }
+
+
+@router.post("/{gallery_id}/uploads", response_model=upload_schemas.UploadSession)
+def create_upload_session(
+    gallery_id: int,
+    body: upload_schemas.UploadSessionCreate,
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload for a large scan"""
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    if body.size > settings.max_resumable_upload_size:
+        raise HTTPException(status_code=413, detail="File is too large")
+    
+    upload_sessions.cleanup_expired(db)
+    
+    upload = UploadSession(
+        id=secrets.token_hex(16),
+        gallery_id=gallery_id,
+        filename=body.filename,
+        total_size=body.size,
+        offset=0,
+        expires_at=datetime.utcnow() + timedelta(hours=settings.upload_session_ttl_hours)
+    )
+    os.makedirs(settings.upload_tmp_dir, exist_ok=True)
+    open(upload_sessions.part_path(upload.id), "wb").close()
+    
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return upload
+
+
+@router.head("/{gallery_id}/uploads/{upload_id}")
+def get_upload_offset(gallery_id: int, upload_id: str, db: Session = Depends(get_db)):
+    """Report how many bytes the server has, so the client knows where to resume"""
+    upload = _get_upload_session(db, gallery_id, upload_id)
+    return Response(headers=_offset_headers(upload))
+
+
+def _advance_upload(db: Session, upload_id: str, expected: int, written: int, chunk_path: str) -> bool:
+    """
+    Move the offset from `expected` past a received chunk, compare-and-set style,
+    and append the chunk to the part file. The row is only locked for the local
+    copy, never while a client is sending. False when another request got there first.
+    """
+    updated = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.offset == expected,
+        UploadSession.status == "uploading"
+    ).update({
+        UploadSession.offset: expected + written,
+        UploadSession.expires_at: datetime.utcnow() + timedelta(hours=settings.upload_session_ttl_hours)
+    }, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        return False
+    try:
+        upload_sessions.append_chunk(upload_id, chunk_path, expected)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return True
+
+
+@router.patch("/{gallery_id}/uploads/{upload_id}")
+async def upload_chunk(
+    gallery_id: int,
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    db: Session = Depends(get_db)
+):
+    """Append a chunk; Upload-Offset must match the server's current offset"""
+    upload = await run_in_threadpool(_get_upload_session, db, gallery_id, upload_id)
+    if upload.status != "uploading":
+        _reject_upload(db, upload, "Upload is being completed")
+    if upload_offset != upload.offset:
+        _reject_upload(db, upload, "Offset mismatch")
+    total_size = upload.total_size
+    # Nothing is held in the database while the chunk streams in
+    await run_in_threadpool(db.rollback)
+    
+    # Each request streams into its own file, so racing PATCHes cannot clobber each other
+    chunk_path = upload_sessions.chunk_path(upload_id)
+    written = 0
+    try:
+        f = await run_in_threadpool(open, chunk_path, "wb")
+        try:
+            async for chunk in request.stream():
+                if upload_offset + written + len(chunk) > total_size:
+                    raise HTTPException(status_code=413, detail="Chunk exceeds declared upload size")
+                await run_in_threadpool(f.write, chunk)
+                written += len(chunk)
+        finally:
+            await run_in_threadpool(f.close)
+            # Keep whatever arrived intact before a disconnect
+            if written and not await run_in_threadpool(
+                _advance_upload, db, upload_id, upload_offset, written, chunk_path
+            ):
+                raise HTTPException(status_code=409, detail="Offset mismatch")
+    finally:
+        await run_in_threadpool(upload_sessions.remove_chunk, chunk_path)
+    
+    upload = await run_in_threadpool(_get_upload_session, db, gallery_id, upload_id)
+    headers = _offset_headers(upload)
+    await run_in_threadpool(db.rollback)
+    return Response(status_code=204, headers=headers)
+
+
+@router.post("/{gallery_id}/uploads/{upload_id}/complete", response_model=PhotoSchema)
+async def complete_upload(
+    gallery_id: int,
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Process the assembled file like a normal upload and create the photo"""
+    gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+    if not gallery:
+        raise HTTPException(status_code=404, detail="Gallery not found")
+    
+    # Claim the session under its row lock so only one complete call creates a photo
+    upload = await run_in_threadpool(_get_upload_session, db, gallery_id, upload_id, True)
+    if upload.status != "uploading":
+        _reject_upload(db, upload, "Upload is already being completed")
+    if upload.offset != upload.total_size:
+        _reject_upload(db, upload, "Upload is incomplete")
+    upload.status = "completing"
+    await run_in_threadpool(db.commit)
+    
+    filename = storage_service.generate_unique_filename(upload.filename)
+    storage_path = f"galleries/{gallery_id}/{filename}"
+    
+    try:
+        uploaded = await storage_service.upload_image(
+            upload_sessions.part_path(upload.id), storage_path, rendition_sizes=settings.rendition_sizes
+        )
+        max_order = db.query(Photo).filter(Photo.gallery_id == gallery_id).count()
+        # The session row goes in the same commit as the photo
+        db.delete(upload)
+        db_photo = _save_photo(db, gallery, uploaded, upload.total_size, max_order)
+    except Exception as e:
+        # Hand the session back, with its file, so complete can be retried
+        db.rollback()
+        upload.status = "uploading"
+        db.commit()
+        if isinstance(e, (ImageTooLarge, DecodeBudgetExceeded)):
+            raise
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    upload_sessions.remove_part(upload_id)
+    if needs_tiles(db_photo.width, db_photo.height):
+        # The temp file is gone by now, so the task downloads the original
+        background_tasks.add_task(tile_service.generate_for_photo, db_photo.id)
+    background_tasks.add_task(contact_sheet_service.schedule, gallery_id)
+    return attach_renditions(db, [db_photo])[0]
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from ..config import settings
+from ..services.storage import DERIVATIVE_FORMATS, storage_service
+from ..services.image_proxy import image_proxy, verify, FIT_MODES, ImageNotFound
+
+router = APIRouter()
+
+
+@router.get("/{storage_key:path}")
+async def get_resized_image(
+    storage_key: str,
+    w: Optional[int] = Query(None, ge=1),
+    h: Optional[int] = Query(None, ge=1),
+    fit: str = Query("contain"),
+    fmt: str = Query("jpeg"),
+    sig: Optional[str] = Query(None)
+):
+    """
+    Resize a stored image on demand. URLs are minted server-side with
+    services.image_proxy.signed_url (photo payloads carry them as square_url),
+    so arbitrary sizes cannot be requested by others.
+    """
+    if not settings.image_proxy_secret:
+        raise HTTPException(status_code=404, detail="Image proxy is disabled")
+    if not verify(sig, storage_key, w, h, fit, fmt):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+    if fit not in FIT_MODES:
+        raise HTTPException(status_code=400, detail=f"fit must be one of: {', '.join(FIT_MODES)}")
+    if fmt not in storage_service.formats:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of: {', '.join(storage_service.formats)}")
+    if max(w or 0, h or 0) > settings.image_proxy_max_dimension:
+        raise HTTPException(status_code=400, detail="Requested size is too large")
+    
+    try:
+        path = await image_proxy.get(storage_key, w, h, fit, fmt)
+    except ImageNotFound:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # Originals never change under a key, so neither does any variant of them
+    return FileResponse(
+        path,
+        media_type=DERIVATIVE_FORMATS[fmt][1],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import get_db
+from ..models.photo import Photo
+from ..schemas.photo import SimilarPhoto
+from ..services.similarity import similarity_index
+from ..services.tiles import tile_service
+from ..services.renditions import attach_renditions
+
+router = APIRouter()
+
+
+@router.get("/{photo_id}/similar", response_model=List[SimilarPhoto])
+def get_similar_photos(
+    photo_id: int,
+    max_distance: int = Query(10, ge=0, le=32),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Find visually similar photos across all galleries"""
+    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    if not photo.phash:
+        raise HTTPException(status_code=400, detail="Photo has no perceptual hash yet")
+    
+    matches = similarity_index.similar(db, photo.id, photo.phash, max_distance, limit)
+    if not matches:
+        return []
+    
+    photos = {p.id: p for p in attach_renditions(
+        db, db.query(Photo).filter(Photo.id.in_([pid for _, pid in matches])).all()
+    )}
+    return [
+        {"distance": distance, "photo": photos[pid]}
+        for distance, pid in matches if pid in photos
+    ]
+
+
+@router.get("/{photo_id}/tiles")
+def get_photo_tiles(photo_id: int, db: Session = Depends(get_db)):
+    """Deep-zoom tile source for a large scan (an OpenSeadragon inline DZI)"""
+    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    if not photo.tile_manifest_url:
+        raise HTTPException(status_code=404, detail="Photo has no tiles")
+    
+    try:
+        return tile_service.tile_source(photo.storage_key)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to read tile manifest: {str(e)}")
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..database import get_db
+from ..schemas.search import SearchResults
+from ..services.search import search, RESULT_TYPES
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResults)
+def search_everything(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = Query(None, description="Comma-separated result types"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Ranked search across galleries, trips, trip image captions and film stocks"""
+    types = None
+    if type:
+        types = [t.strip() for t in type.split(",") if t.strip()]
+        unknown = set(types) - set(RESULT_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown type(s): {', '.join(sorted(unknown))}")
+    
+    return search(db, q, types, limit, offset)
@@ -1,28 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from ..database import get_db
 from ..models.trip import Trip
 from ..models.trip_image import TripImage
 from ..schemas import trip as schemas
 from ..services.storage import storage_service
 from ..services.weather import weather_service
+from ..services.weather_prefetch import upcoming_trips, weather_for_trips, forecast_date
+from ..services.decode_scheduler import ImageTooLarge, DecodeBudgetExceeded
+from ..services.serialization import fields_of, columns_of, json_response
 
 router = APIRouter()
 
+# Columns selected by the trip listing fast path
+TRIP_FIELDS = fields_of(schemas.Trip, exclude=("images",))
+IMAGE_FIELDS = fields_of(schemas.TripImage)
+
 
 @router.get("/", response_model=List[schemas.Trip])
-def get_trips(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_trips(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all trips"""
-    trips = db.query(Trip).order_by(Trip.created_at.desc()).offset(skip).limit(limit).all()
+    trips = [
+        dict(zip(TRIP_FIELDS, row))
+        for row in db.execute(
+            select(*columns_of(Trip, TRIP_FIELDS)).order_by(Trip.created_at.desc()).offset(skip).limit(limit)
+        )
+    ]
+    
+    # Load images for all trips in one query
+    images_by_trip = {trip["id"]: [] for trip in trips}
+    if trips:
+        for row in db.execute(
+            select(*columns_of(TripImage, IMAGE_FIELDS))
+            .where(TripImage.trip_id.in_(images_by_trip.keys()))
+            .order_by(TripImage.display_order)
+        ):
+            image = dict(zip(IMAGE_FIELDS, row))
+            images_by_trip[image["trip_id"]].append(image)
     
-    # Load images for each trip
     for trip in trips:
-        trip.images = db.query(TripImage).filter(
-            TripImage.trip_id == trip.id
-        ).order_by(TripImage.display_order).all()
+        trip["images"] = images_by_trip[trip["id"]]
     
-    return trips
+    return json_response(request, trips)
+
+
+@router.get("/weather", response_model=Dict[int, Optional[dict]])
+def get_trips_weather(
+    upcoming: bool = Query(True, description="Only trips under way or starting within the forecast window"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Weather and photography times for many trips at once, keyed by trip id"""
+    if upcoming:
+        trips = upcoming_trips(db, limit=limit)
+    else:
+        trips = db.query(Trip).filter(Trip.destination.isnot(None)).order_by(
+            Trip.created_at.desc()
+        ).limit(limit).all()
+    return weather_for_trips(trips)
 
 
 @router.get("/{trip_id}", response_model=schemas.Trip)
@@ -119,9 +156,9 @@ async def upload_trip_image(
     
     # Upload to S3
     try:
-        original_url, thumbnail_url, storage_key = await storage_service.upload_image(
-            file_data, storage_path
-        )
+        uploaded = await storage_service.upload_image(file_data, storage_path)
+    except (ImageTooLarge, DecodeBudgetExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
     
@@ -131,12 +168,13 @@ async def upload_trip_image(
     # Create image record
     db_image = TripImage(
         trip_id=trip_id,
-        image_url=original_url,
-        thumbnail_url=thumbnail_url,
-        storage_key=storage_key,
+        image_url=uploaded.original_url,
+        thumbnail_url=uploaded.thumbnail_url,
+        storage_key=uploaded.storage_key,
         file_size=len(file_data),
         caption=caption,
-        display_order=max_order
+        display_order=max_order,
+        **uploaded.image_info
     )
     db.add(db_image)
     db.commit()
@@ -182,9 +220,9 @@ def get_trip_weather(
     if not trip.destination:
         raise HTTPException(status_code=400, detail="Trip has no destination set")
     
-    # Use trip start date if no date specified
-    if not date and trip.start_date:
-        date = trip.start_date.isoformat()
+    # Same day as the warmer and the batch endpoint, so all three share cache entries
+    if not date:
+        date = forecast_date(trip)
     
     # Get weather and sun times
     info = weather_service.get_complete_info(trip.destination, date)
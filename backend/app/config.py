@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, List
 
 
 class Settings(BaseSettings):
@@ -9,11 +9,86 @@ class Settings(BaseSettings):
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-west-1"
     aws_bucket_name: Optional[str] = None
+    aws_endpoint_url: Optional[str] = None  # S3-compatible endpoint (e.g. MinIO)
+    # Public URL prefix for stored objects, e.g. a CDN in front of the bucket
+    # (defaults to https://{bucket}.s3.{region}.amazonaws.com)
+    public_base_url: Optional[str] = None
     max_upload_size: int = 10485760  # 10MB
+    rendition_sizes: List[int] = [200, 400, 1200, 2400]  # longest edge in px
+    derivative_formats: List[str] = ["jpeg", "webp"]  # "avif" needs pillow-avif-plugin
+    encoder_threads: int = 4
+    db_warm_connections: int = 5  # pooled connections each worker opens at startup
+    # Large listing responses are gzipped above this size (bytes)
+    gzip_min_size: int = 4096
+    gzip_level: int = 5
+    # Decode admission control: bitmap memory all concurrent decodes may hold
+    decode_memory_budget_mb: int = 1024
+    decode_queue_timeout: float = 10.0  # seconds to wait for budget before answering 429
+    decode_background_share: float = 0.5  # most of the budget tile/contact sheet builds may hold
+    max_image_pixels: int = 200000000  # larger images are rejected as decompression bombs
+    # On-demand resize proxy (/img/...); disabled unless a signing secret is set
+    image_proxy_secret: Optional[str] = None
+    image_proxy_max_dimension: int = 4096
+    image_proxy_square_size: int = 600  # square_url crops in photo payloads
+    image_cache_dir: str = "image-cache"
+    image_cache_max_mb: int = 1024
+    # Contact sheets: one sprite of all thumbnails per gallery
+    contact_sheet_cell_size: int = 200  # px; a multiple of 8
+    contact_sheet_columns: int = 6
+    contact_sheet_max_frames: int = 360
+    contact_sheet_fetch_concurrency: int = 8
+    # Film consumption ledger: events per stock between balance snapshots
+    film_ledger_snapshot_interval: int = 50
+    # Deep-zoom tile pyramids for large scans (built in the background after upload)
+    tiles_enabled: bool = True
+    tile_min_dimension: int = 4000  # longest edge in px
+    tile_size: int = 256  # must be even
+    tile_format: str = "jpeg"
+    tile_upload_concurrency: int = 8
+    # Resumable (chunked) uploads for large scans
+    max_resumable_upload_size: int = 524288000  # 500MB
+    upload_tmp_dir: str = "/tmp/photography-uploads"
+    upload_session_ttl_hours: int = 24
+    import_concurrency: int = 4  # archive entries ingested in parallel
+    import_max_entry_size: int = 524288000  # 500MB per scan inside an archive
+    export_prefetch_concurrency: int = 4  # originals opened ahead while streaming a ZIP
+    similarity_refresh_seconds: float = 30  # how often workers check for other workers' uploads
+    # Weather: upstream answers are cached in-process and in a directory every worker on the host
+    # reads; the warmer (one worker per host) refreshes upcoming trips there
+    weather_forecast_days: int = 16  # open-meteo's forecast horizon
+    weather_cache_ttl_minutes: int = 60
+    weather_geocode_ttl_hours: int = 168
+    weather_fetch_concurrency: int = 8  # upstream calls in flight for batch requests
+    weather_warm_interval_minutes: int = 30  # below the cache TTL; 0 disables the warmer
+    weather_stale_hours: int = 24  # past its TTL an answer is still served (marked stale) while refreshing
+    weather_shared_cache_dir: str = "/tmp/photography-weather"  # empty keeps each worker's cache to itself
+    # Third-party API calls: timeout adapts to recent latency within these bounds (seconds),
+    # and a breaker per upstream opens at the given failure rate over the last calls
+    upstream_timeout_min: float = 0.5
+    upstream_timeout_max: float = 2.5
+    upstream_breaker_window: int = 20
+    upstream_breaker_min_calls: int = 5
+    upstream_breaker_failure_rate: float = 0.5
+    upstream_breaker_cooldown_seconds: float = 30
+    
+    # Opt-in request profiling (requests must also send X-Profile-Token)
+    profiling_enabled: bool = False
+    profiling_secret: Optional[str] = None
+    profiling_mode: str = "sampling"  # "sampling" (collapsed stacks) or "cprofile" (pstats)
+    profiling_sample_interval: float = 0.005  # seconds
+    profiling_dir: str = "profiles"
+    profiling_max_files: int = 50
+    
+    # SQL statement counting per request (dev/test, or to find slow queries)
+    query_stats_enabled: bool = False
+    query_budget_max_statements: int = 25
+    query_budget_max_repeats: int = 5  # same statement shape N times looks like N+1
+    query_budget_action: str = "log"  # "log" or "raise"
+    slow_query_threshold_ms: float = 200
+    slow_query_log_size: int = 50
     
     class Config:
         env_file = ".env"
 
 
 settings = Settings()
-
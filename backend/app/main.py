@@ -1,13 +1,34 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from .api import galleries, film_stocks, trips
+from starlette.concurrency import run_in_threadpool
+from .api import galleries, photos, film_stocks, trips, admin, images, search
+from .config import settings
+from .database import engine
+from .services import profiling
+from .services import query_stats
+from .services.decode_scheduler import ImageTooLarge, DecodeBudgetExceeded, configure_pillow
+from .services.weather_prefetch import weather_warmer
+from .services.warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connections are opened before the worker starts accepting requests
+    await run_in_threadpool(warm_up)
+    weather_warmer.start()
+    yield
+    weather_warmer.stop()
+
 
 app = FastAPI(
     title="Photography App API",
     description="Film management system API",
     version="1.0.0",
-    root_path_in_servers=False
+    root_path_in_servers=False,
+    lifespan=lifespan
 )
 
 # Trust proxy headers from Railway
@@ -19,21 +40,52 @@ async def add_proxy_headers(request, call_next):
     response = await call_next(request)
     return response
 
+# Opt-in per-request profiling, not registered at all unless enabled
+if settings.profiling_enabled:
+    profiling.install()
+    app.middleware("http")(profiling.profile_middleware)
+
+# Per-request SQL statement counting and budgets
+if settings.query_stats_enabled:
+    query_stats.install(engine)
+    app.middleware("http")(query_stats.query_stats_middleware)
+
+# Image decode admission control (see services/decode_scheduler.py)
+configure_pillow()
+
+@app.exception_handler(DecodeBudgetExceeded)
+async def decode_budget_exceeded_handler(request: Request, exc: DecodeBudgetExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(ImageTooLarge)
+async def image_too_large_handler(request: Request, exc: ImageTooLarge):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
 # CORS middleware - must be added before routes
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r"^https://.*\.railway\.app$|^https://.*\.vercel\.app$|^https://.*\.github\.io$|^http://localhost:\d+$|^http://127\.0\.0\.1:\d+$",
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH", "HEAD"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # "*" is not honoured for credentialed requests, so name the headers the frontend reads
+    expose_headers=["*", "Upload-Offset", "Upload-Length", "Upload-Expires", "Retry-After"],
     max_age=3600,
 )
 
 # Include routers
 app.include_router(galleries.router, prefix="/api/galleries", tags=["galleries"])
+app.include_router(photos.router, prefix="/api/photos", tags=["photos"])
 app.include_router(film_stocks.router, prefix="/api/film-stocks", tags=["film-stocks"])
 app.include_router(trips.router, prefix="/api/trips", tags=["trips"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(images.router, prefix="/img", tags=["images"])
 
 
 @app.get("/")
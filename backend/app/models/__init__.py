@@ -1,8 +1,16 @@
 from .gallery import Gallery
 from .photo import Photo
+from .photo_rendition import PhotoRendition
 from .film_stock import FilmStock
+from .film_stock_summary import FilmStockSummary
+from .film_stock_event import FilmStockEvent, FilmStockSnapshot
 from .trip import Trip
 from .trip_image import TripImage
+from .upload_session import UploadSession
 
-__all__ = ["Gallery", "Photo", "FilmStock", "Trip", "TripImage"]
+__all__ = [
+    "Gallery", "Photo", "PhotoRendition",
+    "FilmStock", "FilmStockSummary", "FilmStockEvent", "FilmStockSnapshot",
+    "Trip", "TripImage", "UploadSession"
+]
 
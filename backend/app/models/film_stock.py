@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 
 class FilmStock(Base):
     __tablename__ = "film_stocks"
+    __table_args__ = (
+        Index("ft_film_stock_search", "model", mysql_prefix="FULLTEXT"),
+        Index("idx_expiry", "expiry_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     model = Column(String(100), nullable=False)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class FilmStockEvent(Base):
+    """Append-only ledger of every change to a film stock's quantity"""
+    __tablename__ = "film_stock_events"
+    __table_args__ = (
+        Index("idx_event_stock", "film_stock_id", "id"),
+        Index("idx_event_created", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    film_stock_id = Column(Integer, nullable=False)
+    gallery_id = Column(Integer, index=True)  # the roll, for consume/return
+    kind = Column(String(20), nullable=False)  # opening | restock | adjust | consume | return
+    delta = Column(Integer, nullable=False)  # rolls added (negative when used)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class FilmStockSnapshot(Base):
+    """Balance and rolls shot as of one ledger event, taken every few events"""
+    __tablename__ = "film_stock_snapshots"
+    __table_args__ = (
+        Index("idx_snapshot_stock", "film_stock_id", "event_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    film_stock_id = Column(Integer, nullable=False)
+    event_id = Column(Integer, nullable=False)
+    balance = Column(Integer, nullable=False)
+    rolls_shot = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Date, Index
+from ..database import Base
+
+
+class FilmStockSummary(Base):
+    """
+    Running totals per (model, format, expiry date), maintained in the same
+    transaction as every film stock write; see services/film_inventory.py
+    """
+    __tablename__ = "film_stock_summary"
+    __table_args__ = (
+        Index("idx_summary_bucket", "model", "format", "expiry_date"),
+        Index("idx_summary_expiry", "expiry_date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(String(100), nullable=False)
+    format = Column(String(50))
+    expiry_date = Column(Date)
+    stock_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
@@ -1,16 +1,22 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 
 class Gallery(Base):
     __tablename__ = "galleries"
+    __table_args__ = (
+        Index("ft_gallery_search", "name", "description", mysql_prefix="FULLTEXT"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     cover_image_url = Column(String(500))
     photo_count = Column(Integer, default=0)
+    film_stock_id = Column(Integer, index=True)  # the stock this roll was shot on
+    contact_sheet_url = Column(String(500))
+    contact_sheet_map = Column(Text)  # JSON: frame positions within the sheet
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
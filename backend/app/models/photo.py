@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy import Column, Integer, SmallInteger, String, BigInteger, DateTime, Text, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 
 class Photo(Base):
     __tablename__ = "photos"
+    __table_args__ = (
+        Index("idx_gallery_taken_at", "gallery_id", "taken_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     gallery_id = Column(Integer, nullable=False, index=True)
@@ -13,5 +16,18 @@ class Photo(Base):
     storage_key = Column(String(500))
     file_size = Column(BigInteger)
     display_order = Column(Integer, default=0)
+    width = Column(Integer)
+    height = Column(Integer)
+    placeholder = Column(Text)  # base64 micro-JPEG data URI
+    dominant_color = Column(String(7))
+    # EXIF capture/scan metadata
+    taken_at = Column(DateTime)
+    camera_make = Column(String(100))
+    camera_model = Column(String(100), index=True)
+    lens = Column(String(150))
+    iso = Column(Integer)
+    orientation = Column(SmallInteger)  # NULL until metadata has been extracted
+    phash = Column(String(16), index=True)  # 64-bit dHash as hex
+    tile_manifest_url = Column(String(500))  # DZI manifest, only for large scans
     uploaded_at = Column(DateTime, server_default=func.now())
 
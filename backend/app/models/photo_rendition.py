@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class PhotoRendition(Base):
+    __tablename__ = "photo_renditions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, nullable=False, index=True)
+    size = Column(Integer, nullable=False)  # configured bounding box, e.g. 1200
+    format = Column(String(10), nullable=False, default="jpeg")
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    url = Column(String(500), nullable=False)
+    storage_key = Column(String(500), nullable=False)
+    file_size = Column(BigInteger)
+    created_at = Column(DateTime, server_default=func.now())
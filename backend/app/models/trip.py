@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 
 class Trip(Base):
     __tablename__ = "trips"
+    __table_args__ = (
+        Index("ft_trip_search", "name", "destination", "description", mysql_prefix="FULLTEXT"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
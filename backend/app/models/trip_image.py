@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Text, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 
 class TripImage(Base):
     __tablename__ = "trip_images"
+    __table_args__ = (
+        Index("ft_trip_image_search", "caption", mysql_prefix="FULLTEXT"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     trip_id = Column(Integer, nullable=False, index=True)
@@ -14,5 +17,9 @@ class TripImage(Base):
     file_size = Column(BigInteger)
     caption = Column(String(255))
     display_order = Column(Integer, default=0)
+    width = Column(Integer)
+    height = Column(Integer)
+    placeholder = Column(Text)  # base64 micro-JPEG data URI
+    dominant_color = Column(String(7))
     uploaded_at = Column(DateTime, server_default=func.now())
 
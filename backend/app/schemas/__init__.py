@@ -1,12 +1,20 @@
-from .gallery import Gallery, GalleryCreate, GalleryUpdate
-from .photo import Photo, PhotoCreate
-from .film_stock import FilmStock, FilmStockCreate, FilmStockUpdate
+from .gallery import Gallery, GallerySummary, GalleryCreate, GalleryUpdate, PhotoOrder
+from .photo import Photo, PhotoCreate, PhotoRendition, PhotoColumns, SimilarPhoto
+from .film_stock import (
+    FilmStock, FilmStockCreate, FilmStockUpdate, FilmStockSummary,
+    FilmStockUsage, MonthlyUsage, FilmStockEvent, FilmStockLedger
+)
 from .trip import Trip, TripCreate, TripUpdate, TripImage, TripImageCreate
+from .upload_session import UploadSession, UploadSessionCreate
+from .search import SearchResult, SearchResults
 
 __all__ = [
-    "Gallery", "GalleryCreate", "GalleryUpdate",
-    "Photo", "PhotoCreate",
-    "FilmStock", "FilmStockCreate", "FilmStockUpdate",
-    "Trip", "TripCreate", "TripUpdate", "TripImage", "TripImageCreate"
+    "Gallery", "GallerySummary", "GalleryCreate", "GalleryUpdate", "PhotoOrder",
+    "Photo", "PhotoCreate", "PhotoRendition", "PhotoColumns", "SimilarPhoto",
+    "FilmStock", "FilmStockCreate", "FilmStockUpdate", "FilmStockSummary",
+    "FilmStockUsage", "MonthlyUsage", "FilmStockEvent", "FilmStockLedger",
+    "Trip", "TripCreate", "TripUpdate", "TripImage", "TripImageCreate",
+    "UploadSession", "UploadSessionCreate",
+    "SearchResult", "SearchResults"
 ]
 
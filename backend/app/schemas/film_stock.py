@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 
@@ -29,3 +29,54 @@ class FilmStock(FilmStockBase):
     class Config:
         from_attributes = True
 
+
+
+class FilmStockTotal(BaseModel):
+    model: Optional[str] = None
+    format: Optional[str] = None
+    expiry_date: Optional[date] = None
+    stocks: int
+    quantity: int
+
+
+class FilmStockSummary(BaseModel):
+    total_stocks: int
+    total_quantity: int
+    by_format: List[FilmStockTotal]
+    by_model: List[FilmStockTotal]
+    expiring_within_days: int
+    expiring: List[FilmStockTotal]
+    expiring_quantity: int
+    expired: List[FilmStockTotal]
+    expired_quantity: int
+
+
+class FilmStockUsage(BaseModel):
+    film_stock_id: int
+    model: str
+    format: Optional[str] = None
+    quantity: int
+    rolls_shot: int
+    last_shot_at: Optional[datetime] = None
+
+
+class MonthlyUsage(BaseModel):
+    year: int
+    month: int
+    rolls_shot: int
+
+
+class FilmStockEvent(BaseModel):
+    id: int
+    gallery_id: Optional[int] = None
+    kind: str  # opening | restock | adjust | consume | return
+    delta: int
+    balance: int  # rolls left right after this event
+    created_at: datetime
+
+
+class FilmStockLedger(BaseModel):
+    film_stock_id: int
+    balance: int
+    rolls_shot: int
+    events: List[FilmStockEvent]
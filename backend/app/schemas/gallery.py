@@ -1,11 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+import json
 
 
 class GalleryBase(BaseModel):
     name: str
     description: Optional[str] = None
+    film_stock_id: Optional[int] = None  # one roll is taken from this stock
 
 
 class GalleryCreate(GalleryBase):
@@ -15,15 +17,36 @@ class GalleryCreate(GalleryBase):
 class GalleryUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    film_stock_id: Optional[int] = None
 
 
-class Gallery(GalleryBase):
+class PhotoOrder(BaseModel):
+    photo_ids: List[int]
+
+
+class GallerySummary(GalleryBase):
+    """Gallery as listed; the contact sheet frame map is only sent for a single gallery"""
     id: int
     cover_image_url: Optional[str] = None
     photo_count: int
+    # One sprite of all thumbnails
+    contact_sheet_url: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+
+class Gallery(GallerySummary):
+    # Each frame's x/y/w/h in the contact sheet
+    contact_sheet_map: Optional[Dict[str, Any]] = None
+    
+    @field_validator("contact_sheet_map", mode="before")
+    @classmethod
+    def parse_contact_sheet_map(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+    
+    class Config:
+        from_attributes = True
+
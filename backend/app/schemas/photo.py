@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 
@@ -11,6 +11,17 @@ class PhotoCreate(PhotoBase):
     pass
 
 
+class PhotoRendition(BaseModel):
+    size: int
+    format: str
+    width: int
+    height: int
+    url: str
+    
+    class Config:
+        from_attributes = True
+
+
 class Photo(PhotoBase):
     id: int
     gallery_id: int
@@ -19,7 +30,33 @@ class Photo(PhotoBase):
     file_size: Optional[int]
     display_order: int
     uploaded_at: datetime
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = None
+    dominant_color: Optional[str] = None
+    taken_at: Optional[datetime] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    lens: Optional[str] = None
+    iso: Optional[int] = None
+    tile_manifest_url: Optional[str] = None
+    renditions: List[PhotoRendition] = []
+    square_url: Optional[str] = None  # signed /img path, when the resize proxy is enabled
     
     class Config:
         from_attributes = True
 
+
+
+class PhotoColumns(BaseModel):
+    """A photo listing with ?format=columnar: one array per field instead of one object per photo"""
+    count: int
+    fields: List[str]
+    columns: Dict[str, List[Any]]  # field -> values, one per photo, in listing order
+    rendition_fields: List[str]
+    renditions: List[List[List[Any]]]  # per photo, one [size, format, ...] list per rendition
+
+
+class SimilarPhoto(BaseModel):
+    distance: int  # Hamming distance between perceptual hashes (0-64)
+    photo: Photo
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class SearchResult(BaseModel):
+    type: str  # gallery | trip | trip_image | film_stock
+    id: int
+    title: Optional[str] = None
+    subtitle: Optional[str] = None
+    parent_id: Optional[int] = None  # the trip of a trip_image
+    image_url: Optional[str] = None
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[SearchResult]
@@ -18,6 +18,10 @@ class TripImage(TripImageBase):
     thumbnail_url: Optional[str]
     display_order: int
     uploaded_at: datetime
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = None
+    dominant_color: Optional[str] = None
     
     class Config:
         from_attributes = True
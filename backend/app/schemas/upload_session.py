@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+
+
+class UploadSession(BaseModel):
+    id: str
+    gallery_id: int
+    filename: str
+    total_size: int
+    offset: int
+    expires_at: datetime
+    
+    class Config:
+        from_attributes = True
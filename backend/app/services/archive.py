@@ -0,0 +1,198 @@
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import IO, Deque, Iterator, List, NamedTuple, Optional, Tuple
+from ..config import settings
+from .storage import storage_service
+
+CHUNK_SIZE = 256 * 1024
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Unseekable sink for ZipFile. zipfile falls back to data descriptors when
+    it cannot seek, so entries can be streamed without knowing their CRC upfront.
+    """
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(
+    entries: List[Tuple[str, str, Optional[datetime]]],
+    concurrency: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Yield a ZIP of (archive_name, storage_key, modified_at) entries as it is built.
+    Entries are STORED (scans are already compressed) with ZIP64 where needed.
+    Up to `concurrency` objects are opened ahead of the one being written, so
+    memory stays bounded by a few stream buffers whatever the gallery size.
+    """
+    concurrency = concurrency or settings.export_prefetch_concurrency
+    sink = _ZipSink()
+    pending = iter(entries)
+    prefetched = deque()
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="zip-prefetch") as pool:
+        def prefetch_next():
+            entry = next(pending, None)
+            if entry:
+                prefetched.append((entry, pool.submit(storage_service.open_object, entry[1])))
+        
+        for _ in range(concurrency):
+            prefetch_next()
+        
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            while prefetched:
+                (name, storage_key, modified_at), future = prefetched.popleft()
+                prefetch_next()
+                
+                try:
+                    body, size = future.result()
+                except Exception as e:
+                    print(f"Skipping {storage_key} in export: {e}")
+                    continue
+                
+                info = zipfile.ZipInfo(name, date_time=(modified_at or datetime.now()).timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = size
+                
+                try:
+                    with zf.open(info, "w") as dest:
+                        for chunk in body.iter_chunks(CHUNK_SIZE):
+                            dest.write(chunk)
+                            yield sink.drain()
+                finally:
+                    body.close()
+        
+        # Central directory is written when the archive closes
+        yield sink.drain()
+
+
+class ArchiveEntry(NamedTuple):
+    name: str
+    size: int
+    data: Optional[bytes]  # None when the entry could not be read
+    error: Optional[str] = None
+
+
+class ArchiveReader:
+    """
+    Image entries of a ZIP or tar (optionally compressed) archive, one at a
+    time. ZIP entries come in name order, read on demand through the central
+    directory. Tars have no index, so members come in stream order as they
+    are read off the upload (sorted=False). Either way the archive is never
+    unpacked into memory or onto disk as a whole.
+    """
+    
+    def __init__(self, fileobj: IO[bytes]):
+        self.skipped: List[Tuple[str, str]] = []
+        self._zip = None
+        self._tar = None
+        self._zip_entries: Deque[zipfile.ZipInfo] = deque()
+        
+        fileobj.seek(0)
+        if zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            self._zip = zipfile.ZipFile(fileobj)
+            self._zip_entries.extend(sorted(
+                (info for info in self._zip.infolist()
+                 if not info.is_dir() and self._accept(info.filename, info.file_size)),
+                key=lambda info: info.filename
+            ))
+        else:
+            fileobj.seek(0)
+            try:
+                self._tar = tarfile.open(fileobj=fileobj, mode="r|*")
+            except tarfile.TarError:
+                raise ValueError("File is not a ZIP or tar archive")
+            # One iterator for the whole stream; a fresh one would start over
+            self._tar_members = iter(self._tar)
+    
+    @property
+    def sorted(self) -> bool:
+        return self._zip is not None
+    
+    def _accept(self, name: str, size: int) -> bool:
+        basename = name.rsplit("/", 1)[-1]
+        if name.startswith("__MACOSX/") or basename.startswith("."):
+            return False
+        if os.path.splitext(basename)[1].lower() not in IMAGE_EXTENSIONS:
+            self.skipped.append((name, "not an image"))
+            return False
+        if size > settings.import_max_entry_size:
+            self.skipped.append((name, "too large"))
+            return False
+        return True
+    
+    def _read(self, name: str, size: int, f: IO[bytes]) -> ArchiveEntry:
+        try:
+            # Declared sizes can lie; never read past the limit
+            data = f.read(settings.import_max_entry_size + 1)
+        except (zipfile.BadZipFile, OSError, EOFError) as e:
+            return ArchiveEntry(name, size, None, str(e))
+        if len(data) > settings.import_max_entry_size:
+            return ArchiveEntry(name, size, None, "Entry exceeds the maximum import size")
+        return ArchiveEntry(name, size, data)
+    
+    def next_entry(self) -> Optional[ArchiveEntry]:
+        """
+        The next image entry with its bytes, or None once the archive is done.
+        Raises ValueError when a tar stream is corrupt, since nothing after
+        that point can be read.
+        """
+        if self._zip:
+            if not self._zip_entries:
+                return None
+            info = self._zip_entries.popleft()
+            try:
+                with self._zip.open(info) as f:
+                    return self._read(info.filename, info.file_size, f)
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                # Encrypted or unsupported entries fail alone
+                return ArchiveEntry(info.filename, info.file_size, None, str(e))
+        
+        try:
+            for info in self._tar_members:
+                if info.isfile() and self._accept(info.name, info.size):
+                    return self._read(info.name, info.size, self._tar.extractfile(info))
+        except (tarfile.TarError, EOFError, zlib.error, OSError) as e:
+            raise ValueError(f"Could not read archive: {e}")
+        return None
+    
+    def close(self):
+        if self._zip:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+
+def open_archive(fileobj: IO[bytes]) -> ArchiveReader:
+    """Raises ValueError when the file is not a supported archive"""
+    try:
+        return ArchiveReader(fileobj)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise ValueError(f"Could not read archive: {e}")
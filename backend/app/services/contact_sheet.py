@@ -0,0 +1,193 @@
+"""
+Per-gallery contact sheets: every thumbnail in display order composited
+into one sprite with frame numbers, plus a JSON map of where each frame
+sits, so a roll overview loads with a single image request.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Set
+from PIL import Image, ImageDraw, ImageFont
+from ..config import settings
+from ..database import SessionLocal
+from ..models.gallery import Gallery
+from ..models.photo import Photo
+from .decode_scheduler import decode_scheduler, BYTES_PER_PIXEL
+from .storage import storage_service
+
+BACKGROUND = (12, 12, 12)
+LABEL_COLOR = (232, 160, 64)  # film edge-print orange
+LABEL_HEIGHT = 24
+PADDING = 8
+SHEET_QUALITY = 88
+
+
+def sheet_key(gallery_id: int) -> str:
+    return f"galleries/{gallery_id}/contact_sheet.jpg"
+
+
+class ContactSheetService:
+    def __init__(self):
+        self.cell = settings.contact_sheet_cell_size
+        self.columns = settings.contact_sheet_columns
+        self.font = ImageFont.load_default()
+        # Rebuilds of one gallery never overlap: a request arriving during a
+        # rebuild marks the gallery dirty and the running rebuild goes again
+        self._lock = threading.Lock()
+        self._running: Set[int] = set()
+        self._dirty: Set[int] = set()
+    
+    def schedule(self, gallery_id: int):
+        """Background task: bring a gallery's contact sheet up to date"""
+        with self._lock:
+            if gallery_id in self._running:
+                self._dirty.add(gallery_id)
+                return
+            self._running.add(gallery_id)
+        
+        try:
+            while True:
+                try:
+                    self.rebuild(gallery_id)
+                except Exception as e:
+                    print(f"Error building contact sheet for gallery {gallery_id}: {e}")
+                with self._lock:
+                    if gallery_id not in self._dirty:
+                        break
+                    self._dirty.discard(gallery_id)
+        finally:
+            with self._lock:
+                self._running.discard(gallery_id)
+    
+    def rebuild(self, gallery_id: int):
+        db = SessionLocal()
+        try:
+            gallery = db.query(Gallery).filter(Gallery.id == gallery_id).first()
+            if not gallery:
+                return
+            photos = db.query(Photo.id, Photo.storage_key, Photo.thumbnail_url).filter(
+                Photo.gallery_id == gallery_id
+            ).order_by(Photo.display_order, Photo.id).limit(settings.contact_sheet_max_frames).all()
+            previous = json.loads(gallery.contact_sheet_map) if gallery.contact_sheet_map else None
+            # Release the connection while fetching and compositing
+            db.rollback()
+            
+            if photos:
+                data, sheet_map = self.render(gallery_id, photos, previous)
+                version = storage_service.put_object(sheet_key(gallery_id), data, 'image/jpeg')
+                values = {
+                    Gallery.contact_sheet_url: storage_service.public_url(sheet_key(gallery_id), version),
+                    Gallery.contact_sheet_map: json.dumps(sheet_map, separators=(',', ':'))
+                }
+            else:
+                storage_service.delete_batch([sheet_key(gallery_id)])
+                values = {Gallery.contact_sheet_url: None, Gallery.contact_sheet_map: None}
+            
+            # A derivative, not an edit: keep updated_at as it was
+            values[Gallery.updated_at] = Gallery.updated_at
+            db.query(Gallery).filter(Gallery.id == gallery_id).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    def render(self, gallery_id: int, photos: List[Any], previous: Optional[Dict[str, Any]]):
+        """Composite the sheet, reusing cells of the previous sheet where the thumbnail is unchanged"""
+        pitch_x = self.cell + PADDING
+        pitch_y = self.cell + LABEL_HEIGHT + PADDING
+        rows = (len(photos) + self.columns - 1) // self.columns
+        width = PADDING + min(len(photos), self.columns) * pitch_x
+        height = PADDING + rows * pitch_y
+        
+        reusable = {}
+        if previous and previous.get("cell") == self.cell:
+            reusable = {(f["photo_id"], f["thumb"]): f for f in previous["frames"] if f["w"]}
+        reused = any((p.id, p.thumbnail_url) in reusable for p in photos)
+        
+        cost = width * height * BYTES_PER_PIXEL
+        if reused:
+            cost += previous["width"] * previous["height"] * BYTES_PER_PIXEL
+        with decode_scheduler.admit(cost, block=True):
+            old_sheet = None
+            if reused:
+                old_sheet = self._load_previous(gallery_id, previous)
+                if old_sheet is None:
+                    # Nothing to copy from, so every cell is fetched again
+                    reusable = {}
+            missing = [p for p in photos if (p.id, p.thumbnail_url) not in reusable and p.thumbnail_url]
+            
+            # Only thumbnails that are new (or changed) are fetched
+            with ThreadPoolExecutor(max_workers=settings.contact_sheet_fetch_concurrency) as pool:
+                fetched = dict(zip(
+                    [p.id for p in missing],
+                    pool.map(self._fetch_thumbnail, [p.storage_key for p in missing])
+                ))
+            
+            sheet = Image.new('RGB', (width, height), BACKGROUND)
+            draw = ImageDraw.Draw(sheet)
+            frames = []
+            
+            for index, photo in enumerate(photos):
+                left = PADDING + (index % self.columns) * pitch_x
+                top = PADDING + (index // self.columns) * pitch_y
+                frame = {"photo_id": photo.id, "frame": index + 1, "thumb": photo.thumbnail_url}
+                
+                old = reusable.get((photo.id, photo.thumbnail_url))
+                if old is not None and old_sheet is not None:
+                    image = old_sheet.crop((old["x"], old["y"], old["x"] + old["w"], old["y"] + old["h"]))
+                else:
+                    image = fetched.get(photo.id)
+                
+                if image is not None:
+                    # Centered in the cell, snapped to the 8px JPEG block grid: reused
+                    # cells then re-encode onto the same blocks and barely degrade
+                    x = left + ((self.cell - image.width) // 2 & ~7)
+                    y = top + ((self.cell - image.height) // 2 & ~7)
+                    sheet.paste(image, (x, y))
+                    frame.update(x=x, y=y, w=image.width, h=image.height)
+                else:
+                    frame.update(x=left, y=top, w=0, h=0)
+                
+                draw.text((left, top + self.cell + 4), str(index + 1), fill=LABEL_COLOR, font=self.font)
+                frames.append(frame)
+            
+            output = BytesIO()
+            # 4:4:4 keeps the block grid at 8px (chroma subsampling would make it 16)
+            sheet.save(output, format='JPEG', quality=SHEET_QUALITY, subsampling=0, optimize=True, progressive=True)
+        
+        return output.getvalue(), {
+            "width": width,
+            "height": height,
+            "cell": self.cell,
+            "columns": self.columns,
+            "frames": frames
+        }
+    
+    def _load_previous(self, gallery_id: int, previous: Dict[str, Any]) -> Optional[Image.Image]:
+        """The current sheet, or None when it is gone or does not match its map"""
+        try:
+            sheet = Image.open(BytesIO(storage_service.read_range(sheet_key(gallery_id))))
+            sheet.load()
+        except Exception as e:
+            print(f"Previous contact sheet of gallery {gallery_id} unusable, rendering all cells: {e}")
+            return None
+        if sheet.size != (previous["width"], previous["height"]):
+            return None
+        return sheet
+    
+    def _fetch_thumbnail(self, storage_key: Optional[str]) -> Optional[Image.Image]:
+        if not storage_key:
+            return None
+        try:
+            image = Image.open(BytesIO(storage_service.read_range(storage_service.thumbnail_key(storage_key))))
+            image.draft('RGB', (self.cell, self.cell))
+            image = image.convert('RGB')
+            image.thumbnail((self.cell, self.cell), Image.Resampling.LANCZOS)
+            return image
+        except Exception as e:
+            print(f"Error fetching thumbnail of {storage_key} for contact sheet: {e}")
+            return None
+
+
+# Singleton instance
+contact_sheet_service = ContactSheetService()
@@ -0,0 +1,126 @@
+"""
+Admission control for image decoding. Each decode reserves its estimated
+bitmap memory (from header dimensions, before any pixels are decoded)
+against a per-process budget, so bursts of large scans queue briefly and
+are then turned away instead of multiplying worker RSS.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from PIL import Image
+from ..config import settings
+
+# Pillow keeps RGB/RGBA/L;16 pixels in 32-bit slots, so 4 bytes is an upper bound
+BYTES_PER_PIXEL = 4
+
+
+def configure_pillow():
+    """
+    Apply MAX_IMAGE_PIXELS to Pillow's own decompression bomb guard. Called
+    once at startup by the app and the scripts that decode images; estimate()
+    enforces the limit itself either way, since Pillow only warns until twice it.
+    """
+    Image.MAX_IMAGE_PIXELS = settings.max_image_pixels
+
+
+class ImageTooLarge(Exception):
+    """More pixels than MAX_IMAGE_PIXELS (a decompression bomb or an absurd scan)"""
+    pass
+
+
+class DecodeBudgetExceeded(Exception):
+    """The memory budget stayed full for longer than the queue timeout"""
+    def __init__(self, retry_after: int):
+        super().__init__("Too many images are being processed, try again shortly")
+        self.retry_after = retry_after
+
+
+class Reservation:
+    """Budget held by one admitted decode; shrink() hands back what is no longer needed"""
+    
+    def __init__(self, scheduler: "DecodeScheduler", cost: int, background: bool):
+        self.scheduler = scheduler
+        self.cost = cost
+        self.background = background
+    
+    def shrink(self, cost: int):
+        cost = max(0, min(cost, self.cost))
+        self.scheduler._release(self.cost - cost, self.background)
+        self.cost = cost
+
+
+class DecodeScheduler:
+    def __init__(self, budget_bytes: int, queue_timeout: float, background_share: float):
+        self.budget = budget_bytes
+        # Background work never holds more than this, so uploads always have the rest
+        self.background_budget = int(budget_bytes * background_share)
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self.background_in_use = 0
+        self._condition = threading.Condition()
+    
+    def estimate(self, image: Image.Image, draft_size: Optional[int] = None, copies: int = 2) -> int:
+        """
+        Bytes needed to decode an opened (header-only) image. With draft_size
+        the JPEG reduced-scale decode is applied first, so it costs less.
+        `copies` covers working copies (mode conversion, rotation, the first downscale).
+        """
+        width, height = image.size
+        if width * height > settings.max_image_pixels:
+            raise ImageTooLarge(
+                f"Image has {width * height} pixels, the limit is {settings.max_image_pixels}"
+            )
+        if draft_size:
+            image.draft('RGB', (draft_size, draft_size))
+            width, height = image.size
+        return width * height * BYTES_PER_PIXEL * copies
+    
+    def _fits(self, cost: int, background: bool) -> bool:
+        if self.in_use + cost > self.budget:
+            return False
+        return not background or self.background_in_use + cost <= self.background_budget
+    
+    def _release(self, cost: int, background: bool):
+        with self._condition:
+            self.in_use -= cost
+            if background:
+                self.background_in_use -= cost
+            self._condition.notify_all()
+    
+    @contextmanager
+    def admit(self, cost: int, block: bool = False):
+        """
+        Hold `cost` bytes of the budget while decoding. Waits up to the queue
+        timeout before raising DecodeBudgetExceeded. block=True is for
+        background work: it waits as long as it takes, but only within the
+        background share of the budget. Yields the Reservation.
+        """
+        # One image larger than the whole budget (or share) still runs, just alone
+        cost = min(cost, self.background_budget if block else self.budget)
+        deadline = time.monotonic() + self.queue_timeout
+        
+        with self._condition:
+            while not self._fits(cost, block):
+                remaining = None if block else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DecodeBudgetExceeded(retry_after=max(1, math.ceil(self.queue_timeout)))
+                self._condition.wait(remaining)
+            self.in_use += cost
+            if block:
+                self.background_in_use += cost
+        
+        reservation = Reservation(self, cost, block)
+        try:
+            yield reservation
+        finally:
+            reservation.shrink(0)
+
+
+# Singleton instance
+decode_scheduler = DecodeScheduler(
+    budget_bytes=settings.decode_memory_budget_mb * 1024 * 1024,
+    queue_timeout=settings.decode_queue_timeout,
+    background_share=settings.decode_background_share
+)
@@ -0,0 +1,123 @@
+"""
+Film stock inventory totals. film_stock_summary holds one row per
+(model, format, expiry date) with the number of stock entries and rolls in
+it; create/update/delete adjust it in their own transaction, so the summary
+endpoint reads a handful of bucket rows instead of the whole inventory.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models.film_stock import FilmStock
+from ..models.film_stock_summary import FilmStockSummary
+
+# (model, format, expiry_date, quantity) of a stock entry
+Bucket = Tuple[str, Optional[str], Optional[date], int]
+
+
+def bucket_of(film_stock: FilmStock) -> Bucket:
+    return (film_stock.model, film_stock.format, film_stock.expiry_date, film_stock.quantity or 0)
+
+
+def apply_delta(db: Session, model: str, format: Optional[str], expiry_date: Optional[date], stocks: int, quantity: int):
+    """Add to one bucket; the caller commits together with its film stock write"""
+    if not stocks and not quantity:
+        return
+    rows = db.query(FilmStockSummary).filter(
+        FilmStockSummary.model == model,
+        FilmStockSummary.format == format,
+        FilmStockSummary.expiry_date == expiry_date
+    ).order_by(FilmStockSummary.id).with_for_update().all()
+    
+    if not rows:
+        db.add(FilmStockSummary(model=model, format=format, expiry_date=expiry_date, stock_count=stocks, quantity=quantity))
+        return
+    
+    # Two writers can both insert a new bucket (nullable format/expiry_date rule
+    # out a unique key), so fold any duplicates into the first row here
+    row, *duplicates = rows
+    for duplicate in duplicates:
+        row.stock_count += duplicate.stock_count
+        row.quantity += duplicate.quantity
+        db.delete(duplicate)
+    
+    row.stock_count += stocks
+    row.quantity += quantity
+    # Only an empty bucket may go; anything else would drop part of the totals
+    if row.stock_count == 0 and row.quantity == 0:
+        db.delete(row)
+
+
+def record_change(db: Session, old: Optional[Bucket], new: Optional[Bucket]):
+    """Move a stock entry between buckets: old is None on create, new is None on delete"""
+    if old and new and old[:3] == new[:3]:
+        apply_delta(db, *new[:3], 0, new[3] - old[3])
+        return
+    if old:
+        apply_delta(db, *old[:3], -1, -old[3])
+    if new:
+        apply_delta(db, *new[:3], 1, new[3])
+
+
+def rebuild(db: Session):
+    """Recompute every bucket from film_stocks (after bulk edits outside the API)"""
+    db.query(FilmStockSummary).delete(synchronize_session=False)
+    rows = db.query(
+        FilmStock.model,
+        FilmStock.format,
+        FilmStock.expiry_date,
+        func.count(FilmStock.id),
+        func.coalesce(func.sum(FilmStock.quantity), 0)
+    ).group_by(FilmStock.model, FilmStock.format, FilmStock.expiry_date).all()
+    db.add_all([
+        FilmStockSummary(model=m, format=f, expiry_date=e, stock_count=count, quantity=quantity)
+        for m, f, e, count, quantity in rows
+    ])
+    db.commit()
+
+
+def summary(db: Session, expiring_within_days: int, today: Optional[date] = None) -> Dict[str, Any]:
+    today = today or date.today()
+    horizon = today + timedelta(days=expiring_within_days)
+    stocks = func.sum(FilmStockSummary.stock_count)
+    quantity = func.sum(FilmStockSummary.quantity)
+    
+    by_format = db.query(FilmStockSummary.format, stocks, quantity).group_by(
+        FilmStockSummary.format
+    ).order_by(quantity.desc()).all()
+    by_model = db.query(FilmStockSummary.model, FilmStockSummary.format, stocks, quantity).group_by(
+        FilmStockSummary.model, FilmStockSummary.format
+    ).order_by(quantity.desc()).all()
+    
+    # Both ranges go through the expiry_date index; only buckets with rolls left matter
+    expiring = db.query(FilmStockSummary.model, FilmStockSummary.format, FilmStockSummary.expiry_date, stocks, quantity).filter(
+        FilmStockSummary.expiry_date >= today,
+        FilmStockSummary.expiry_date <= horizon,
+        FilmStockSummary.quantity > 0
+    ).group_by(FilmStockSummary.model, FilmStockSummary.format, FilmStockSummary.expiry_date).order_by(
+        FilmStockSummary.expiry_date
+    ).all()
+    expired = db.query(FilmStockSummary.model, FilmStockSummary.format, FilmStockSummary.expiry_date, stocks, quantity).filter(
+        FilmStockSummary.expiry_date < today,
+        FilmStockSummary.quantity > 0
+    ).group_by(FilmStockSummary.model, FilmStockSummary.format, FilmStockSummary.expiry_date).order_by(
+        FilmStockSummary.expiry_date
+    ).all()
+    
+    def dated(rows):
+        return [
+            {"model": m, "format": f, "expiry_date": e, "stocks": s, "quantity": q}
+            for m, f, e, s, q in rows
+        ]
+    
+    return {
+        "total_stocks": sum(s for _, s, _ in by_format),
+        "total_quantity": sum(q for _, _, q in by_format),
+        "by_format": [{"format": f, "stocks": s, "quantity": q} for f, s, q in by_format],
+        "by_model": [{"model": m, "format": f, "stocks": s, "quantity": q} for m, f, s, q in by_model],
+        "expiring_within_days": expiring_within_days,
+        "expiring": dated(expiring),
+        "expiring_quantity": sum(q for *_, q in expiring),
+        "expired": dated(expired),
+        "expired_quantity": sum(q for *_, q in expired),
+    }
@@ -0,0 +1,173 @@
+"""
+Film consumption ledger. Every change to a film stock's quantity appends a
+film_stock_events row, and a gallery (one developed roll) consumes a roll
+from the stock it was shot on. Every few events a snapshot records the
+running balance, so balance and history reads sum a bounded tail of the
+ledger instead of replaying all of it.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.film_stock import FilmStock
+from ..models.film_stock_event import FilmStockEvent, FilmStockSnapshot
+from . import film_inventory
+
+# Event kinds that count towards rolls shot (a return undoes a consume)
+SHOT_KINDS = ("consume", "return")
+
+
+class FilmStockNotFound(Exception):
+    pass
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def _rolls_shot():
+    return case((FilmStockEvent.kind.in_(SHOT_KINDS), -FilmStockEvent.delta), else_=0)
+
+
+def _latest_snapshot(db: Session, film_stock_id: int, up_to: Optional[int] = None) -> Optional[FilmStockSnapshot]:
+    query = db.query(FilmStockSnapshot).filter(FilmStockSnapshot.film_stock_id == film_stock_id)
+    if up_to is not None:
+        query = query.filter(FilmStockSnapshot.event_id <= up_to)
+    return query.order_by(FilmStockSnapshot.event_id.desc()).first()
+
+
+def _tail(db: Session, film_stock_id: int, snapshot: Optional[FilmStockSnapshot], up_to: Optional[int] = None) -> Tuple[int, int, int]:
+    """(events, balance, rolls shot) as of up_to, starting from the snapshot"""
+    query = db.query(
+        func.count(FilmStockEvent.id),
+        func.coalesce(func.sum(FilmStockEvent.delta), 0),
+        func.coalesce(func.sum(_rolls_shot()), 0)
+    ).filter(
+        FilmStockEvent.film_stock_id == film_stock_id,
+        FilmStockEvent.id > (snapshot.event_id if snapshot else 0)
+    )
+    if up_to is not None:
+        query = query.filter(FilmStockEvent.id <= up_to)
+    count, change, shot = query.one()
+    if snapshot:
+        return count, snapshot.balance + change, snapshot.rolls_shot + shot
+    return count, change, shot
+
+
+def append(db: Session, film_stock_id: int, kind: str, change: int, gallery_id: Optional[int] = None) -> FilmStockEvent:
+    """
+    Record one event. The caller holds the film stock's row lock (or has just
+    created it), so events of one stock are appended one at a time and the
+    snapshot sees all of them; it commits together with its own write.
+    """
+    event = FilmStockEvent(film_stock_id=film_stock_id, gallery_id=gallery_id, kind=kind, delta=change)
+    db.add(event)
+    db.flush()
+    
+    snapshot = _latest_snapshot(db, film_stock_id)
+    count, balance, shot = _tail(db, film_stock_id, snapshot)
+    if count >= settings.film_ledger_snapshot_interval:
+        db.add(FilmStockSnapshot(film_stock_id=film_stock_id, event_id=event.id, balance=balance, rolls_shot=shot))
+    return event
+
+
+def _move(db: Session, film_stock_id: int, change: int, kind: str, gallery_id: int) -> FilmStockEvent:
+    statement = update(FilmStock).where(FilmStock.id == film_stock_id)
+    if change < 0:
+        # Decrement only while rolls are left: concurrent consumers cannot oversell
+        statement = statement.where(FilmStock.quantity > 0)
+    result = db.execute(
+        statement.values(quantity=func.coalesce(FilmStock.quantity, 0) + change)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        if db.query(FilmStock.id).filter(FilmStock.id == film_stock_id).first() is None:
+            raise FilmStockNotFound(f"Film stock {film_stock_id} not found")
+        raise OutOfStock(f"Film stock {film_stock_id} is out of stock")
+    
+    model, format, expiry_date = db.query(FilmStock.model, FilmStock.format, FilmStock.expiry_date).filter(
+        FilmStock.id == film_stock_id
+    ).one()
+    film_inventory.apply_delta(db, model, format, expiry_date, 0, change)
+    return append(db, film_stock_id, kind, change, gallery_id)
+
+
+def consume(db: Session, film_stock_id: int, gallery_id: int) -> FilmStockEvent:
+    """Take one roll for a gallery; raises OutOfStock when none are left"""
+    return _move(db, film_stock_id, -1, "consume", gallery_id)
+
+
+def give_back(db: Session, film_stock_id: int, gallery_id: int) -> FilmStockEvent:
+    """Return a gallery's roll (the gallery was assigned the wrong stock)"""
+    return _move(db, film_stock_id, 1, "return", gallery_id)
+
+
+def balance(db: Session, film_stock_id: int) -> Tuple[int, int]:
+    """(balance, rolls shot) from the latest snapshot plus the events after it"""
+    _, current, shot = _tail(db, film_stock_id, _latest_snapshot(db, film_stock_id))
+    return current, shot
+
+
+def history(db: Session, film_stock_id: int, before: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Events newest first, each with the balance right after it"""
+    query = db.query(FilmStockEvent).filter(FilmStockEvent.film_stock_id == film_stock_id)
+    if before is not None:
+        query = query.filter(FilmStockEvent.id < before)
+    events = query.order_by(FilmStockEvent.id.desc()).limit(limit).all()
+    if not events:
+        return []
+    
+    newest = events[0].id
+    _, running, _ = _tail(db, film_stock_id, _latest_snapshot(db, film_stock_id, up_to=newest), up_to=newest)
+    entries = []
+    for event in events:
+        entries.append({
+            "id": event.id,
+            "gallery_id": event.gallery_id,
+            "kind": event.kind,
+            "delta": event.delta,
+            "balance": running,
+            "created_at": event.created_at
+        })
+        running -= event.delta
+    return entries
+
+
+def usage_by_stock(db: Session, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    shot = func.sum(_rolls_shot())
+    rows = db.query(
+        FilmStock.id,
+        FilmStock.model,
+        FilmStock.format,
+        FilmStock.quantity,
+        shot,
+        func.max(case((FilmStockEvent.kind == "consume", FilmStockEvent.created_at)))
+    ).join(FilmStockEvent, FilmStockEvent.film_stock_id == FilmStock.id).filter(
+        FilmStockEvent.kind.in_(SHOT_KINDS)
+    ).group_by(
+        FilmStock.id, FilmStock.model, FilmStock.format, FilmStock.quantity
+    ).order_by(shot.desc(), FilmStock.id).offset(skip).limit(limit).all()
+    
+    return [
+        {"film_stock_id": i, "model": m, "format": f, "quantity": q or 0, "rolls_shot": s, "last_shot_at": last}
+        for i, m, f, q, s, last in rows
+    ]
+
+
+def rolls_per_month(db: Session, months: int = 12, film_stock_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    first = date.today().replace(day=1)
+    back = first.year * 12 + first.month - 1 - (months - 1)
+    since = date(back // 12, back % 12 + 1, 1)
+    
+    year = func.extract("year", FilmStockEvent.created_at)
+    month = func.extract("month", FilmStockEvent.created_at)
+    query = db.query(year, month, func.sum(_rolls_shot())).filter(
+        FilmStockEvent.kind.in_(SHOT_KINDS),
+        FilmStockEvent.created_at >= since
+    )
+    if film_stock_id is not None:
+        query = query.filter(FilmStockEvent.film_stock_id == film_stock_id)
+    rows = query.group_by(year, month).order_by(year, month).all()
+    
+    return [{"year": int(y), "month": int(m), "rolls_shot": s} for y, m, s in rows]
@@ -0,0 +1,98 @@
+from PIL import Image, ExifTags
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# IFD0 tags
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+# Exif sub-IFD tags
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_ISO = 0x8827
+TAG_LENS_MODEL = 0xA434
+
+# Orientations 5-8 rotate by 90 degrees, so width and height swap on display
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Same mapping as ImageOps.exif_transpose, usable after the EXIF block is gone
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def _clean(value: Any, max_length: int) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode(errors="ignore")
+    value = str(value).strip("\x00 ").strip()
+    return value[:max_length] or None
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    value = _clean(value, 19)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _parse_iso(value: Any) -> Optional[int]:
+    if isinstance(value, (tuple, list)):
+        value = value[0] if value else None
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_metadata(image: Image.Image) -> Dict[str, Any]:
+    """
+    Read capture/scan metadata from an opened (not necessarily decoded) image.
+    Only the header is needed, so this works on partial downloads too.
+    """
+    try:
+        exif = image.getexif()
+    except Exception:
+        exif = Image.Exif()
+    
+    try:
+        exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+    except Exception:
+        exif_ifd = {}
+    
+    orientation = exif.get(TAG_ORIENTATION) or 1
+    if orientation not in range(1, 9):
+        orientation = 1
+    
+    return {
+        "orientation": orientation,
+        "taken_at": _parse_datetime(exif_ifd.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME)),
+        "camera_make": _clean(exif.get(TAG_MAKE), 100),
+        "camera_model": _clean(exif.get(TAG_MODEL), 100),
+        "lens": _clean(exif_ifd.get(TAG_LENS_MODEL), 150),
+        "iso": _parse_iso(exif_ifd.get(TAG_ISO))
+    }
+
+
+def display_size(image: Image.Image, orientation: int) -> Dict[str, int]:
+    """Width/height as shown once EXIF orientation is applied"""
+    width, height = image.size
+    if orientation in ROTATED_ORIENTATIONS:
+        width, height = height, width
+    return {"width": width, "height": height}
+
+
+def apply_orientation(image: Image.Image, orientation: int) -> Image.Image:
+    """Rotate/flip pixels so the image displays upright without EXIF"""
+    method = ORIENTATION_TRANSPOSE.get(orientation)
+    return image.transpose(method) if method is not None else image
@@ -0,0 +1,229 @@
+"""
+On-demand resizing of stored images (GET /img/{storage_key}?w=&h=&fit=&fmt=&sig=).
+Parameters are HMAC-signed by the server, results land in a size-bounded
+on-disk LRU cache, and concurrent identical requests share one render.
+"""
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+from io import BytesIO
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from .decode_scheduler import decode_scheduler
+from .image_metadata import extract_metadata, display_size, apply_orientation
+from .storage import storage_service, DERIVATIVE_FORMATS
+
+FIT_MODES = ("contain", "cover")
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+def canonical_params(storage_key: str, w: Optional[int], h: Optional[int], fit: str, fmt: str) -> str:
+    """The exact string that is signed and used as the cache key"""
+    return f"{storage_key}?w={w or ''}&h={h or ''}&fit={fit}&fmt={fmt}"
+
+
+def sign(storage_key: str, w: Optional[int], h: Optional[int], fit: str = "contain", fmt: str = "jpeg") -> str:
+    digest = hmac.new(
+        settings.image_proxy_secret.encode(),
+        canonical_params(storage_key, w, h, fit, fmt).encode(),
+        hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def verify(sig: Optional[str], storage_key: str, w: Optional[int], h: Optional[int], fit: str, fmt: str) -> bool:
+    if not settings.image_proxy_secret or not sig:
+        return False
+    return hmac.compare_digest(sig, sign(storage_key, w, h, fit, fmt))
+
+
+def signed_url(
+    storage_key: str,
+    w: Optional[int] = None,
+    h: Optional[int] = None,
+    fit: str = "contain",
+    fmt: str = "jpeg"
+) -> str:
+    """Path of a resized variant; only the server can mint these"""
+    params = {"w": w, "h": h, "fit": fit, "fmt": fmt, "sig": sign(storage_key, w, h, fit, fmt)}
+    return f"/img/{storage_key}?{urlencode({k: v for k, v in params.items() if v is not None})}"
+
+
+def square_url(storage_key: Optional[str]) -> Optional[str]:
+    """Center-cropped square for grid cells, or None while the proxy is disabled"""
+    if not settings.image_proxy_secret or not storage_key:
+        return None
+    size = settings.image_proxy_square_size
+    return signed_url(storage_key, size, size, fit="cover")
+
+
+class DiskLRUCache:
+    """
+    Rendered variants on local disk, bounded by total size. Hits refresh the
+    file's mtime, so eviction removes the least recently used files first.
+    Several workers may share the directory; eviction rescans it.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+    
+    def path_for(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()}.{extension}")
+    
+    def get(self, path: str) -> Optional[str]:
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+    
+    def put(self, path: str, data: bytes):
+        # Write then rename, so readers never see a partial file
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        
+        with self._lock:
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        )
+        self.total_bytes = sum(size for _, size, _ in entries)
+        # Evict down to 90% so we are not back here on the next insert
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+
+class ImageProxy:
+    def __init__(self):
+        self._cache: Optional[DiskLRUCache] = None
+        self._cache_lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    @property
+    def cache(self) -> DiskLRUCache:
+        # Built on first use, so a disabled proxy never touches the cache directory
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = DiskLRUCache(settings.image_cache_dir, settings.image_cache_max_mb * 1024 * 1024)
+            return self._cache
+    
+    async def get(self, storage_key: str, w: Optional[int], h: Optional[int], fit: str, fmt: str) -> str:
+        """Path of the cached variant, rendering it first if needed"""
+        key = canonical_params(storage_key, w, h, fit, fmt)
+        path = self.cache.path_for(key, DERIVATIVE_FORMATS[fmt][2])
+        if self.cache.get(path):
+            return path
+        
+        # Single flight: identical concurrent requests share one render. It runs as
+        # its own task, so a client disconnecting cancels only its own wait
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render_to_cache(storage_key, w, h, fit, fmt, path))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        return await asyncio.shield(task)
+    
+    async def _render_to_cache(self, storage_key: str, w: Optional[int], h: Optional[int], fit: str, fmt: str, path: str) -> str:
+        data = await run_in_threadpool(self._render, storage_key, w, h, fit, fmt)
+        await run_in_threadpool(self.cache.put, path, data)
+        return path
+    
+    def _finished(self, key: str, task: asyncio.Task):
+        # Runs however the render ended, so the key never stays stuck in flight
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Waiters get the exception; this marks it as retrieved if they all left
+            task.exception()
+    
+    def _source_keys(self, storage_key: str, longest: Optional[int]):
+        """Renditions at least as large as the request, smallest first, then the original"""
+        if longest:
+            for size in sorted(settings.rendition_sizes):
+                if size >= longest:
+                    yield storage_service.rendition_key(storage_key, size, "jpeg")
+        yield storage_key
+    
+    def _render(self, storage_key: str, w: Optional[int], h: Optional[int], fit: str, fmt: str) -> bytes:
+        longest = max(w or 0, h or 0) or None
+        source_keys = list(self._source_keys(storage_key, longest))
+        
+        for index, source_key in enumerate(source_keys):
+            try:
+                data = storage_service.read_range(source_key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    continue
+                raise
+            
+            image = Image.open(BytesIO(data))
+            orientation = extract_metadata(image)["orientation"]
+            if not self._large_enough(image, orientation, w, h, fit) and index < len(source_keys) - 1:
+                # A rendition's short edge can fall short of a cover crop; try a larger source
+                continue
+            
+            cost = decode_scheduler.estimate(image, longest)
+            with decode_scheduler.admit(cost):
+                return self._resize(image, orientation, w, h, fit, fmt)
+        
+        raise ImageNotFound(storage_key)
+    
+    def _large_enough(self, image: Image.Image, orientation: int, w: Optional[int], h: Optional[int], fit: str) -> bool:
+        """Whether the source covers the request without upscaling (header only, nothing decoded)"""
+        size = display_size(image, orientation)
+        width, height = size["width"], size["height"]
+        if w and h:
+            if fit == "cover":
+                return width >= w and height >= h
+            return width >= w or height >= h
+        return width >= (w or 0) and height >= (h or 0)
+    
+    def _resize(self, image: Image.Image, orientation: int, w: Optional[int], h: Optional[int], fit: str, fmt: str) -> bytes:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.load()
+        image = apply_orientation(image, orientation)
+        
+        if fit == "cover" and w and h:
+            image = ImageOps.fit(image, (w, h), Image.Resampling.LANCZOS)
+        else:
+            # Never upscale
+            box = (w or image.width, h or image.height)
+            image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
+        return storage_service._encode(image, fmt)
+
+
+# Singleton instance
+image_proxy = ImageProxy()
@@ -0,0 +1,227 @@
+import cProfile
+import functools
+import hmac
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import anyio.to_thread
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+
+PROFILE_HEADER = "x-profile-token"
+
+# Leaf frames in these modules belong to idle pool workers, not to request work
+IDLE_MODULES = ("threading.py", "queue.py")
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the threads serving one request and counts collapsed stacks.
+    
+    The event loop thread is always sampled (async endpoints and middleware run
+    there, shared with any concurrent async requests). Threadpool threads are
+    only sampled while they run work bound to this request, see bind().
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != self.loop_thread and _thread_owners.get(thread_id) is not self:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+    
+    def dump(self) -> bytes:
+        """Collapsed stack format, one `frame;frame;frame count` line per stack"""
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines).encode()
+
+
+_current_sampler: ContextVar[Optional[SamplingProfiler]] = ContextVar("sampler", default=None)
+
+# Worker thread ident -> sampler of the request it is currently working for
+_thread_owners: Dict[int, SamplingProfiler] = {}
+
+
+def bind(func: Callable) -> Callable:
+    """
+    Wrap func so the thread that runs it is sampled for the calling request
+    from its first statement (decode, EXIF, encode...) until it returns.
+    Returns func unchanged when no request is being profiled.
+    """
+    sampler = _current_sampler.get()
+    if sampler is None:
+        return func
+    
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        _thread_owners[thread_id] = sampler
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if _thread_owners.get(thread_id) is sampler:
+                _thread_owners.pop(thread_id, None)
+    
+    return run
+
+
+def install():
+    """
+    Bind everything handed to the anyio threadpool: sync endpoints and
+    dependencies, starlette's run_in_threadpool and iterate_in_threadpool all
+    look anyio.to_thread.run_sync up at call time, so one wrapper covers them.
+    """
+    original = anyio.to_thread.run_sync
+    
+    async def run_sync(func, *args, **kwargs):
+        return await original(bind(func), *args, **kwargs)
+    
+    anyio.to_thread.run_sync = run_sync
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of captured profiles"""
+    
+    name_pattern = re.compile(r"^[\w.-]+$")
+    
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+    
+    def save(self, label: str, extension: str, data: bytes) -> str:
+        """Write a profile and drop the oldest ones beyond max_files"""
+        slug = re.sub(r"[^\w]+", "_", label).strip("_")[:80]
+        name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{slug}.{extension}"
+        
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = os.path.join(self.directory, f".{name}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+            
+            names = self._names()
+            for old_name in names[:max(0, len(names) - self.max_files)]:
+                os.remove(os.path.join(self.directory, old_name))
+        
+        return name
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """List stored profiles, newest first"""
+        profiles = []
+        for name in reversed(self._names()):
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Rotated out by a concurrent save
+                continue
+            profiles.append({
+                "name": name,
+                "size": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+        return profiles
+    
+    def path_for(self, name: str) -> Optional[str]:
+        if not self.name_pattern.match(name) or name.startswith("."):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+    
+    def _names(self) -> List[str]:
+        # Names start with a sortable timestamp, so lexical order is capture order
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(n for n in os.listdir(self.directory) if not n.startswith("."))
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    secret = settings.profiling_secret
+    return bool(secret and token and hmac.compare_digest(token, secret))
+
+
+async def profile_middleware(request: Request, call_next):
+    """
+    Profile requests that carry a valid X-Profile-Token header.
+    Only registered when profiling is enabled, so it costs nothing otherwise.
+    """
+    if not is_authorized(request.headers.get(PROFILE_HEADER)):
+        return await call_next(request)
+    
+    label = f"{request.method} {request.url.path}"
+    started = time.perf_counter()
+    
+    if settings.profiling_mode == "cprofile":
+        # Deterministic, but only sees the event loop thread (async endpoints),
+        # including anything concurrent requests run on the loop meanwhile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+        profiler.create_stats()
+        data = marshal.dumps(profiler.stats)
+        extension = "prof"
+        scope = "event-loop"
+    else:
+        # Samples the loop plus threadpool threads marked for this request,
+        # so sync endpoints show up without other requests' threads
+        sampler = SamplingProfiler(settings.profiling_sample_interval)
+        token = _current_sampler.set(sampler)
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+            _current_sampler.reset(token)
+            for thread_id, owner in list(_thread_owners.items()):
+                if owner is sampler:
+                    _thread_owners.pop(thread_id, None)
+        data = sampler.dump()
+        extension = "collapsed"
+        scope = "request-threads+event-loop"
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    name = await run_in_threadpool(profile_store.save, label, extension, data)
+    response.headers["X-Profile-Id"] = name
+    response.headers["X-Profile-Scope"] = scope
+    response.headers["X-Profile-Duration-Ms"] = f"{elapsed_ms:.1f}"
+    return response
+
+
+# Singleton instance
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_files)
@@ -0,0 +1,146 @@
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..config import settings
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in "raise" mode when a request goes over its SQL budget"""
+
+
+class RequestQueryStats:
+    """Statements executed while serving one request"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+        self.violations: List[str] = []
+    
+    def record(self, shape: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[shape] += 1
+        
+        if self.count == settings.query_budget_max_statements + 1:
+            self._violate(f"{self.count} statements exceed budget of {settings.query_budget_max_statements}")
+        if self.shapes[shape] == settings.query_budget_max_repeats:
+            self._violate(f"statement repeated {self.shapes[shape]} times (possible N+1): {shape[:200]}")
+    
+    def _violate(self, message: str):
+        self.violations.append(message)
+        if settings.query_budget_action == "raise":
+            raise QueryBudgetExceeded(message)
+
+
+class SlowQueryLog:
+    """Keeps the N slowest statements seen by this process"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._heap: List[tuple] = []
+        self._counter = 0
+        self._lock = threading.Lock()
+    
+    def add(self, elapsed_ms: float, entry: Dict[str, Any]):
+        with self._lock:
+            self._counter += 1
+            item = (elapsed_ms, self._counter, entry)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif elapsed_ms > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+    
+    def threshold_ms(self) -> float:
+        """Statements faster than this would not make the list anyway"""
+        with self._lock:
+            if len(self._heap) < self.size:
+                return settings.slow_query_threshold_ms
+            return max(settings.slow_query_threshold_ms, self._heap[0][0])
+    
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+# Expanded IN lists vary in length, so collapse them to keep one shape per query
+_in_list = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+\s*\)")
+_whitespace = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _in_list.sub("(?)", _whitespace.sub(" ", statement).strip())
+
+
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """Run EXPLAIN for a slow SELECT on the same connection, bypassing events"""
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [" | ".join(str(col) for col in row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+    shape = statement_shape(statement)
+    
+    if elapsed_ms >= slow_query_log.threshold_ms():
+        slow_query_log.add(elapsed_ms, {
+            "statement": shape,
+            "duration_ms": round(elapsed_ms, 3),
+            "recorded_at": datetime.utcnow().isoformat(),
+            "explain": None if executemany else _explain(conn, statement, parameters)
+        })
+    
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(shape, elapsed_ms)
+
+
+def install(engine: Engine):
+    """Attach statement counting/timing to the engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    """Count statements and DB time per request and flag budget violations"""
+    stats = RequestQueryStats()
+    _current_stats.set(stats)
+    
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    label = f"{request.method} {getattr(route, 'path', request.url.path)}"
+    for violation in stats.violations:
+        print(f"Query budget warning [{label}]: {violation}")
+    
+    response.headers["X-Query-Count"] = str(stats.count)
+    response.headers["X-Query-Time-Ms"] = f"{stats.total_ms:.2f}"
+    return response
+
+
+# Singleton instance
+slow_query_log = SlowQueryLog(settings.slow_query_log_size)
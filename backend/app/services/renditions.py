@@ -0,0 +1,21 @@
+from typing import List
+from sqlalchemy.orm import Session
+from ..models.photo import Photo
+from ..models.photo_rendition import PhotoRendition
+from .image_proxy import square_url
+
+
+def attach_renditions(db: Session, photos: List[Photo]) -> List[Photo]:
+    """Load renditions for all photos in one query, plus their signed square crop URL"""
+    renditions_by_photo = {photo.id: [] for photo in photos}
+    if photos:
+        renditions = db.query(PhotoRendition).filter(
+            PhotoRendition.photo_id.in_(renditions_by_photo.keys())
+        ).order_by(PhotoRendition.width).all()
+        for rendition in renditions:
+            renditions_by_photo[rendition.photo_id].append(rendition)
+    
+    for photo in photos:
+        photo.renditions = renditions_by_photo[photo.id]
+        photo.square_url = square_url(photo.storage_key)
+    return photos
@@ -0,0 +1,110 @@
+"""
+Search across galleries, trips, trip image captions and film stocks.
+On MySQL this uses the FULLTEXT indexes (boolean mode, prefix matching);
+other databases (SQLite in development and benchmarks) fall back to LIKE.
+"""
+import re
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, case, func, literal, null, or_, select, union_all
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+from ..models.gallery import Gallery
+from ..models.trip import Trip
+from ..models.trip_image import TripImage
+from ..models.film_stock import FilmStock
+
+# InnoDB skips shorter tokens (innodb_ft_min_token_size) and treats these as operators
+MIN_TOKEN_LENGTH = 3
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+RESULT_TYPES = ("gallery", "trip", "trip_image", "film_stock")
+
+
+def tokenize(query: str) -> List[str]:
+    return re.findall(r"\w+", BOOLEAN_OPERATORS.sub(" ", query.lower()))
+
+
+def _sources():
+    """type: (model, searchable columns (same order as its FULLTEXT index), title, subtitle, parent id, image)"""
+    return {
+        "gallery": (Gallery, [Gallery.name, Gallery.description], Gallery.name, Gallery.description, null(), Gallery.cover_image_url),
+        "trip": (Trip, [Trip.name, Trip.destination, Trip.description], Trip.name, Trip.destination, null(), null()),
+        "trip_image": (TripImage, [TripImage.caption], TripImage.caption, null(), TripImage.trip_id, TripImage.thumbnail_url),
+        "film_stock": (FilmStock, [FilmStock.model], FilmStock.model, FilmStock.format, null(), null()),
+    }
+
+
+def _fulltext_score(columns, terms: List[str]):
+    # Every term must match; trailing * allows as-you-type prefixes
+    against = " ".join(f"+{t}*" for t in terms)
+    return match(*columns, against=against).in_boolean_mode()
+
+
+def _like_score(columns, terms: List[str]):
+    # One point per (term, column) hit, two when it is in the title column
+    score = literal(0.0)
+    for term in terms:
+        for index, column in enumerate(columns):
+            score = score + case((func.lower(column).contains(term, autoescape=True), 2.0 if index == 0 else 1.0), else_=0.0)
+    return score
+
+
+def _page(query: str, limit: int, offset: int, total: int = 0, results: Optional[list] = None) -> Dict[str, Any]:
+    return {"query": query, "total": total, "limit": limit, "offset": offset, "results": results or []}
+
+
+def search(
+    db: Session,
+    query: str,
+    types: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    terms = tokenize(query)
+    use_fulltext = db.bind.dialect.name == "mysql"
+    if use_fulltext:
+        # Terms InnoDB cannot index would make every row miss
+        terms = [t for t in terms if len(t) >= MIN_TOKEN_LENGTH]
+    if not terms:
+        return _page(query, limit, offset)
+    
+    selects = []
+    for result_type, (model, columns, title, subtitle, parent_id, image_url) in _sources().items():
+        if types and result_type not in types:
+            continue
+        if use_fulltext:
+            score = _fulltext_score(columns, terms)
+            condition = score > 0
+        else:
+            score = _like_score(columns, terms)
+            # All terms must appear somewhere, as in boolean mode
+            condition = and_(*(
+                or_(*(func.lower(c).contains(term, autoescape=True) for c in columns))
+                for term in terms
+            ))
+        
+        selects.append(
+            select(
+                literal(result_type).label("type"),
+                model.id.label("id"),
+                title.label("title"),
+                subtitle.label("subtitle"),
+                parent_id.label("parent_id"),
+                image_url.label("image_url"),
+                score.label("score")
+            ).where(condition)
+        )
+    
+    if not selects:
+        return _page(query, limit, offset)
+    
+    matches = union_all(*selects).subquery()
+    total = db.execute(select(func.count()).select_from(matches)).scalar()
+    rows = db.execute(
+        select(matches)
+        .order_by(matches.c.score.desc(), matches.c.type, matches.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    ).mappings().all()
+    
+    return _page(query, limit, offset, total, [dict(row) for row in rows])
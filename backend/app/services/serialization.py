@@ -0,0 +1,60 @@
+"""
+Fast path for large listing responses. Rows are fetched as plain tuples
+with Core select() of just the columns the response schema has (no ORM
+objects, no identity map, no per-row model validation) and turned into
+JSON bytes in one pass by a pydantic-core serializer. Large bodies are
+gzipped when the client accepts it.
+"""
+import gzip
+from typing import Any, Dict, Iterable, List, Sequence, Type
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from ..config import settings
+
+# Built once; dump_json on these runs entirely in pydantic-core
+JSON_LIST = TypeAdapter(List[Dict[str, Any]])
+JSON_OBJECT = TypeAdapter(Dict[str, Any])
+
+
+def fields_of(schema: Type[BaseModel], exclude: Iterable[str] = ()) -> List[str]:
+    """Response fields in schema order, so the fast path stays in step with the schema"""
+    return [name for name in schema.model_fields if name not in exclude]
+
+
+def columns_of(model, fields: Sequence[str]) -> list:
+    return [getattr(model, name) for name in fields]
+
+
+def to_columns(fields: Sequence[str], rows: Sequence[Sequence[Any]]) -> Dict[str, list]:
+    """Parallel arrays, one per field"""
+    if not rows:
+        return {name: [] for name in fields}
+    return {name: list(values) for name, values in zip(fields, zip(*rows))}
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """gzip (or *) with a non-zero q-value; "gzip;q=0" is a refusal, not a request"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    return qualities.get("*", 0) > 0
+
+
+def json_response(request: Request, content: Any, adapter: TypeAdapter = JSON_LIST) -> Response:
+    body = adapter.dump_json(content)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= settings.gzip_min_size and accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = gzip.compress(body, compresslevel=settings.gzip_level)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
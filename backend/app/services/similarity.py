@@ -0,0 +1,226 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from PIL import Image
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..config import settings
+
+
+# Hashes are taken from the level that fits this box, on upload and in the backfill
+HASH_SOURCE_SIZE = 200
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash as 16 hex chars; pass the HASH_SOURCE_SIZE level"""
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+
+if hasattr(int, "bit_count"):
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over 64-bit hashes under Hamming distance"""
+    
+    def __init__(self):
+        # node: [hash, {photo ids}, {distance: child node}]
+        self.root: Optional[list] = None
+    
+    def add(self, value: int, item_id: int):
+        if self.root is None:
+            self.root = [value, {item_id}, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].add(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, {item_id}, {}]
+                return
+            node = child
+    
+    def query(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """(distance, item_id) pairs within max_distance"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item_id) for item_id in node[1])
+            # Triangle inequality: only children in this band can match
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class SimilarityIndex:
+    """
+    In-memory BK-tree over all photo hashes, loaded lazily and kept current
+    on upload/delete. Each worker has its own copy, so the tree is also
+    compared with the database every few seconds to pick up other workers'
+    writes; that refresh runs in a background thread while requests keep
+    querying the previous tree.
+    """
+    
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._hashes: Dict[int, int] = {}
+        self._tree = BKTree()
+        self._removed: Set[int] = set()
+        self._checked_at = 0.0
+        self._loaded = False
+        # Local adds/removes made while a refresh is loading, replayed onto its result
+        self._pending: Optional[List[Tuple[int, Optional[int]]]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+    
+    def add(self, photo_id: int, phash: Optional[str]):
+        if not phash:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            value = int(phash, 16)
+            if self._pending is not None:
+                self._pending.append((photo_id, value))
+            self._add(photo_id, value)
+    
+    def remove(self, photo_ids: Iterable[int]):
+        with self._lock:
+            if not self._loaded:
+                return
+            for photo_id in photo_ids:
+                if self._pending is not None:
+                    self._pending.append((photo_id, None))
+                self._remove(photo_id)
+            # BK-trees cannot delete nodes; rebuild once tombstones pile up
+            if len(self._removed) > max(64, len(self._hashes) // 4):
+                self._rebuild(self._hashes)
+    
+    def _add(self, photo_id: int, value: int):
+        self._hashes[photo_id] = value
+        self._removed.discard(photo_id)
+        self._tree.add(value, photo_id)
+    
+    def _remove(self, photo_id: int):
+        if self._hashes.pop(photo_id, None) is not None:
+            self._removed.add(photo_id)
+    
+    def _rebuild(self, hashes: Dict[int, int]):
+        tree = BKTree()
+        for photo_id, value in hashes.items():
+            tree.add(value, photo_id)
+        self._hashes = hashes
+        self._tree = tree
+        self._removed = set()
+    
+    def _load(self, db: Session):
+        """Reload from the database if it no longer matches the tree"""
+        from ..models.photo import Photo
+        
+        with self._load_lock:
+            count, max_id = db.query(func.count(Photo.phash), func.max(Photo.id)).filter(
+                Photo.phash.isnot(None)
+            ).one()
+            with self._lock:
+                local_max = max(self._hashes) if self._hashes else None
+                if self._loaded and count == len(self._hashes) and max_id == local_max:
+                    return
+                self._pending = []
+            
+            try:
+                rows = db.query(Photo.id, Photo.phash).filter(Photo.phash.isnot(None)).all()
+                hashes = {photo_id: int(phash, 16) for photo_id, phash in rows}
+                tree = BKTree()
+                for photo_id, value in hashes.items():
+                    tree.add(value, photo_id)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            
+            with self._lock:
+                self._hashes, self._tree, self._removed = hashes, tree, set()
+                for photo_id, value in self._pending:
+                    if value is None:
+                        self._remove(photo_id)
+                    else:
+                        self._add(photo_id, value)
+                self._pending = None
+                self._loaded = True
+    
+    def _refresh(self):
+        from ..database import SessionLocal
+        
+        db = SessionLocal()
+        try:
+            self._load(db)
+        except Exception as e:
+            print(f"Similarity index refresh failed: {e}")
+        finally:
+            db.close()
+    
+    def _sync(self, db: Session):
+        if not self._loaded:
+            # Nothing to serve yet, so the first load happens in the request
+            self._load(db)
+            self._checked_at = time.monotonic()
+            return
+        
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+        threading.Thread(target=self._refresh, name="similarity-refresh", daemon=True).start()
+    
+    def similar(self, db: Session, photo_id: int, phash: str, max_distance: int, limit: int) -> List[Tuple[int, int]]:
+        """(distance, photo_id) of near-duplicates, closest first"""
+        self._sync(db)
+        with self._lock:
+            matches = [
+                (d, pid) for d, pid in self._tree.query(int(phash, 16), max_distance)
+                if pid != photo_id and pid not in self._removed
+            ]
+        matches.sort()
+        return matches[:limit]
+    
+    def duplicate_groups(self, db: Session, hashes: Dict[int, str], max_distance: int) -> List[List[int]]:
+        """Group the given photos into clusters of near-duplicates"""
+        self._sync(db)
+        parent = {photo_id: photo_id for photo_id in hashes}
+        
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        with self._lock:
+            for photo_id, phash in hashes.items():
+                for _, other_id in self._tree.query(int(phash, 16), max_distance):
+                    if other_id != photo_id and other_id in parent:
+                        parent[find(other_id)] = find(photo_id)
+        
+        groups: Dict[int, List[int]] = {}
+        for photo_id in hashes:
+            groups.setdefault(find(photo_id), []).append(photo_id)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+# Singleton instance
+similarity_index = SimilarityIndex(settings.similarity_refresh_seconds)
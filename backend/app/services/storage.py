@@ -1,11 +1,50 @@
 import boto3
 from botocore.exceptions import ClientError
+from starlette.concurrency import run_in_threadpool
 from PIL import Image
 from io import BytesIO
+import base64
 import hashlib
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List, Dict, Any, Union
 from ..config import settings
+from .image_metadata import extract_metadata, display_size, apply_orientation
+from .similarity import dhash, HASH_SOURCE_SIZE
+from .decode_scheduler import decode_scheduler, ImageTooLarge
+from . import profiling
+
+try:
+    # AVIF support comes from an optional Pillow plugin
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Keys are never reused for different content (and URLs carry a content
+# version), so browsers and CDNs can cache every object forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# name: (Pillow format, MIME type, file extension, encoder options)
+DERIVATIVE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg", {"quality": 85}),
+    "webp": ("WEBP", "image/webp", "webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", "image/avif", "avif", {"quality": 60}),
+}
+
+
+@dataclass
+class UploadedImage:
+    """Result of storing an original and its derivatives"""
+    original_url: str
+    thumbnail_url: Optional[str]
+    storage_key: str
+    renditions: List[Dict[str, Any]] = field(default_factory=list)
+    # Column values gathered during the derivative pass (width, height, placeholder, ...)
+    image_info: Dict[str, Any] = field(default_factory=dict)
+    # Photo-only columns: EXIF metadata (taken_at, camera, lens, ISO, orientation) and phash
+    image_metadata: Dict[str, Any] = field(default_factory=dict)
 
 
 class StorageService:
@@ -15,12 +54,28 @@ class StorageService:
                 's3',
                 aws_access_key_id=settings.aws_access_key_id,
                 aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region
+                region_name=settings.aws_region,
+                endpoint_url=settings.aws_endpoint_url
             )
             self.bucket_name = settings.aws_bucket_name
         else:
             self.s3_client = None
             self.bucket_name = None
+        
+        Image.init()
+        self.formats = []
+        for name in settings.derivative_formats:
+            if name in DERIVATIVE_FORMATS and DERIVATIVE_FORMATS[name][0] in Image.SAVE:
+                self.formats.append(name)
+            else:
+                print(f"Derivative format '{name}' is not supported by this Pillow build, skipping")
+        if "jpeg" not in self.formats:
+            self.formats.insert(0, "jpeg")
+        
+        # Pillow releases the GIL while encoding, so formats/sizes encode in parallel
+        self.encoder_pool = ThreadPoolExecutor(
+            max_workers=settings.encoder_threads, thread_name_prefix="image-encoder"
+        )
     
     def generate_unique_filename(self, original_filename: str) -> str:
         """Generate unique filename using timestamp and hash"""
@@ -29,106 +84,327 @@ class StorageService:
         ext = original_filename.split('.')[-1] if '.' in original_filename else 'jpg'
         return f"{timestamp}_{file_hash}.{ext}"
     
-    def create_thumbnail(self, image_data: bytes, max_size: Tuple[int, int] = (400, 400)) -> bytes:
-        """Create thumbnail from image data"""
+    def base_url(self) -> str:
+        """Where objects are served from: a CDN domain when configured, else the bucket"""
+        if settings.public_base_url:
+            return settings.public_base_url.rstrip('/')
+        return f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com"
+    
+    def public_url(self, key: str, version: Optional[str] = None) -> str:
+        """Public URL of an object; `version` (from its ETag) changes whenever the content does"""
+        url = f"{self.base_url()}/{key}"
+        return f"{url}?v={version}" if version else url
+    
+    def content_version(self, etag: str) -> str:
+        """Short content version from an S3 ETag (MD5 for simple uploads, '<md5>-<parts>' for multipart)"""
+        return etag.strip('"').replace('-', '')[:12]
+    
+    def thumbnail_key(self, storage_key: str) -> str:
+        return storage_key.replace('/', '/thumb_', 1)
+    
+    def rendition_key(self, storage_key: str, size: int, format: str = "jpeg") -> str:
+        """e.g. galleries/1/renditions/1200/20240101_120000_abcd1234.webp"""
+        directory, _, filename = storage_key.rpartition('/')
+        stem = filename.rsplit('.', 1)[0]
+        return f"{directory}/renditions/{size}/{stem}.{DERIVATIVE_FORMATS[format][2]}"
+    
+    def tile_prefix(self, storage_key: str) -> str:
+        """e.g. galleries/1/tiles/20240101_120000_abcd1234/ (DZI manifest and tiles live here)"""
+        directory, _, filename = storage_key.rpartition('/')
+        stem = filename.rsplit('.', 1)[0]
+        return f"{directory}/tiles/{stem}/"
+    
+    def _image_source(self, source: Union[bytes, str]):
+        """Sources are either bytes in memory or the path of a file on disk"""
+        return source if isinstance(source, str) else BytesIO(source)
+    
+    def detect_content_type(self, data: Union[bytes, str], filename: str = "") -> str:
+        """MIME type from the file's own header, falling back to its extension"""
         try:
-            image = Image.open(BytesIO(image_data))
+            with Image.open(self._image_source(data)) as image:
+                content_type = Image.MIME.get(image.format)
+                if content_type:
+                    return content_type
+        except Exception:
+            pass
+        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    
+    def decode_cost(self, source: Union[bytes, str], draft_size: Optional[int] = None) -> int:
+        """
+        Memory a decode will need, from the header alone. Raises ImageTooLarge
+        for decompression bombs; anything Pillow cannot open costs nothing
+        (it is stored without derivatives).
+        """
+        try:
+            image = Image.open(self._image_source(source))
+        except Image.DecompressionBombError as e:
+            raise ImageTooLarge(str(e))
+        except Exception:
+            return 0
+        with image:
+            return decode_scheduler.estimate(image, draft_size)
+    
+    def _encode(self, image: Image.Image, format: str = "jpeg") -> bytes:
+        pil_format, _, _, options = DERIVATIVE_FORMATS[format]
+        output = BytesIO()
+        image.save(output, format=pil_format, **options)
+        return output.getvalue()
+    
+    def _placeholder_info(self, image: Image.Image) -> Dict[str, Any]:
+        """Inline micro-JPEG and dominant colour, from an already small level"""
+        micro = image.copy()
+        micro.thumbnail((16, 16), Image.Resampling.BOX)
+        output = BytesIO()
+        micro.save(output, format='JPEG', quality=40, optimize=True)
+        
+        average = image.convert('RGB').resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+        return {
+            "placeholder": "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode(),
+            "dominant_color": "#{:02x}{:02x}{:02x}".format(*average)
+        }
+    
+    def downscale(self, image: Image.Image, size: int) -> Image.Image:
+        """New image fitting in size x size (the source stays intact for encoders still reading it)"""
+        ratio = size / max(image.size)
+        if ratio >= 1:
+            return image
+        target = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+        return image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    
+    def create_derivatives(
+        self,
+        image_data: Union[bytes, str],
+        thumbnail_size: int = 400,
+        rendition_sizes: Optional[List[int]] = None
+    ) -> Tuple[bytes, List[Dict[str, Any]], Dict[str, Any], Dict[str, Any]]:
+        """
+        Create the JPEG thumbnail and every rendition, in every configured
+        format, from a single decode.
+        Returns: (thumbnail_data, [{size, format, width, height, data}, ...], image_info, image_metadata)
+        """
+        rendition_sizes = sorted(set(rendition_sizes or []), reverse=True)
+        targets = sorted(set(rendition_sizes) | {thumbnail_size, HASH_SOURCE_SIZE}, reverse=True)
+        
+        image = Image.open(self._image_source(image_data))
+        image_metadata = extract_metadata(image)
+        image_info = display_size(image, image_metadata["orientation"])
+        
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, so the
+        # full-resolution bitmap is never materialized for large scans
+        image.draft('RGB', (targets[0], targets[0]))
+        
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        # Decode now, before several encoder threads read the same image
+        image.load()
+        # Rotated scans would otherwise come out sideways
+        image = apply_orientation(image, image_metadata["orientation"])
+        
+        thumbnail_future = None
+        pending = []
+        previous_size = None
+        
+        # Downscale successively from the largest level instead of from the
+        # original, handing each level to the encoder pool as soon as it exists
+        encode = profiling.bind(self._encode)
+        for size in targets:
+            image = self.downscale(image, size)
             
-            # Convert RGBA to RGB if needed
-            if image.mode == 'RGBA':
-                image = image.convert('RGB')
+            if size in rendition_sizes and image.size != previous_size:
+                for format in self.formats:
+                    rendition = {
+                        "size": size,
+                        "format": format,
+                        "width": image.width,
+                        "height": image.height
+                    }
+                    pending.append((rendition, self.encoder_pool.submit(encode, image, format)))
+                previous_size = image.size
             
-            # Create thumbnail maintaining aspect ratio
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            if size == thumbnail_size:
+                thumbnail_future = self.encoder_pool.submit(encode, image, "jpeg")
             
-            # Save to bytes
-            output = BytesIO()
-            image.save(output, format='JPEG', quality=85)
-            return output.getvalue()
+            if size == HASH_SOURCE_SIZE:
+                image_metadata["phash"] = dhash(image)
+        
+        # The loop ends on the smallest level, which is plenty for a placeholder
+        image_info.update(self._placeholder_info(image))
+        
+        renditions = []
+        for rendition, future in pending:
+            rendition["data"] = future.result()
+            renditions.append(rendition)
+        
+        return thumbnail_future.result(), renditions, image_info, image_metadata
+    
+    def create_thumbnail(self, image_data: bytes, max_size: Tuple[int, int] = (400, 400)) -> bytes:
+        """Create thumbnail from image data"""
+        cost = self.decode_cost(image_data, max(max_size))
+        try:
+            with decode_scheduler.admit(cost):
+                thumbnail_data, _, _, _ = self.create_derivatives(image_data, thumbnail_size=max(max_size))
+            return thumbnail_data
+        except Image.DecompressionBombError as e:
+            raise ImageTooLarge(str(e))
         except Exception as e:
             print(f"Error creating thumbnail: {e}")
             return image_data
     
     async def upload_image(
         self, 
-        file_data: bytes, 
+        file_data: Union[bytes, str], 
+        storage_path: str,
+        create_thumb: bool = True,
+        rendition_sizes: Optional[List[int]] = None
+    ) -> UploadedImage:
+        """
+        Upload image and its derivatives to S3.
+        Decoding and S3 calls block, so they run in the threadpool and
+        never stall the event loop.
+        """
+        return await run_in_threadpool(
+            self.store_image, file_data, storage_path, create_thumb, rendition_sizes
+        )
+    
+    def store_image(
+        self,
+        file_data: Union[bytes, str],
         storage_path: str,
-        create_thumb: bool = True
-    ) -> Tuple[str, Optional[str], str]:
+        create_thumb: bool = True,
+        rendition_sizes: Optional[List[int]] = None
+    ) -> UploadedImage:
         """
-        Upload image to S3
-        Returns: (original_url, thumbnail_url, storage_key)
+        Blocking implementation of upload_image. file_data may also be the
+        path of a file on disk (resumable uploads), which is streamed to S3
+        as a multipart upload instead of being read into memory.
+        Nothing is stored until the decode has been admitted, so a rejected
+        upload (ImageTooLarge, DecodeBudgetExceeded) leaves no objects behind.
         """
         if not self.s3_client or not self.bucket_name:
             raise Exception("S3 not configured")
         
+        cost = 0
+        if create_thumb or rendition_sizes:
+            cost = self.decode_cost(file_data, max([400] + list(rendition_sizes or [])))
+        with decode_scheduler.admit(cost):
+            return self._store_image(file_data, storage_path, create_thumb, rendition_sizes)
+    
+    def _store_image(
+        self,
+        file_data: Union[bytes, str],
+        storage_path: str,
+        create_thumb: bool,
+        rendition_sizes: Optional[List[int]]
+    ) -> UploadedImage:
         try:
             # Upload original image
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=storage_path,
-                Body=file_data,
-                ContentType='image/jpeg'
+            content_type = self.detect_content_type(file_data, storage_path)
+            if isinstance(file_data, str):
+                version = self.upload_file(file_data, storage_path, content_type)
+            else:
+                version = self.put_object(storage_path, file_data, content_type)
+            
+            uploaded = UploadedImage(
+                original_url=self.public_url(storage_path, version),
+                thumbnail_url=None,
+                storage_key=storage_path
             )
             
-            original_url = f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{storage_path}"
+            if not create_thumb and not rendition_sizes:
+                return uploaded
             
-            # Create and upload thumbnail
-            thumbnail_url = None
-            if create_thumb:
-                thumbnail_data = self.create_thumbnail(file_data)
-                thumb_path = storage_path.replace('/', '/thumb_', 1)
-                
-                self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=thumb_path,
-                    Body=thumbnail_data,
-                    ContentType='image/jpeg'
-                )
-                
-                thumbnail_url = f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{thumb_path}"
+            try:
+                (
+                    thumbnail_data, renditions, uploaded.image_info, uploaded.image_metadata
+                ) = self.create_derivatives(file_data, rendition_sizes=rendition_sizes)
+            except Image.DecompressionBombError as e:
+                self.delete(storage_path)
+                raise ImageTooLarge(str(e))
+            except Exception as e:
+                print(f"Error creating thumbnail: {e}")
+                # Fall back to the original as thumbnail, unless it is a large file on disk
+                thumbnail_data = None if isinstance(file_data, str) else file_data
+                renditions = []
+            
+            # Upload thumbnail
+            if create_thumb and thumbnail_data is not None:
+                thumb_path = self.thumbnail_key(storage_path)
+                version = self.put_object(thumb_path, thumbnail_data, 'image/jpeg')
+                uploaded.thumbnail_url = self.public_url(thumb_path, version)
+            
+            # Upload renditions
+            for rendition in renditions:
+                key = self.rendition_key(storage_path, rendition["size"], rendition["format"])
+                data = rendition.pop("data")
+                version = self.put_object(key, data, DERIVATIVE_FORMATS[rendition["format"]][1])
+                rendition.update(storage_key=key, url=self.public_url(key, version), file_size=len(data))
+                uploaded.renditions.append(rendition)
             
-            return original_url, thumbnail_url, storage_path
+            return uploaded
             
         except ClientError as e:
             print(f"Error uploading to S3: {e}")
             raise Exception(f"Failed to upload image: {str(e)}")
     
-    def delete(self, storage_key: str) -> bool:
-        """Delete file from S3"""
+    def put_object(self, key: str, data: bytes, content_type: str) -> str:
+        """Store bytes with long-lived cache headers; returns the content version"""
+        response = self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=CACHE_CONTROL
+        )
+        return self.content_version(response['ETag'])
+    
+    def upload_file(self, path: str, key: str, content_type: str) -> str:
+        """Stream a local file to S3 (managed multipart upload); returns the content version"""
+        self.s3_client.upload_file(
+            path, self.bucket_name, key,
+            ExtraArgs={'ContentType': content_type, 'CacheControl': CACHE_CONTROL}
+        )
+        # The managed transfer does not return the ETag
+        return self.content_version(
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=key)['ETag']
+        )
+    
+    def download_file(self, storage_key: str, path: str):
+        """Stream an object to a local file (multipart, never fully in memory)"""
+        self.s3_client.download_file(self.bucket_name, storage_key, path)
+    
+    def open_object(self, storage_key: str) -> Tuple[Any, int]:
+        """Start a GET and return (streaming body, content length) without reading the body"""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=storage_key)
+        return response["Body"], response["ContentLength"]
+    
+    def read_range(self, storage_key: str, length: Optional[int] = None) -> bytes:
+        """Read the first `length` bytes of an object (the whole object when None)"""
+        params = {"Bucket": self.bucket_name, "Key": storage_key}
+        if length:
+            params["Range"] = f"bytes=0-{length - 1}"
+        return self.s3_client.get_object(**params)["Body"].read()
+    
+    def delete(self, storage_key: str, rendition_keys: Optional[List[str]] = None) -> bool:
+        """Delete file, its thumbnail and the given rendition keys from S3"""
         if not self.s3_client or not self.bucket_name:
             return False
         
-        try:
-            # Delete original
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=storage_key
-            )
-            
-            # Delete thumbnail
-            thumb_key = storage_key.replace('/', '/thumb_', 1)
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=thumb_key
-            )
-            
-            return True
-        except ClientError as e:
-            print(f"Error deleting from S3: {e}")
-            return False
+        return self.delete_batch([storage_key], rendition_keys)
     
-    def delete_batch(self, storage_keys: list) -> bool:
-        """Delete multiple files from S3"""
+    def delete_batch(self, storage_keys: list, rendition_keys: Optional[List[str]] = None) -> bool:
+        """
+        Delete multiple files and their thumbnails from S3.
+        Rendition keys come from the recorded photo_renditions rows, since the
+        configured sizes and formats may have changed since they were written.
+        """
         if not self.s3_client or not self.bucket_name or not storage_keys:
             return False
         
         try:
             # Prepare objects for deletion
             objects = [{'Key': key} for key in storage_keys]
-            # Add thumbnails
-            thumb_objects = [{'Key': key.replace('/', '/thumb_', 1)} for key in storage_keys]
-            objects.extend(thumb_objects)
+            objects.extend({'Key': self.thumbnail_key(key)} for key in storage_keys)
+            objects.extend({'Key': key} for key in rendition_keys or [])
             
             # Delete in batches of 1000 (S3 limit)
             for i in range(0, len(objects), 1000):
@@ -142,8 +418,27 @@ class StorageService:
         except ClientError as e:
             print(f"Error batch deleting from S3: {e}")
             return False
+    
+    def delete_prefix(self, prefix: str) -> bool:
+        """Delete every object under a prefix (e.g. a photo's tile pyramid)"""
+        if not self.s3_client or not self.bucket_name:
+            return False
+        
+        try:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            # Pages hold at most 1000 keys, the delete_objects limit
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+                if objects:
+                    self.s3_client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={'Objects': objects}
+                    )
+            return True
+        except ClientError as e:
+            print(f"Error deleting prefix {prefix} from S3: {e}")
+            return False
 
 
 # Singleton instance
 storage_service = StorageService()
-
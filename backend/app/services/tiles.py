@@ -0,0 +1,198 @@
+"""
+Deep Zoom (DZI) tile pyramids for high-resolution scans. The viewer then
+fetches only the 256px tiles in view instead of the whole original.
+"""
+import math
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Union
+from xml.etree import ElementTree
+from PIL import Image
+from ..config import settings
+from ..database import SessionLocal
+from ..models.photo import Photo
+from .image_metadata import extract_metadata, apply_orientation
+from .storage import storage_service, DERIVATIVE_FORMATS
+from .decode_scheduler import decode_scheduler, BYTES_PER_PIXEL
+
+DZI_NAMESPACE = "http://schemas.microsoft.com/deepzoom/2008"
+
+
+def needs_tiles(width: Optional[int], height: Optional[int]) -> bool:
+    """Only scans too large to view comfortably as a single image get a pyramid"""
+    return settings.tiles_enabled and max(width or 0, height or 0) >= settings.tile_min_dimension
+
+
+def manifest_key(storage_key: str) -> str:
+    return f"{storage_service.tile_prefix(storage_key)}image.dzi"
+
+
+def build_pyramid(
+    image: Image.Image,
+    emit: Callable[[int, int, int, Image.Image], None],
+    tile_size: int,
+    level_done: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Cut an image into DZI levels, full resolution first, calling
+    emit(level, column, row, tile) for each tile. Every level is walked in
+    strips one tile high: each strip is cut into tiles and its half-size
+    copy pasted into the next level, so only the current level and the
+    (quarter-size) next one are ever held at once. level_done(level) is
+    called once a level has been dropped.
+    Returns the highest level number.
+    """
+    max_level = math.ceil(math.log2(max(image.size))) if max(image.size) > 1 else 0
+    level = max_level
+    
+    while image is not None:
+        width, height = image.size
+        # Level dimensions are ceil(size / 2), matching reduce(2) on each strip
+        next_level = Image.new(image.mode, ((width + 1) // 2, (height + 1) // 2)) if level > 0 else None
+        
+        for row, top in enumerate(range(0, height, tile_size)):
+            strip = image.crop((0, top, width, min(top + tile_size, height)))
+            for column, left in enumerate(range(0, width, tile_size)):
+                emit(level, column, row, strip.crop((left, 0, min(left + tile_size, width), strip.height)))
+            if next_level is not None:
+                # tile_size is even, so strips start on even rows and halve cleanly
+                next_level.paste(strip.reduce(2), (0, top // 2))
+        
+        image = next_level
+        if level_done:
+            level_done(level)
+        level -= 1
+    
+    return max_level
+
+
+class TileService:
+    def __init__(self):
+        self.format = settings.tile_format if settings.tile_format in storage_service.formats else "jpeg"
+    
+    def build(self, storage_key: str, source: Optional[Union[bytes, str]] = None) -> str:
+        """
+        Generate and upload the pyramid for an original (bytes, a local path,
+        or None to download it from S3). Returns the manifest URL.
+        """
+        temp_path = None
+        if source is None:
+            handle, temp_path = tempfile.mkstemp(suffix=".tiles")
+            os.close(handle)
+            storage_service.download_file(storage_key, temp_path)
+            source = temp_path
+        
+        try:
+            return self._build(storage_key, source)
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+    
+    def _build(self, storage_key: str, source: Union[bytes, str]) -> str:
+        prefix = storage_service.tile_prefix(storage_key)
+        _, content_type, extension, _ = DERIVATIVE_FORMATS[self.format]
+        
+        image = Image.open(storage_service._image_source(source))
+        # Full resolution, its rotated copy and the half-size next level
+        cost = decode_scheduler.estimate(image, copies=3)
+        
+        # Background work waits for memory budget rather than failing
+        with decode_scheduler.admit(cost, block=True) as reservation:
+            orientation = extract_metadata(image)["orientation"]
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image = apply_orientation(image, orientation)
+            width, height = image.size
+            max_level = math.ceil(math.log2(max(width, height))) if max(width, height) > 1 else 0
+            
+            def level_done(level: int):
+                if level == max_level:
+                    # The full-resolution bitmap is gone; the half-size level left
+                    # and its own next level take about a third of one copy
+                    reservation.shrink(width * height * BYTES_PER_PIXEL // 3)
+            
+            def upload(key: str, tile: Image.Image):
+                storage_service.put_object(key, storage_service._encode(tile, self.format), content_type)
+            
+            # Bound the tiles waiting to be encoded/uploaded so they never pile up in memory
+            in_flight = []
+            with ThreadPoolExecutor(
+                max_workers=settings.tile_upload_concurrency, thread_name_prefix="tile-upload"
+            ) as pool:
+                def emit(level: int, column: int, row: int, tile: Image.Image):
+                    key = f"{prefix}image_files/{level}/{column}_{row}.{extension}"
+                    in_flight.append(pool.submit(upload, key, tile))
+                    if len(in_flight) >= settings.tile_upload_concurrency * 4:
+                        in_flight.pop(0).result()
+                
+                # Handed over without a local reference, so the full-resolution
+                # bitmap is freed as soon as build_pyramid moves past it
+                levels = [image]
+                del image
+                build_pyramid(levels.pop(), emit, settings.tile_size, level_done)
+                for future in in_flight:
+                    future.result()
+        
+        # Written last, so a manifest only ever points at a complete pyramid
+        manifest = ElementTree.Element("Image", {
+            "xmlns": DZI_NAMESPACE,
+            "Format": extension,
+            "Overlap": "0",
+            "TileSize": str(settings.tile_size)
+        })
+        ElementTree.SubElement(manifest, "Size", {"Width": str(width), "Height": str(height)})
+        key = manifest_key(storage_key)
+        version = storage_service.put_object(
+            key,
+            ElementTree.tostring(manifest, encoding="utf-8", xml_declaration=True),
+            "application/xml"
+        )
+        return storage_service.public_url(key, version)
+    
+    def tile_source(self, storage_key: str) -> dict:
+        """
+        The manifest as an inline OpenSeadragon tile source, so the viewer
+        does not have to fetch the XML cross-origin from the bucket.
+        """
+        manifest = ElementTree.fromstring(storage_service.read_range(manifest_key(storage_key)))
+        size = manifest.find(f"{{{DZI_NAMESPACE}}}Size")
+        return {
+            "Image": {
+                "xmlns": DZI_NAMESPACE,
+                "Url": storage_service.public_url(f"{storage_service.tile_prefix(storage_key)}image_files/"),
+                "Format": manifest.get("Format"),
+                "Overlap": manifest.get("Overlap"),
+                "TileSize": manifest.get("TileSize"),
+                "Size": {"Width": size.get("Width"), "Height": size.get("Height")}
+            }
+        }
+    
+    def generate_for_photo(self, photo_id: int, source: Optional[Union[bytes, str]] = None):
+        """Background task: build a photo's pyramid and record its manifest"""
+        db = SessionLocal()
+        try:
+            photo = db.query(Photo).filter(Photo.id == photo_id).first()
+            if not photo or not photo.storage_key:
+                return
+            storage_key = photo.storage_key
+            # Release the connection while tiling, which can take a while
+            db.rollback()
+            
+            manifest_url = self.build(storage_key, source)
+            
+            photo = db.query(Photo).filter(Photo.id == photo_id).first()
+            if photo is None:
+                # Deleted while we were tiling
+                storage_service.delete_prefix(storage_service.tile_prefix(storage_key))
+                return
+            photo.tile_manifest_url = manifest_url
+            db.commit()
+        except Exception as e:
+            print(f"Error generating tiles for photo {photo_id}: {e}")
+        finally:
+            db.close()
+
+
+# Singleton instance
+tile_service = TileService()
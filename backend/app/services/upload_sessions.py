@@ -0,0 +1,55 @@
+import os
+import secrets
+import shutil
+from datetime import datetime
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.upload_session import UploadSession
+
+
+def part_path(upload_id: str) -> str:
+    """Chunks of a resumable upload are appended to this local file"""
+    return os.path.join(settings.upload_tmp_dir, f"{upload_id}.part")
+
+
+def chunk_path(upload_id: str) -> str:
+    """Where one PATCH streams its chunk before it is appended to the part file"""
+    return os.path.join(settings.upload_tmp_dir, f"{upload_id}.{secrets.token_hex(8)}.chunk")
+
+
+def append_chunk(upload_id: str, chunk: str, offset: int):
+    """Write a received chunk into the part file at offset, dropping anything after it"""
+    with open(part_path(upload_id), "r+b") as dest, open(chunk, "rb") as src:
+        dest.seek(offset)
+        shutil.copyfileobj(src, dest)
+        dest.truncate()
+
+
+def remove_chunk(chunk: str):
+    try:
+        os.remove(chunk)
+    except FileNotFoundError:
+        pass
+
+
+def remove_part(upload_id: str):
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def discard(db: Session, upload: UploadSession):
+    """Remove a session and its partial file (caller commits)"""
+    remove_part(upload.id)
+    db.delete(upload)
+
+
+def cleanup_expired(db: Session) -> int:
+    """Drop sessions nobody resumed in time"""
+    expired = db.query(UploadSession).filter(UploadSession.expires_at < datetime.utcnow()).all()
+    for upload in expired:
+        discard(db, upload)
+    if expired:
+        db.commit()
+    return len(expired)
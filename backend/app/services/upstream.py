@@ -0,0 +1,126 @@
+"""
+Calls to third-party HTTP APIs that must not hold up our own responses:
+one pooled requests.Session, a circuit breaker per upstream and a timeout
+that adapts to how fast the upstream has recently been answering.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from ..config import settings
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream failed, timed out, or its breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens when the failure rate over the last `window` calls reaches the
+    threshold, then rejects calls for `cooldown` seconds. After that one
+    probe is let through (half-open): success closes it, failure reopens it.
+    """
+    
+    def __init__(self, window: int, min_calls: int, failure_rate: float, cooldown: float):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True
+            return False
+    
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == "half_open":
+                if success:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+    
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+
+class Upstream:
+    """One third-party API: its breaker and its recent latency"""
+    
+    # Timeout is this many times the smoothed latency, within the configured bounds
+    TIMEOUT_FACTOR = 4
+    
+    def __init__(self, name: str, session: requests.Session):
+        self.name = name
+        self.session = session
+        self.breaker = CircuitBreaker(
+            window=settings.upstream_breaker_window,
+            min_calls=settings.upstream_breaker_min_calls,
+            failure_rate=settings.upstream_breaker_failure_rate,
+            cooldown=settings.upstream_breaker_cooldown_seconds
+        )
+        self._latency: Optional[float] = None  # exponentially weighted, seconds
+        self._lock = threading.Lock()
+    
+    def timeout(self) -> float:
+        if self._latency is None:
+            return settings.upstream_timeout_max
+        return min(settings.upstream_timeout_max, max(settings.upstream_timeout_min, self._latency * self.TIMEOUT_FACTOR))
+    
+    def warm(self, url: str):
+        """Open a pooled connection to the host; the answer itself does not matter"""
+        self.session.head(url, timeout=settings.upstream_timeout_max)
+    
+    def get_json(self, url: str, params: Dict[str, Any]) -> Optional[Any]:
+        """
+        Parsed JSON body, or None for a 4xx answer (the request, not the
+        upstream, is at fault). Raises UpstreamUnavailable otherwise.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout())
+            if response.status_code >= 500:
+                raise UpstreamUnavailable(f"{self.name}: HTTP {response.status_code}")
+            body = response.json() if response.status_code == 200 else None
+        except Exception as e:
+            self.breaker.record(False)
+            if isinstance(e, UpstreamUnavailable):
+                raise
+            raise UpstreamUnavailable(f"{self.name}: {e}") from e
+        
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._latency = elapsed if self._latency is None else 0.8 * self._latency + 0.2 * elapsed
+        self.breaker.record(True)
+        return body
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """A Session whose connection pool fits pool_size concurrent calls per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,42 @@
+"""
+Startup warm-up, run by each worker before it accepts traffic: fill the
+database pool, open the S3 connection and the weather upstream connections,
+so the first requests do not pay for connection setup. Failures are logged,
+not fatal; the worker still starts and connects lazily.
+"""
+from sqlalchemy import text
+from ..config import settings
+from ..database import engine
+from .storage import storage_service
+from .weather import weather_service
+
+
+def warm_database():
+    # Hold several connections at once, so the pool keeps that many open
+    size = getattr(engine.pool, "size", lambda: 1)()
+    connections = []
+    try:
+        for _ in range(min(size, settings.db_warm_connections)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_storage():
+    if storage_service.s3_client and storage_service.bucket_name:
+        storage_service.s3_client.head_bucket(Bucket=storage_service.bucket_name)
+
+
+def warm_up():
+    for name, step in (
+        ("database", warm_database),
+        ("storage", warm_storage),
+        ("weather upstreams", weather_service.warm_connections),
+    ):
+        try:
+            step()
+        except Exception as e:
+            print(f"Error warming {name}: {e}")
@@ -1,8 +1,134 @@
-import requests
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Hashable, Tuple
 import pytz
 from timezonefinder import TimezoneFinder
+from ..config import settings
+from .upstream import Upstream, create_session
+
+_MISSING = object()
+
+# Sunrise and sunset for a given place and day do not change
+SUN_TIMES_TTL = 24 * 3600
+# "No such place" / "no data for that day" answers are asked again after this long
+EMPTY_TTL = 3600
+
+
+class SharedStore:
+    """
+    Cache entries as files in a local directory, so every worker process on
+    the host reads what any of them (usually the warmer) fetched. Each file
+    holds one JSON value and its mtime is the entry's expiry.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+    
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+    
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """(expires_at, value), or None when no worker has stored it"""
+        path = self._path(key)
+        try:
+            expires_at = os.stat(path).st_mtime
+            with open(path) as f:
+                return expires_at, json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, key: Hashable, expires_at: float, value: Any):
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.utime(temp_path, (expires_at, expires_at))
+            # Readers see the old entry or the new one, never half a file
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing shared weather cache: {e}")
+    
+    def prune(self, grace: float):
+        """Remove entries that expired more than `grace` seconds ago"""
+        cutoff = time.time() - grace
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+class TTLCache:
+    """
+    Thread-safe cache. Entries are fresh for their TTL and may be served
+    stale for stale_ttl after that; the oldest go first when full. With a
+    shared store, entries are written through to it and read back when the
+    process has nothing fresh, so workers see each other's fetches.
+    """
+    
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 1024, shared: Optional[SharedStore] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        # Wall-clock expiry, comparable across processes through the shared store
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def lookup(self, key: Hashable) -> Tuple[Any, bool]:
+        """(value or _MISSING, whether it is still fresh)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        
+        if self.shared is not None and (entry is None or now >= entry[0]):
+            # Another worker may have fetched it since
+            found = self.shared.get(key)
+            if found is not None and (entry is None or found[0] > entry[0]):
+                entry = found
+                with self._lock:
+                    self._store(key, entry)
+        
+        if entry is None:
+            return _MISSING, False
+        expires_at, value = entry
+        if now >= expires_at + self.stale_ttl:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            return _MISSING, False
+        return value, now < expires_at
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        entry = (time.time() + (self.ttl if ttl is None else ttl), value)
+        with self._lock:
+            self._store(key, entry)
+        if self.shared is not None:
+            self.shared.put(key, *entry)
+    
+    def _store(self, key: Hashable, entry: Tuple[float, Any]):
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def coordinates_key(latitude: float, longitude: float) -> Tuple[float, float]:
+    # ~100 m; destinations that geocode to the same place share forecasts
+    return (round(latitude, 3), round(longitude, 3))
 
 
 class WeatherService:
@@ -13,143 +139,247 @@ class WeatherService:
         self.weather_url = "https://api.open-meteo.com/v1/forecast"
         self.sunrise_url = "https://api.sunrise-sunset.org/json"
         self.tf = TimezoneFinder()
+        
+        # Each upstream has its own breaker: sunrise-sunset.org being down
+        # does not stop forecasts (open-meteo geocoding and forecast are
+        # separate services too)
+        session = create_session(settings.weather_fetch_concurrency * 2)
+        self.geocoding = Upstream("open-meteo geocoding", session)
+        self.forecast = Upstream("open-meteo forecast", session)
+        self.sunrise = Upstream("sunrise-sunset.org", session)
+        
+        stale_ttl = settings.weather_stale_hours * 3600
+        self._stale_ttl = stale_ttl
+        self._shared = None
+        if settings.weather_shared_cache_dir:
+            self._shared = {
+                name: SharedStore(os.path.join(settings.weather_shared_cache_dir, name))
+                for name in ("coordinates", "weather", "sun_times")
+            }
+        shared = self._shared or {}
+        self._coordinates = TTLCache(settings.weather_geocode_ttl_hours * 3600, stale_ttl, shared=shared.get("coordinates"))
+        self._weather = TTLCache(settings.weather_cache_ttl_minutes * 60, stale_ttl, shared=shared.get("weather"))
+        self._sun_times = TTLCache(SUN_TIMES_TTL, stale_ttl, shared=shared.get("sun_times"))
+        
+        # Every upstream request takes a slot, so batch fan-out, the sun times
+        # lookups nested in it and background refreshes together stay within
+        # weather_fetch_concurrency requests in flight
+        self._upstream_slots = threading.BoundedSemaphore(settings.weather_fetch_concurrency)
+        self._fanout = ThreadPoolExecutor(max_workers=settings.weather_fetch_concurrency, thread_name_prefix="weather")
+        # Background revalidation of stale entries, at most one per key
+        self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-refresh")
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
     
-    def get_coordinates(self, location: str) -> Optional[Dict[str, float]]:
-        """Get latitude and longitude from location name"""
+    def prune_shared(self):
+        """Drop shared entries too old to be served even stale (the warmer calls this)"""
+        for store in (self._shared or {}).values():
+            store.prune(self._stale_ttl)
+    
+    def warm_connections(self):
+        self.geocoding.warm(self.geocoding_url)
+        self.forecast.warm(self.weather_url)
+        self.sunrise.warm(self.sunrise_url)
+    
+    def _cached(self, cache: TTLCache, key: Hashable, fetch: Callable[[], Any], refresh: bool = False) -> Any:
+        """
+        Stale-while-revalidate. A fresh entry is returned as is; a stale one
+        is returned at once (dicts marked "stale": True) while a background
+        refresh replaces it. Only misses wait for the upstream, and when
+        that fails the last good answer is still preferred to nothing.
+        """
+        if not refresh:
+            value, fresh = cache.lookup(key)
+            if value is not _MISSING:
+                if not fresh:
+                    self._revalidate(cache, key, fetch)
+                    return self._mark_stale(value)
+                return value
+        
         try:
-            response = requests.get(
-                self.geocoding_url,
-                params={"name": location, "count": 1, "language": "en", "format": "json"},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("results") and len(data["results"]) > 0:
-                    result = data["results"][0]
-                    return {
-                        "latitude": result["latitude"],
-                        "longitude": result["longitude"],
-                        "name": result.get("name", location),
-                        "country": result.get("country", "")
-                    }
-            return None
+            with self._upstream_slots:
+                value = fetch()
         except Exception as e:
-            print(f"Error getting coordinates: {e}")
-            return None
+            print(f"Error fetching weather data: {e}")
+            value, _ = cache.lookup(key)
+            return None if value is _MISSING else self._mark_stale(value)
+        
+        cache.set(key, value, None if value is not None else EMPTY_TTL)
+        return value
     
-    def get_weather(self, latitude: float, longitude: float, date: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Get weather forecast for location"""
-        try:
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "daily": "temperature_2m_max,temperature_2m_min,weathercode,precipitation_probability_max",
-                "timezone": "auto",
-                "forecast_days": 7
+    def _revalidate(self, cache: TTLCache, key: Hashable, fetch: Callable[[], Any]):
+        with self._refreshing_lock:
+            if (id(cache), key) in self._refreshing:
+                return
+            self._refreshing.add((id(cache), key))
+        
+        def run():
+            try:
+                with self._upstream_slots:
+                    value = fetch()
+                cache.set(key, value, None if value is not None else EMPTY_TTL)
+            except Exception as e:
+                print(f"Error refreshing weather data: {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard((id(cache), key))
+        
+        self._refresher.submit(run)
+    
+    @staticmethod
+    def _mark_stale(value: Any) -> Any:
+        return {**value, "stale": True} if isinstance(value, dict) else value
+    
+    def get_coordinates(self, location: str) -> Optional[Dict[str, float]]:
+        """Get latitude and longitude from location name"""
+        return self._cached(
+            self._coordinates,
+            location.strip().lower(),
+            lambda: self._fetch_coordinates(location)
+        )
+    
+    def _fetch_coordinates(self, location: str) -> Optional[Dict[str, Any]]:
+        data = self.geocoding.get_json(
+            self.geocoding_url,
+            {"name": location, "count": 1, "language": "en", "format": "json"}
+        )
+        if data and data.get("results") and len(data["results"]) > 0:
+            result = data["results"][0]
+            return {
+                "latitude": result["latitude"],
+                "longitude": result["longitude"],
+                "name": result.get("name", location),
+                "country": result.get("country", "")
             }
-            
-            if date:
-                params["start_date"] = date
-                params["end_date"] = date
-            
-            response = requests.get(self.weather_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                daily = data.get("daily", {})
-                
-                if daily and len(daily.get("time", [])) > 0:
-                    return {
-                        "date": daily["time"][0],
-                        "temp_max": daily["temperature_2m_max"][0],
-                        "temp_min": daily["temperature_2m_min"][0],
-                        "weather_code": daily["weathercode"][0],
-                        "precipitation_probability": daily.get("precipitation_probability_max", [0])[0],
-                        "timezone": data.get("timezone", "UTC")
-                    }
-            return None
-        except Exception as e:
-            print(f"Error getting weather: {e}")
-            return None
+        return None
+    
+    def get_weather(
+        self,
+        latitude: float,
+        longitude: float,
+        date: Optional[str] = None,
+        refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get weather forecast for location (refresh skips the cache, for the warmer)"""
+        return self._cached(
+            self._weather,
+            (*coordinates_key(latitude, longitude), date),
+            lambda: self._fetch_weather(latitude, longitude, date),
+            refresh
+        )
+    
+    def _fetch_weather(self, latitude: float, longitude: float, date: Optional[str]) -> Optional[Dict[str, Any]]:
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "daily": "temperature_2m_max,temperature_2m_min,weathercode,precipitation_probability_max",
+            "timezone": "auto",
+            "forecast_days": 7
+        }
+        
+        if date:
+            params["start_date"] = date
+            params["end_date"] = date
+        
+        data = self.forecast.get_json(self.weather_url, params)
+        daily = (data or {}).get("daily", {})
+        
+        if daily and len(daily.get("time", [])) > 0:
+            return {
+                "date": daily["time"][0],
+                "temp_max": daily["temperature_2m_max"][0],
+                "temp_min": daily["temperature_2m_min"][0],
+                "weather_code": daily["weathercode"][0],
+                "precipitation_probability": daily.get("precipitation_probability_max", [0])[0],
+                "timezone": data.get("timezone", "UTC")
+            }
+        return None
     
-    def get_sun_times(self, latitude: float, longitude: float, date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def get_sun_times(
+        self,
+        latitude: float,
+        longitude: float,
+        date: Optional[str] = None,
+        refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """Get sunrise, sunset, and photography hours"""
-        try:
-            # Get timezone for the location
-            timezone_str = self.tf.timezone_at(lat=latitude, lng=longitude)
-            if not timezone_str:
-                # Fallback to UTC if timezone not found
-                timezone_str = "UTC"
+        # Without a date the API answers for today (UTC), so key on that day
+        return self._cached(
+            self._sun_times,
+            (*coordinates_key(latitude, longitude), date or datetime.utcnow().date().isoformat()),
+            lambda: self._fetch_sun_times(latitude, longitude, date),
+            refresh
+        )
+    
+    def _fetch_sun_times(self, latitude: float, longitude: float, date: Optional[str]) -> Optional[Dict[str, Any]]:
+        # Get timezone for the location
+        timezone_str = self.tf.timezone_at(lat=latitude, lng=longitude)
+        if not timezone_str:
+            # Fallback to UTC if timezone not found
+            timezone_str = "UTC"
+        
+        local_tz = pytz.timezone(timezone_str)
+        
+        params = {
+            "lat": latitude,
+            "lng": longitude,
+            "formatted": 0  # Get ISO 8601 format
+        }
+        
+        if date:
+            params["date"] = date
+        
+        data = self.sunrise.get_json(self.sunrise_url, params)
+        
+        if data and data.get("status") == "OK":
+            results = data["results"]
             
-            local_tz = pytz.timezone(timezone_str)
+            # Parse times and convert to local timezone
+            sunrise_utc = datetime.fromisoformat(results["sunrise"].replace("Z", "+00:00"))
+            sunset_utc = datetime.fromisoformat(results["sunset"].replace("Z", "+00:00"))
+            solar_noon_utc = datetime.fromisoformat(results["solar_noon"].replace("Z", "+00:00"))
             
-            params = {
-                "lat": latitude,
-                "lng": longitude,
-                "formatted": 0  # Get ISO 8601 format
-            }
+            # Convert to local timezone
+            sunrise = sunrise_utc.astimezone(local_tz)
+            sunset = sunset_utc.astimezone(local_tz)
+            solar_noon = solar_noon_utc.astimezone(local_tz)
             
-            if date:
-                params["date"] = date
+            # Calculate golden hours (1 hour after sunrise, 1 hour before sunset)
+            golden_hour_morning_start = sunrise
+            golden_hour_morning_end = sunrise + timedelta(hours=1)
+            golden_hour_evening_start = sunset - timedelta(hours=1)
+            golden_hour_evening_end = sunset
             
-            response = requests.get(self.sunrise_url, params=params, timeout=10)
+            # Calculate blue hours (30 min before sunrise, 30 min after sunset)
+            blue_hour_morning_start = sunrise - timedelta(minutes=30)
+            blue_hour_morning_end = sunrise
+            blue_hour_evening_start = sunset
+            blue_hour_evening_end = sunset + timedelta(minutes=30)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("status") == "OK":
-                    results = data["results"]
-                    
-                    # Parse times and convert to local timezone
-                    sunrise_utc = datetime.fromisoformat(results["sunrise"].replace("Z", "+00:00"))
-                    sunset_utc = datetime.fromisoformat(results["sunset"].replace("Z", "+00:00"))
-                    solar_noon_utc = datetime.fromisoformat(results["solar_noon"].replace("Z", "+00:00"))
-                    
-                    # Convert to local timezone
-                    sunrise = sunrise_utc.astimezone(local_tz)
-                    sunset = sunset_utc.astimezone(local_tz)
-                    solar_noon = solar_noon_utc.astimezone(local_tz)
-                    
-                    # Calculate golden hours (1 hour after sunrise, 1 hour before sunset)
-                    golden_hour_morning_start = sunrise
-                    golden_hour_morning_end = sunrise + timedelta(hours=1)
-                    golden_hour_evening_start = sunset - timedelta(hours=1)
-                    golden_hour_evening_end = sunset
-                    
-                    # Calculate blue hours (30 min before sunrise, 30 min after sunset)
-                    blue_hour_morning_start = sunrise - timedelta(minutes=30)
-                    blue_hour_morning_end = sunrise
-                    blue_hour_evening_start = sunset
-                    blue_hour_evening_end = sunset + timedelta(minutes=30)
-                    
-                    return {
-                        "sunrise": sunrise.strftime("%H:%M"),
-                        "sunset": sunset.strftime("%H:%M"),
-                        "solar_noon": solar_noon.strftime("%H:%M"),
-                        "day_length": results["day_length"],
-                        "timezone": timezone_str,
-                        "golden_hour_morning": {
-                            "start": golden_hour_morning_start.strftime("%H:%M"),
-                            "end": golden_hour_morning_end.strftime("%H:%M")
-                        },
-                        "golden_hour_evening": {
-                            "start": golden_hour_evening_start.strftime("%H:%M"),
-                            "end": golden_hour_evening_end.strftime("%H:%M")
-                        },
-                        "blue_hour_morning": {
-                            "start": blue_hour_morning_start.strftime("%H:%M"),
-                            "end": blue_hour_morning_end.strftime("%H:%M")
-                        },
-                        "blue_hour_evening": {
-                            "start": blue_hour_evening_start.strftime("%H:%M"),
-                            "end": blue_hour_evening_end.strftime("%H:%M")
-                        }
-                    }
-            return None
-        except Exception as e:
-            print(f"Error getting sun times: {e}")
-            return None
+            return {
+                "sunrise": sunrise.strftime("%H:%M"),
+                "sunset": sunset.strftime("%H:%M"),
+                "solar_noon": solar_noon.strftime("%H:%M"),
+                "day_length": results["day_length"],
+                "timezone": timezone_str,
+                "golden_hour_morning": {
+                    "start": golden_hour_morning_start.strftime("%H:%M"),
+                    "end": golden_hour_morning_end.strftime("%H:%M")
+                },
+                "golden_hour_evening": {
+                    "start": golden_hour_evening_start.strftime("%H:%M"),
+                    "end": golden_hour_evening_end.strftime("%H:%M")
+                },
+                "blue_hour_morning": {
+                    "start": blue_hour_morning_start.strftime("%H:%M"),
+                    "end": blue_hour_morning_end.strftime("%H:%M")
+                },
+                "blue_hour_evening": {
+                    "start": blue_hour_evening_start.strftime("%H:%M"),
+                    "end": blue_hour_evening_end.strftime("%H:%M")
+                }
+            }
+        return None
     
     def get_weather_description(self, weather_code: int) -> str:
         """Convert WMO weather code to description"""
@@ -187,15 +417,53 @@ class WeatherService:
         coords = self.get_coordinates(location)
         if not coords:
             return None
+        return self._info_for(coords, date)
+    
+    def get_batch_info(
+        self,
+        targets: Dict[Hashable, Tuple[str, Optional[str]]],
+        refresh: bool = False
+    ) -> Dict[Hashable, Optional[Dict[str, Any]]]:
+        """
+        Complete info for many (location, date) pairs at once. Each distinct
+        location is geocoded once and each distinct (coordinates, date) is
+        fetched once, with at most weather_fetch_concurrency calls in flight.
+        """
+        locations = list({location.strip().lower(): location for location, _ in targets.values()}.items())
+        with ThreadPoolExecutor(max_workers=settings.weather_fetch_concurrency) as pool:
+            found = dict(zip(
+                [key for key, _ in locations],
+                pool.map(self.get_coordinates, [location for _, location in locations])
+            ))
+            
+            places = {}
+            for location, date in targets.values():
+                coords = found[location.strip().lower()]
+                if coords:
+                    places[(*coordinates_key(coords["latitude"], coords["longitude"]), date)] = (coords, date)
+            infos = dict(zip(
+                places.keys(),
+                pool.map(lambda place: self._info_for(*place, refresh=refresh), places.values())
+            ))
         
+        results = {}
+        for target, (location, date) in targets.items():
+            coords = found[location.strip().lower()]
+            results[target] = infos[(*coordinates_key(coords["latitude"], coords["longitude"]), date)] if coords else None
+        return results
+    
+    def _info_for(self, coords: Dict[str, Any], date: Optional[str], refresh: bool = False) -> Dict[str, Any]:
         latitude = coords["latitude"]
         longitude = coords["longitude"]
         
+        # Sun times from the other upstream in parallel, so a miss waits for one timeout, not two
+        pending_sun_times = self._fanout.submit(self.get_sun_times, latitude, longitude, date, refresh)
+        
         # Get weather
-        weather = self.get_weather(latitude, longitude, date)
+        weather = self.get_weather(latitude, longitude, date, refresh)
         
         # Get sun times
-        sun_times = self.get_sun_times(latitude, longitude, date)
+        sun_times = pending_sun_times.result()
         
         result = {
             "location": {
@@ -203,7 +471,9 @@ class WeatherService:
                 "country": coords["country"],
                 "latitude": latitude,
                 "longitude": longitude
-            }
+            },
+            # Some part is a cached answer past its TTL (a refresh is under way)
+            "stale": bool((weather and weather.get("stale")) or (sun_times and sun_times.get("stale")))
         }
         
         if weather:
@@ -216,7 +486,7 @@ class WeatherService:
             }
         
         if sun_times:
-            result["sun_times"] = sun_times
+            result["sun_times"] = {key: value for key, value in sun_times.items() if key != "stale"}
         
         return result
 
@@ -0,0 +1,124 @@
+"""
+Weather for many trips at once, and a background warmer that refreshes the
+forecasts of upcoming trips on a schedule so the trips pages read them
+from the weather cache instead of waiting on the upstream APIs.
+"""
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.trip import Trip
+from .weather import weather_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no multi-worker server either
+    fcntl = None
+
+# Held by the one worker process on this host that runs the warmer
+LOCK_PATH = os.path.join(tempfile.gettempdir(), "photography-weather-warmer.lock")
+# How often the other workers check whether the warming worker went away
+STANDBY_SECONDS = 60
+
+
+def upcoming_trips(db: Session, limit: Optional[int] = None, today: Optional[date] = None) -> List[Trip]:
+    """Trips with a destination that are under way or start within the forecast window"""
+    today = today or date.today()
+    horizon = today + timedelta(days=settings.weather_forecast_days - 1)
+    return db.query(Trip).filter(
+        Trip.destination.isnot(None),
+        Trip.destination != "",
+        Trip.start_date.isnot(None),
+        Trip.start_date <= horizon,
+        or_(Trip.start_date >= today, Trip.end_date >= today)
+    ).order_by(Trip.start_date).limit(limit).all()
+
+
+def forecast_date(trip: Trip, today: Optional[date] = None) -> Optional[str]:
+    """The day to forecast: the start date, or today for a trip already under way"""
+    if not trip.start_date:
+        return None
+    return max(trip.start_date, today or date.today()).isoformat()
+
+
+def weather_for_trips(trips: List[Trip], refresh: bool = False) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Complete weather info keyed by trip id (None where the destination is unknown)"""
+    today = date.today()
+    targets = {trip.id: (trip.destination, forecast_date(trip, today)) for trip in trips if trip.destination}
+    return weather_service.get_batch_info(targets, refresh=refresh)
+
+
+class WeatherWarmer:
+    """
+    Every worker starts one, but only the worker holding the lock file warms,
+    so N gunicorn workers do not send N sweeps to the free upstream APIs.
+    When that worker exits (e.g. recycled) the lock is released and another
+    takes over. What it fetches goes to the shared weather cache directory,
+    so the other workers serve upcoming trips from warm data as well.
+    """
+    
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file = None
+    
+    def start(self):
+        if settings.weather_warm_interval_minutes <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weather-warmer", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+        if self._lock_file is not None:
+            # Closing releases the lock for the remaining workers
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def _is_leader(self) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            if self._lock_file is None:
+                self._lock_file = open(LOCK_PATH, "a")
+            # Succeeds again and again for the holder, fails for everyone else
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (OSError, ValueError):
+            # Held elsewhere, or the file was closed by stop()
+            return False
+    
+    def warm(self) -> int:
+        """Refresh the forecasts of all upcoming trips; returns how many trips"""
+        db = SessionLocal()
+        try:
+            trips = upcoming_trips(db)
+        finally:
+            db.close()
+        weather_for_trips(trips, refresh=True)
+        weather_service.prune_shared()
+        return len(trips)
+    
+    def _run(self):
+        # Runs right away, then every interval; shorter than the cache TTL, so
+        # entries for upcoming trips are replaced before they expire
+        while not self._stop.is_set():
+            if not self._is_leader():
+                self._stop.wait(STANDBY_SECONDS)
+                continue
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Error warming weather cache: {e}")
+            self._stop.wait(settings.weather_warm_interval_minutes * 60)
+
+
+# Singleton instance
+weather_warmer = WeatherWarmer()
@@ -0,0 +1,123 @@
+"""
+Metadata backfill script
+Fills EXIF metadata and dimensions for photos uploaded before extraction
+existed. Only the header bytes of each original are fetched (ranged GET),
+widening the range only when a header does not fit. With --hashes it
+instead computes perceptual hashes from the thumbnails (reduced to the
+level uploads hash), and with --tiles it builds deep-zoom pyramids for
+large scans (use few workers: each holds a full-resolution bitmap).
+
+    python backfill_metadata.py [--hashes | --tiles] [--batch-size 100] [--workers 8] [--limit N]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional
+from PIL import Image
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Photo
+from app.services.storage import storage_service
+from app.services.image_metadata import extract_metadata, display_size
+from app.services.similarity import dhash, HASH_SOURCE_SIZE
+from app.services.tiles import tile_service
+from app.services.decode_scheduler import configure_pillow
+
+# 64KB covers the JPEG APP1 block of nearly every file; TIFF scans may keep
+# their IFDs further in, so fall back to larger reads and finally the whole file
+READ_LENGTHS = [64 * 1024, 1024 * 1024, None]
+
+
+def read_metadata(storage_key: str) -> Optional[Dict[str, Any]]:
+    last_error = None
+    for length in READ_LENGTHS:
+        try:
+            data = storage_service.read_range(storage_key, length)
+            with Image.open(BytesIO(data)) as image:
+                metadata = extract_metadata(image)
+                metadata.update(display_size(image, metadata["orientation"]))
+                return metadata
+        except Exception as e:
+            last_error = e
+    print(f"⚠️  {storage_key}: {last_error}")
+    return None
+
+
+def read_phash(storage_key: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = storage_service.read_range(storage_service.thumbnail_key(storage_key))
+        with Image.open(BytesIO(data)) as image:
+            # Reduced to the level uploads hash, the same way uploads reduce it
+            return {"phash": dhash(storage_service.downscale(image, HASH_SOURCE_SIZE))}
+    except Exception as e:
+        print(f"⚠️  {storage_key}: {e}")
+        return None
+
+
+def build_tiles(storage_key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return {"tile_manifest_url": tile_service.build(storage_key)}
+    except Exception as e:
+        print(f"⚠️  {storage_key}: {e}")
+        return None
+
+
+def backfill(
+    pending_column,
+    reader: Callable[[str], Optional[Dict[str, Any]]],
+    batch_size: int,
+    workers: int,
+    limit: Optional[int],
+    *filters
+):
+    db = SessionLocal()
+    updated = 0
+    failed = 0
+    last_id = 0
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while limit is None or updated + failed < limit:
+                photos = db.query(Photo).filter(
+                    pending_column.is_(None),
+                    Photo.storage_key.isnot(None),
+                    Photo.id > last_id,
+                    *filters
+                ).order_by(Photo.id).limit(batch_size).all()
+                
+                if not photos:
+                    break
+                last_id = photos[-1].id
+                
+                for photo, metadata in zip(photos, pool.map(reader, [p.storage_key for p in photos])):
+                    if metadata is None:
+                        failed += 1
+                        continue
+                    for key, value in metadata.items():
+                        setattr(photo, key, value)
+                    updated += 1
+                
+                db.commit()
+                print(f"Processed up to photo {last_id}: {updated} updated, {failed} failed")
+    finally:
+        db.close()
+    
+    print(f"✅ Backfill complete: {updated} updated, {failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill photo EXIF metadata")
+    parser.add_argument("--hashes", action="store_true", help="Backfill perceptual hashes instead")
+    parser.add_argument("--tiles", action="store_true", help="Build deep-zoom tiles for large scans instead")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    configure_pillow()
+    if args.hashes:
+        backfill(Photo.phash, read_phash, args.batch_size, args.workers, args.limit)
+    elif args.tiles:
+        large = (Photo.width >= settings.tile_min_dimension) | (Photo.height >= settings.tile_min_dimension)
+        backfill(Photo.tile_manifest_url, build_tiles, args.batch_size, args.workers, args.limit, large)
+    else:
+        backfill(Photo.orientation, read_metadata, args.batch_size, args.workers, args.limit)
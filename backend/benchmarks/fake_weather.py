@@ -0,0 +1,93 @@
+"""
+Local stand-in for the open-meteo and sunrise-sunset.org upstreams
+"""
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeWeatherHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        
+        if url.path == "/v1/search":
+            body = {
+                "results": [{
+                    "name": params.get("name", "Kyoto"),
+                    "country": "Japan",
+                    "latitude": 35.0116,
+                    "longitude": 135.7681
+                }]
+            }
+        elif url.path == "/v1/forecast":
+            day = params.get("start_date", date.today().isoformat())
+            body = {
+                "timezone": "Asia/Tokyo",
+                "daily": {
+                    "time": [day],
+                    "temperature_2m_max": [21.5],
+                    "temperature_2m_min": [12.0],
+                    "weathercode": [2],
+                    "precipitation_probability_max": [10]
+                }
+            }
+        elif url.path == "/json":
+            day = params.get("date", date.today().isoformat())
+            body = {
+                "status": "OK",
+                "results": {
+                    "sunrise": f"{day}T20:45:00+00:00",
+                    "sunset": f"{day}T08:30:00+00:00",
+                    "solar_noon": f"{day}T02:37:00+00:00",
+                    "day_length": 42300
+                }
+            }
+        else:
+            self.send_error(404)
+            return
+        
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeWeatherServer:
+    """Serves canned upstream responses on a random local port"""
+    
+    def __init__(self, latency_ms: float = 0.0):
+        handler = type("Handler", (FakeWeatherHandler,), {"latency": latency_ms / 1000})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self.thread.start()
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def patch(self, weather_service):
+        """Point the weather service at this server"""
+        weather_service.geocoding_url = f"{self.base_url}/v1/search"
+        weather_service.weather_url = f"{self.base_url}/v1/forecast"
+        weather_service.sunrise_url = f"{self.base_url}/json"
@@ -0,0 +1,90 @@
+"""
+Synthetic data for the benchmark suite
+"""
+from datetime import date, timedelta
+from io import BytesIO
+from typing import List
+from PIL import Image
+
+
+def make_scan(width: int, height: int, format: str = "JPEG") -> bytes:
+    """
+    Noisy RGB image that compresses roughly like a film scan (grain defeats
+    JPEG's entropy coding the same way real scans do)
+    """
+    channels = [Image.effect_noise((width, height), 48 + i * 8) for i in range(3)]
+    image = Image.merge("RGB", channels)
+    
+    output = BytesIO()
+    if format == "JPEG":
+        image.save(output, format="JPEG", quality=92)
+    else:
+        image.save(output, format=format)
+    return output.getvalue()
+
+
+def seed_galleries(db, gallery_count: int, photos_per_gallery: int) -> List[int]:
+    """Insert galleries with photo rows directly, bypassing storage"""
+    from app.models import Gallery, Photo
+    
+    gallery_ids = []
+    for g in range(gallery_count):
+        gallery = Gallery(
+            name=f"Roll {g + 1}",
+            description="Synthetic benchmark roll",
+            photo_count=photos_per_gallery
+        )
+        db.add(gallery)
+        db.flush()
+        gallery_ids.append(gallery.id)
+        
+        db.bulk_insert_mappings(Photo, [
+            {
+                "gallery_id": gallery.id,
+                "original_url": f"https://bench.example.com/galleries/{gallery.id}/{p}.jpg",
+                "thumbnail_url": f"https://bench.example.com/galleries/thumb_{gallery.id}/{p}.jpg",
+                "storage_key": f"galleries/{gallery.id}/{p}.jpg",
+                "file_size": 12_000_000,
+                "display_order": p
+            }
+            for p in range(photos_per_gallery)
+        ])
+    
+    db.commit()
+    return gallery_ids
+
+
+def seed_trips(db, trip_count: int, images_per_trip: int) -> List[int]:
+    """Insert upcoming trips with inspiration image rows"""
+    from app.models import Trip, TripImage
+    
+    destinations = ["Kyoto", "Lisbon", "Reykjavik", "Marrakesh", "Havana"]
+    trip_ids = []
+    for t in range(trip_count):
+        start = date.today() + timedelta(days=t % 14)
+        trip = Trip(
+            name=f"Trip {t + 1}",
+            destination=destinations[t % len(destinations)],
+            start_date=start,
+            end_date=start + timedelta(days=3),
+            description="Synthetic benchmark trip"
+        )
+        db.add(trip)
+        db.flush()
+        trip_ids.append(trip.id)
+        
+        db.bulk_insert_mappings(TripImage, [
+            {
+                "trip_id": trip.id,
+                "image_url": f"https://bench.example.com/trips/{trip.id}/{i}.jpg",
+                "thumbnail_url": f"https://bench.example.com/trips/thumb_{trip.id}/{i}.jpg",
+                "storage_key": f"trips/{trip.id}/{i}.jpg",
+                "file_size": 2_000_000,
+                "caption": f"Reference {i + 1}",
+                "display_order": i
+            }
+            for i in range(images_per_trip)
+        ])
+    
+    db.commit()
+    return trip_ids
@@ -0,0 +1,296 @@
+"""
+Benchmark runner
+
+Boots the app against SQLite, an in-process S3 stand-in (moto) or a local
+S3-compatible server (MinIO), and a fake weather upstream, then measures
+the upload, listing and weather paths.
+
+Run from the backend directory:
+
+    python -m benchmarks.run                    # run and compare with baseline.json
+    python -m benchmarks.run --quick            # smaller dataset for a fast check
+    python -m benchmarks.run --update-baseline  # store this run as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Any
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+BUCKET = "photography-bench"
+
+# Maximum SQL statements per request; a higher count usually means an N+1 crept in
+QUERY_BUDGETS = {
+    "get_galleries": 1,
+    "get_gallery_photos": 3,
+    "get_gallery_photos_columnar": 3,
+    "get_trips": 2,
+    "get_trip_weather": 1
+}
+
+PROFILES = {
+    "full": {
+        "galleries": 50,
+        "photos_per_gallery": 200,
+        "large_gallery_photos": 5000,
+        "trips": 100,
+        "images_per_trip": 12,
+        "jpeg_size": (4000, 3000),
+        "tiff_size": (3000, 2000),
+        "upload_iterations": 20,
+        "batch_size": 36,
+        "batch_iterations": 3,
+        "listing_iterations": 200
+    },
+    "quick": {
+        "galleries": 10,
+        "photos_per_gallery": 36,
+        "large_gallery_photos": 1000,
+        "trips": 20,
+        "images_per_trip": 6,
+        "jpeg_size": (2000, 1500),
+        "tiff_size": (1500, 1000),
+        "upload_iterations": 5,
+        "batch_size": 12,
+        "batch_iterations": 2,
+        "listing_iterations": 50
+    }
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 2, items: int = 1) -> Dict[str, float]:
+    """Time fn() and summarize latency percentiles and throughput"""
+    for _ in range(warmup):
+        fn()
+    
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    
+    timings.sort()
+    total_s = sum(timings) / 1000
+    return {
+        "iterations": iterations,
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "throughput_per_s": round(iterations * items / total_s, 2) if total_s else 0.0
+    }
+
+
+def configure_environment(workdir: str, s3_endpoint: str = None):
+    """Must run before anything under app/ is imported (settings are read at import)"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["STORAGE_TYPE"] = "s3"
+    os.environ["AWS_REGION"] = "us-east-1"
+    os.environ["AWS_BUCKET_NAME"] = BUCKET
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ["QUERY_STATS_ENABLED"] = "true"
+    os.environ["QUERY_BUDGET_ACTION"] = "log"
+    if s3_endpoint:
+        os.environ["AWS_ENDPOINT_URL"] = s3_endpoint
+
+
+def run_benchmarks(profile: Dict[str, Any], weather_latency_ms: float) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine, SessionLocal
+    from app.main import app
+    from app.services.storage import storage_service
+    from app.services.weather import weather_service
+    from .fake_weather import FakeWeatherServer
+    from .fixtures import make_scan, seed_galleries, seed_trips
+    
+    storage_service.s3_client.create_bucket(Bucket=BUCKET)
+    Base.metadata.create_all(bind=engine)
+    
+    weather = FakeWeatherServer(latency_ms=weather_latency_ms)
+    weather.start()
+    weather.patch(weather_service)
+    
+    db = SessionLocal()
+    try:
+        seed_galleries(db, profile["galleries"], profile["photos_per_gallery"])
+        large_gallery_id = seed_galleries(db, 1, profile["large_gallery_photos"])[0]
+        trip_ids = seed_trips(db, profile["trips"], profile["images_per_trip"])
+        upload_gallery_id = seed_galleries(db, 1, 0)[0]
+    finally:
+        db.close()
+    
+    print("Generating synthetic scans...")
+    jpeg = make_scan(*profile["jpeg_size"], format="JPEG")
+    tiff = make_scan(*profile["tiff_size"], format="TIFF")
+    small_jpeg = make_scan(1200, 800, format="JPEG")
+    
+    client = TestClient(app)
+    results = {}
+    query_counts = {}
+    
+    def upload(data: bytes, filename: str, content_type: str):
+        response = client.post(
+            f"/api/galleries/{upload_gallery_id}/photos",
+            files={"file": (filename, data, content_type)}
+        )
+        response.raise_for_status()
+    
+    def get(name: str, path: str):
+        def call():
+            response = client.get(path)
+            response.raise_for_status()
+            query_counts[name] = int(response.headers.get("X-Query-Count", 0))
+        return call
+    
+    def upload_batch():
+        for i in range(profile["batch_size"]):
+            upload(small_jpeg, f"frame_{i:02d}.jpg", "image/jpeg")
+    
+    benchmarks = [
+        ("thumbnail_jpeg", lambda: storage_service.create_thumbnail(jpeg), profile["upload_iterations"], 1),
+        ("thumbnail_tiff", lambda: storage_service.create_thumbnail(tiff), profile["upload_iterations"], 1),
+        ("upload_single_jpeg", lambda: upload(jpeg, "scan.jpg", "image/jpeg"), profile["upload_iterations"], 1),
+        ("upload_single_tiff", lambda: upload(tiff, "scan.tif", "image/tiff"), profile["upload_iterations"], 1),
+        ("upload_batch", upload_batch, profile["batch_iterations"], profile["batch_size"]),
+        ("get_galleries", get("get_galleries", "/api/galleries/"), profile["listing_iterations"], 1),
+        ("get_gallery_photos", get("get_gallery_photos", f"/api/galleries/{large_gallery_id}/photos"), profile["listing_iterations"], 1),
+        ("get_gallery_photos_columnar", get("get_gallery_photos_columnar", f"/api/galleries/{large_gallery_id}/photos?format=columnar"), profile["listing_iterations"], 1),
+        ("get_trips", get("get_trips", "/api/trips/"), profile["listing_iterations"], 1),
+        ("get_trip_weather", get("get_trip_weather", f"/api/trips/{trip_ids[0]}/weather"), profile["listing_iterations"], 1),
+    ]
+    
+    try:
+        for name, fn, iterations, items in benchmarks:
+            print(f"Running {name} ({iterations} iterations)...")
+            results[name] = measure(fn, iterations, items=items)
+            if name in query_counts:
+                results[name]["queries"] = query_counts[name]
+    finally:
+        weather.stop()
+    
+    return results
+
+
+def check_query_budgets(results: Dict[str, Dict[str, float]]) -> List[str]:
+    """Report endpoints that issued more SQL statements than budgeted"""
+    violations = []
+    for name, budget in QUERY_BUDGETS.items():
+        queries = results.get(name, {}).get("queries")
+        if queries is not None and queries > budget:
+            violations.append(f"{name}: {queries} queries (budget {budget})")
+    return violations
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Report benchmarks whose p50 or p95 regressed by more than tolerance"""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if base.get(key) and metrics[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}.{key}: {metrics[key]:.2f}ms vs baseline {base[key]:.2f}ms "
+                    f"(+{(metrics[key] / base[key] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Photography App benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Use the small dataset profile")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--s3-endpoint", default=None, help="Use an S3-compatible server (e.g. MinIO) instead of moto")
+    parser.add_argument("--weather-latency-ms", type=float, default=0.0, help="Artificial upstream latency")
+    args = parser.parse_args()
+    
+    profile_name = "quick" if args.quick else "full"
+    workdir = tempfile.mkdtemp(prefix="photography-bench-")
+    configure_environment(workdir, args.s3_endpoint)
+    
+    mock = None
+    if not args.s3_endpoint:
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+    
+    try:
+        results = run_benchmarks(PROFILES[profile_name], args.weather_latency_ms)
+    finally:
+        if mock:
+            mock.stop()
+    
+    report = {
+        "meta": {
+            "profile": profile_name,
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "benchmarks": results
+    }
+    
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    
+    for name, metrics in results.items():
+        print(f"  {name:<22} p50 {metrics['p50_ms']:>9.2f}ms  p95 {metrics['p95_ms']:>9.2f}ms  "
+              f"p99 {metrics['p99_ms']:>9.2f}ms  {metrics['throughput_per_s']:>8.2f}/s")
+    
+    budget_violations = check_query_budgets(results)
+    if budget_violations:
+        print("Query budget exceeded:")
+        for line in budget_violations:
+            print(f"  ❌ {line}")
+        return 1
+    
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print("No baseline found, skipping comparison (use --update-baseline to create one)")
+        return 0
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("profile") != profile_name:
+        print("Baseline was recorded with a different profile, skipping comparison")
+        return 0
+    
+    regressions = compare(results, baseline["benchmarks"], args.tolerance)
+    if regressions:
+        print("Performance regressions detected:")
+        for line in regressions:
+            print(f"  ❌ {line}")
+        return 1
+    
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
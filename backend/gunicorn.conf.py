@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for production (python run.py --production)
+Uvicorn workers, one per available CPU unless WEB_CONCURRENCY says otherwise.
+The app is imported once in the master and shared with the workers by fork;
+workers are recycled after a number of requests to bound Pillow's memory
+creep, and on shutdown in-flight requests (uploads) get time to finish.
+"""
+import os
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: the cgroup quota (containers) or the CPU count"""
+    try:
+        # cgroup v2: "max 100000" or "200000 100000"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", 0)) or available_cpus()
+
+preload_app = True
+
+# Recycle workers; the jitter keeps them from all restarting at once
+max_requests = int(os.getenv("MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 100))
+
+# Seconds a stopping worker gets to finish in-flight requests (large uploads)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 120))
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+keepalive = 5
+
+accesslog = "-"
+forwarded_allow_ips = "*"
+
+
+def post_fork(server, worker):
+    # The preloaded app's connection pool belongs to the master; each worker
+    # starts its own rather than sharing sockets across processes
+    from app.database import engine
+    engine.dispose(close=False)
@@ -3,7 +3,10 @@ Database initialization script
 Run this to create all tables in MySQL
 """
 from app.database import engine, Base
-from app.models import Gallery, Photo, FilmStock, Trip, TripImage
+from app.models import (
+    Gallery, Photo, PhotoRendition, FilmStock, FilmStockSummary, FilmStockEvent, FilmStockSnapshot,
+    Trip, TripImage, UploadSession
+)
 
 
 def init_database():
@@ -0,0 +1,137 @@
+"""
+Cache header migration script
+Rewrites the metadata of objects stored before uploads set Cache-Control,
+copying each object onto itself with the long-lived immutable header.
+With --rewrite-urls it also points every stored URL at PUBLIC_BASE_URL (or
+the bucket) and appends the ?v= content version from the object's ETag.
+
+    python migrate_cache_headers.py [--prefix galleries/] [--workers 16] [--rewrite-urls] [--batch-size 500] [--dry-run]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from botocore.exceptions import ClientError
+from app.database import SessionLocal
+from app.models import Gallery, Photo, PhotoRendition, TripImage
+from app.services.storage import storage_service, CACHE_CONTROL
+
+PREFIXES = ["galleries/", "trips/"]
+
+# (model, URL columns) rewritten by --rewrite-urls
+URL_COLUMNS = [
+    (Photo, ["original_url", "thumbnail_url", "tile_manifest_url"]),
+    (PhotoRendition, ["url"]),
+    (TripImage, ["image_url", "thumbnail_url"]),
+    (Gallery, ["cover_image_url"]),
+]
+
+
+def update_metadata(key: str, dry_run: bool) -> Tuple[str, Optional[str]]:
+    """Copy an object onto itself with Cache-Control set; returns (key, new ETag)"""
+    s3 = storage_service.s3_client
+    bucket = storage_service.bucket_name
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+        if head.get("CacheControl") == CACHE_CONTROL or dry_run:
+            return key, head["ETag"]
+        
+        # REPLACE drops all metadata not given here, so carry the rest over
+        params = {
+            "ContentType": head.get("ContentType", "application/octet-stream"),
+            "CacheControl": CACHE_CONTROL,
+            "Metadata": head.get("Metadata", {}),
+        }
+        for field in ("ContentDisposition", "ContentEncoding", "ContentLanguage"):
+            if head.get(field):
+                params[field] = head[field]
+        
+        response = s3.copy_object(
+            Bucket=bucket,
+            Key=key,
+            CopySource={"Bucket": bucket, "Key": key},
+            MetadataDirective="REPLACE",
+            **params
+        )
+        return key, response["CopyObjectResult"]["ETag"]
+    except ClientError as e:
+        print(f"⚠️  {key}: {e}")
+        return key, None
+
+
+def migrate_objects(prefixes, workers: int, dry_run: bool) -> Dict[str, str]:
+    """Returns the current ETag of every object, for the URL rewrite"""
+    etags: Dict[str, str] = {}
+    paginator = storage_service.s3_client.get_paginator("list_objects_v2")
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for prefix in prefixes:
+            for page in paginator.paginate(Bucket=storage_service.bucket_name, Prefix=prefix):
+                keys = [obj["Key"] for obj in page.get("Contents", [])]
+                for key, etag in pool.map(lambda k: update_metadata(k, dry_run), keys):
+                    if etag:
+                        etags[key] = etag
+                print(f"Processed {len(etags)} objects under {prefix}")
+    
+    return etags
+
+
+def key_from_url(url: str) -> str:
+    base = storage_service.base_url() + "/"
+    if url.startswith(base):
+        return url[len(base):].split("?", 1)[0]
+    return urlparse(url).path.lstrip("/")
+
+
+def rewrite_urls(etags: Dict[str, str], batch_size: int, dry_run: bool):
+    db = SessionLocal()
+    changed = 0
+    try:
+        for model, columns in URL_COLUMNS:
+            last_id = 0
+            while True:
+                # Keyset pages, so memory stays flat however large the table is
+                rows = db.query(model).filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                
+                for row in rows:
+                    for column in columns:
+                        url = getattr(row, column)
+                        if not url:
+                            continue
+                        key = key_from_url(url)
+                        if key not in etags:
+                            print(f"⚠️  {model.__tablename__}.{column} of {row.id}: no object for {key}")
+                            continue
+                        new_url = storage_service.public_url(key, storage_service.content_version(etags[key]))
+                        if new_url != url:
+                            setattr(row, column, new_url)
+                            changed += 1
+                
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+                db.expunge_all()
+            print(f"Rewrote URLs in {model.__tablename__}")
+    finally:
+        db.close()
+    
+    print(f"✅ {changed} URLs {'would be ' if dry_run else ''}rewritten")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set immutable Cache-Control on stored objects")
+    parser.add_argument("--prefix", action="append", help="Only this key prefix (repeatable)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per page for --rewrite-urls")
+    parser.add_argument("--rewrite-urls", action="store_true", help="Also rewrite stored URLs (base URL and ?v=)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    
+    etags = migrate_objects(args.prefix or PREFIXES, args.workers, args.dry_run)
+    print(f"✅ Metadata migration complete: {len(etags)} objects")
+    if args.rewrite_urls:
+        rewrite_urls(etags, args.batch_size, args.dry_run)
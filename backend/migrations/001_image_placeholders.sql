@@ -0,0 +1,12 @@
+-- Inline placeholders and dimensions for photos and trip images
+ALTER TABLE photos
+    ADD COLUMN width INT,
+    ADD COLUMN height INT,
+    ADD COLUMN placeholder TEXT,
+    ADD COLUMN dominant_color VARCHAR(7);
+
+ALTER TABLE trip_images
+    ADD COLUMN width INT,
+    ADD COLUMN height INT,
+    ADD COLUMN placeholder TEXT,
+    ADD COLUMN dominant_color VARCHAR(7);
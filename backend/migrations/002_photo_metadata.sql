@@ -0,0 +1,10 @@
+-- EXIF capture/scan metadata for photos
+ALTER TABLE photos
+    ADD COLUMN taken_at DATETIME,
+    ADD COLUMN camera_make VARCHAR(100),
+    ADD COLUMN camera_model VARCHAR(100),
+    ADD COLUMN lens VARCHAR(150),
+    ADD COLUMN iso INT,
+    ADD COLUMN orientation SMALLINT,
+    ADD INDEX idx_gallery_taken_at (gallery_id, taken_at),
+    ADD INDEX idx_camera_model (camera_model);
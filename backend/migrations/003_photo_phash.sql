@@ -0,0 +1,4 @@
+-- Perceptual hash for near-duplicate detection
+ALTER TABLE photos
+    ADD COLUMN phash CHAR(16),
+    ADD INDEX idx_phash (phash);
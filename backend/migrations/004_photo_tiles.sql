@@ -0,0 +1,3 @@
+-- Deep-zoom tile pyramid manifest for large scans
+ALTER TABLE photos
+    ADD COLUMN tile_manifest_url VARCHAR(500);
@@ -0,0 +1,4 @@
+-- Contact sheet sprite and its frame map
+ALTER TABLE galleries
+    ADD COLUMN contact_sheet_url VARCHAR(500),
+    ADD COLUMN contact_sheet_map TEXT;
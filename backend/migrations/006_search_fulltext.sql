@@ -0,0 +1,5 @@
+-- FULLTEXT indexes for /api/search
+ALTER TABLE galleries ADD FULLTEXT INDEX ft_gallery_search (name, description);
+ALTER TABLE trips ADD FULLTEXT INDEX ft_trip_search (name, destination, description);
+ALTER TABLE trip_images ADD FULLTEXT INDEX ft_trip_image_search (caption);
+ALTER TABLE film_stocks ADD FULLTEXT INDEX ft_film_stock_search (model);
@@ -0,0 +1,21 @@
+-- Expiry lookups, and the film stock summary seeded from existing stock
+-- (init_db.py creates the table; this covers running the SQL on its own)
+ALTER TABLE film_stocks
+    ADD INDEX idx_expiry (expiry_date);
+
+CREATE TABLE IF NOT EXISTS film_stock_summary (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    model VARCHAR(100) NOT NULL,
+    format VARCHAR(50),
+    expiry_date DATE,
+    stock_count INT NOT NULL DEFAULT 0,
+    quantity INT NOT NULL DEFAULT 0,
+    INDEX idx_summary_bucket (model, format, expiry_date),
+    INDEX idx_summary_expiry (expiry_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+DELETE FROM film_stock_summary;
+INSERT INTO film_stock_summary (model, format, expiry_date, stock_count, quantity)
+SELECT model, format, expiry_date, COUNT(*), COALESCE(SUM(quantity), 0)
+FROM film_stocks
+GROUP BY model, format, expiry_date;
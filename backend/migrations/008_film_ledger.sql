@@ -0,0 +1,9 @@
+-- Galleries record the film stock they were shot on; the ledger starts with
+-- an opening event per existing stock (init_db.py creates the two tables)
+ALTER TABLE galleries
+    ADD COLUMN film_stock_id INT,
+    ADD INDEX idx_film_stock (film_stock_id);
+
+INSERT INTO film_stock_events (film_stock_id, kind, delta)
+SELECT id, 'opening', COALESCE(quantity, 0)
+FROM film_stocks;
@@ -0,0 +1,14 @@
+-- Resized renditions per photo (init_db.py creates the table; this covers running the SQL on its own)
+CREATE TABLE IF NOT EXISTS photo_renditions (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    photo_id INT NOT NULL,
+    size INT NOT NULL,
+    format VARCHAR(10) NOT NULL DEFAULT 'jpeg',
+    width INT NOT NULL,
+    height INT NOT NULL,
+    url VARCHAR(500) NOT NULL,
+    storage_key VARCHAR(500) NOT NULL,
+    file_size BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_photo (photo_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,14 @@
+-- Rendition encoding (jpeg/webp/avif) for tables created before it was recorded;
+-- a no-op when the column already exists
+SET @has_format = (
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'photo_renditions' AND COLUMN_NAME = 'format'
+);
+SET @ddl = IF(
+    @has_format = 0,
+    'ALTER TABLE photo_renditions ADD COLUMN format VARCHAR(10) NOT NULL DEFAULT ''jpeg'' AFTER size',
+    'SELECT 1'
+);
+PREPARE add_format FROM @ddl;
+EXECUTE add_format;
+DEALLOCATE PREPARE add_format;
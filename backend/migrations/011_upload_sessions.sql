@@ -0,0 +1,27 @@
+-- Resumable upload sessions (init_db.py creates the table; this covers running the SQL on its own)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id VARCHAR(32) PRIMARY KEY,
+    gallery_id INT NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    total_size BIGINT NOT NULL,
+    offset BIGINT NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'uploading',
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_gallery (gallery_id),
+    INDEX idx_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Completion state for tables created before it existed; a no-op otherwise
+SET @has_status = (
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'upload_sessions' AND COLUMN_NAME = 'status'
+);
+SET @ddl = IF(
+    @has_status = 0,
+    'ALTER TABLE upload_sessions ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT ''uploading'' AFTER offset',
+    'SELECT 1'
+);
+PREPARE add_status FROM @ddl;
+EXECUTE add_status;
+DEALLOCATE PREPARE add_status;
@@ -1,13 +1,28 @@
 """
-Development server runner
+Server runner
+    python run.py                 development server with auto-reload
+    python run.py --production    gunicorn with uvicorn workers (see gunicorn.conf.py)
 """
+import argparse
+import os
 import uvicorn
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--production", action="store_true", help="Multi-worker gunicorn server")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: available CPUs)")
+    args = parser.parse_args()
+    
+    if args.production:
+        if args.workers:
+            os.environ["WEB_CONCURRENCY"] = str(args.workers)
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        # Replace this process so gunicorn receives the platform's signals directly
+        os.execvp("gunicorn", ["gunicorn", "app.main:app", "--config", config])
+    
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=True
     )
-
@@ -10,9 +10,14 @@ CREATE TABLE IF NOT EXISTS galleries (
     description TEXT,
     cover_image_url VARCHAR(500),
     photo_count INT DEFAULT 0,
+    film_stock_id INT,
+    contact_sheet_url VARCHAR(500),
+    contact_sheet_map TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_created (created_at)
+    INDEX idx_created (created_at),
+    INDEX idx_film_stock (film_stock_id),
+    FULLTEXT INDEX ft_gallery_search (name, description)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Photos table
@@ -24,9 +29,53 @@ CREATE TABLE IF NOT EXISTS photos (
     storage_key VARCHAR(500),
     file_size BIGINT,
     display_order INT DEFAULT 0,
+    width INT,
+    height INT,
+    placeholder TEXT,
+    dominant_color VARCHAR(7),
+    taken_at DATETIME,
+    camera_make VARCHAR(100),
+    camera_model VARCHAR(100),
+    lens VARCHAR(150),
+    iso INT,
+    orientation SMALLINT,
+    phash CHAR(16),
+    tile_manifest_url VARCHAR(500),
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_gallery (gallery_id),
-    INDEX idx_display_order (gallery_id, display_order)
+    INDEX idx_display_order (gallery_id, display_order),
+    INDEX idx_gallery_taken_at (gallery_id, taken_at),
+    INDEX idx_camera_model (camera_model),
+    INDEX idx_phash (phash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Photo renditions table (resized derivatives used for srcset)
+CREATE TABLE IF NOT EXISTS photo_renditions (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    photo_id INT NOT NULL,
+    size INT NOT NULL,
+    format VARCHAR(10) NOT NULL DEFAULT 'jpeg',
+    width INT NOT NULL,
+    height INT NOT NULL,
+    url VARCHAR(500) NOT NULL,
+    storage_key VARCHAR(500) NOT NULL,
+    file_size BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_photo (photo_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Resumable upload sessions (chunks are stored in local temp files)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id VARCHAR(32) PRIMARY KEY,
+    gallery_id INT NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    total_size BIGINT NOT NULL,
+    offset BIGINT NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'uploading',
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_gallery (gallery_id),
+    INDEX idx_expires (expires_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Film stocks table
@@ -38,7 +87,44 @@ CREATE TABLE IF NOT EXISTS film_stocks (
     expiry_date DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_created (created_at)
+    INDEX idx_created (created_at),
+    INDEX idx_expiry (expiry_date),
+    FULLTEXT INDEX ft_film_stock_search (model)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Film stock totals per (model, format, expiry date), kept in step by the API
+CREATE TABLE IF NOT EXISTS film_stock_summary (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    model VARCHAR(100) NOT NULL,
+    format VARCHAR(50),
+    expiry_date DATE,
+    stock_count INT NOT NULL DEFAULT 0,
+    quantity INT NOT NULL DEFAULT 0,
+    INDEX idx_summary_bucket (model, format, expiry_date),
+    INDEX idx_summary_expiry (expiry_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Film consumption ledger (append-only) and its periodic balance snapshots
+CREATE TABLE IF NOT EXISTS film_stock_events (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    film_stock_id INT NOT NULL,
+    gallery_id INT,
+    kind VARCHAR(20) NOT NULL,
+    delta INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_event_stock (film_stock_id, id),
+    INDEX idx_event_gallery (gallery_id),
+    INDEX idx_event_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS film_stock_snapshots (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    film_stock_id INT NOT NULL,
+    event_id INT NOT NULL,
+    balance INT NOT NULL,
+    rolls_shot INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_snapshot_stock (film_stock_id, event_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Trips table
@@ -52,7 +138,8 @@ CREATE TABLE IF NOT EXISTS trips (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_dates (start_date, end_date),
-    INDEX idx_created (created_at)
+    INDEX idx_created (created_at),
+    FULLTEXT INDEX ft_trip_search (name, destination, description)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Trip images table
@@ -65,8 +152,13 @@ CREATE TABLE IF NOT EXISTS trip_images (
     file_size BIGINT,
     caption VARCHAR(255),
     display_order INT DEFAULT 0,
+    width INT,
+    height INT,
+    placeholder TEXT,
+    dominant_color VARCHAR(7),
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_trip (trip_id),
-    INDEX idx_display_order (trip_id, display_order)
+    INDEX idx_display_order (trip_id, display_order),
+    FULLTEXT INDEX ft_trip_image_search (caption)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
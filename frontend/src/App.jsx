@@ -5,6 +5,7 @@ import GalleryDetail from './pages/GalleryDetail';
 import FilmStocks from './pages/FilmStocks';
 import Trips from './pages/Trips';
 import TripDetail from './pages/TripDetail';
+import Search from './pages/Search';
 
 function App() {
     return (
@@ -17,6 +18,7 @@ function App() {
                     <Route path="/film-stocks" element={<FilmStocks />} />
                     <Route path="/trips" element={<Trips />} />
                     <Route path="/trips/:id" element={<TripDetail />} />
+                    <Route path="/search" element={<Search />} />
                 </Routes>
             </Layout>
         </BrowserRouter>
@@ -0,0 +1,35 @@
+// The whole roll as one sprite: frames are positioned from the sheet's map,
+// so the overview costs a single image request
+export default function ContactSheet({ url, map, onSelect }) {
+    if (!url || !map) return null;
+
+    const percent = (value, total) => `${(value / total) * 100}%`;
+
+    return (
+        <div className="glass-panel--soft p-4">
+            <div className="relative mx-auto" style={{ maxWidth: map.width }}>
+                <img
+                    src={url}
+                    width={map.width}
+                    height={map.height}
+                    alt="Contact sheet"
+                    className="block h-auto w-full"
+                />
+                {map.frames.filter((frame) => frame.w > 0).map((frame) => (
+                    <button
+                        key={frame.photo_id}
+                        onClick={() => onSelect(frame.photo_id)}
+                        title={`Frame ${frame.frame}`}
+                        className="absolute border border-transparent hover:border-white/80 transition-colors"
+                        style={{
+                            left: percent(frame.x, map.width),
+                            top: percent(frame.y, map.height),
+                            width: percent(frame.w, map.width),
+                            height: percent(frame.h, map.height),
+                        }}
+                    />
+                ))}
+            </div>
+        </div>
+    );
+}
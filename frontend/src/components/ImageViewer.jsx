@@ -1,12 +1,41 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
+import OpenSeadragon from 'openseadragon';
+import { photosAPI } from '../services/api';
 
 export default function ImageViewer({ image, onClose }) {
     const [src, setSrc] = useState(image?.src || null);
+    const [tileSource, setTileSource] = useState(null);
+    const tilesRef = useRef(null);
 
     useEffect(() => {
         setSrc(image?.src || null);
+        setTileSource(null);
+        if (!image?.tilesPhotoId) return;
+
+        // Large scans have a deep-zoom pyramid: only the tiles in view are fetched
+        let cancelled = false;
+        photosAPI.getTiles(image.tilesPhotoId)
+            .then((response) => {
+                if (!cancelled) setTileSource(response.data);
+            })
+            .catch((error) => console.error('Failed to load tiles, showing the full image:', error));
+        return () => {
+            cancelled = true;
+        };
     }, [image]);
 
+    useEffect(() => {
+        if (!tileSource || !tilesRef.current) return;
+        const viewer = OpenSeadragon({
+            element: tilesRef.current,
+            tileSources: tileSource,
+            showNavigationControl: false,
+            maxZoomPixelRatio: 2,
+            visibilityRatio: 1,
+        });
+        return () => viewer.destroy();
+    }, [tileSource]);
+
     useEffect(() => {
         const handleEsc = (e) => {
             if (e.key === 'Escape') onClose();
@@ -29,18 +58,26 @@ export default function ImageViewer({ image, onClose }) {
                 ×
             </button>
 
-            <img
-                key={src}
-                src={src}
-                alt="Full size"
-                className="max-w-full max-h-full object-contain shadow-2xl shadow-black/70"
-                onClick={(e) => e.stopPropagation()}
-                onError={() => {
-                    if (image?.fallback && image.fallback !== src) {
-                        setSrc(image.fallback);
-                    }
-                }}
-            />
+            {tileSource ? (
+                <div
+                    ref={tilesRef}
+                    className="h-full w-full"
+                    onClick={(e) => e.stopPropagation()}
+                />
+            ) : (
+                <img
+                    key={src}
+                    src={src}
+                    alt="Full size"
+                    className="max-w-full max-h-full object-contain shadow-2xl shadow-black/70"
+                    onClick={(e) => e.stopPropagation()}
+                    onError={() => {
+                        if (image?.fallback && image.fallback !== src) {
+                            setSrc(image.fallback);
+                        }
+                    }}
+                />
+            )}
 
             <div className="absolute bottom-8 text-sm uppercase tracking-[0.4em] text-gray-300">
                 Click outside or press ESC to close
@@ -43,6 +43,15 @@ export default function Layout({ children }) {
                         >
                             Trips
                         </Link>
+                        <Link
+                            to="/search"
+                            className={`pb-3 transition-all ${isActive('/search')
+                                    ? 'text-white border-b border-white'
+                                    : 'text-gray-500 hover:text-gray-200 border-b border-transparent'
+                                }`}
+                        >
+                            Search
+                        </Link>
                     </nav>
                 </div>
             </header>
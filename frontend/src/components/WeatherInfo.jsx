@@ -74,6 +74,7 @@ export default function WeatherInfo({ tripId, destination }) {
                     </h3>
                     <p className="text-xs text-gray-300 uppercase tracking-[0.35em]">
                         {weatherData.location.name}, {weatherData.location.country}
+                        {weatherData.stale && <span className="ml-3 text-gray-500">· Last known</span>}
                     </p>
                 </div>
                 <svg
@@ -6,6 +6,7 @@ import Loading from '../components/Loading';
 
 export default function FilmStocks() {
     const [filmStocks, setFilmStocks] = useState([]);
+    const [summary, setSummary] = useState(null);
     const [loading, setLoading] = useState(true);
     const [showModal, setShowModal] = useState(false);
     const [editingId, setEditingId] = useState(null);
@@ -22,8 +23,12 @@ export default function FilmStocks() {
 
     const fetchFilmStocks = async () => {
         try {
-            const response = await filmStocksAPI.getAll();
-            setFilmStocks(response.data);
+            const [stocksResponse, summaryResponse] = await Promise.all([
+                filmStocksAPI.getAll(),
+                filmStocksAPI.getSummary(),
+            ]);
+            setFilmStocks(stocksResponse.data);
+            setSummary(summaryResponse.data);
         } catch (error) {
             console.error('Failed to fetch film stocks:', error);
         } finally {
@@ -90,6 +95,33 @@ export default function FilmStocks() {
                 <Button onClick={handleNewClick}>New Film Stock</Button>
             </div>
 
+            {summary && summary.total_stocks > 0 && (
+                <div className="glass-panel--soft px-8 py-6 grid gap-6 text-xs uppercase tracking-[0.35em] text-gray-400 md:grid-cols-4">
+                    <div>
+                        <span>Rolls</span>
+                        <div className="mt-1 text-2xl normal-case tracking-normal text-white">{summary.total_quantity}</div>
+                    </div>
+                    <div>
+                        <span>By Format</span>
+                        <div className="mt-1 space-y-1 text-sm normal-case tracking-normal text-gray-100">
+                            {summary.by_format.map((total) => (
+                                <div key={total.format || 'none'}>
+                                    {total.format || 'N/A'} · {total.quantity}
+                                </div>
+                            ))}
+                        </div>
+                    </div>
+                    <div>
+                        <span>Expiring in {summary.expiring_within_days} days</span>
+                        <div className="mt-1 text-2xl normal-case tracking-normal text-amber-300">{summary.expiring_quantity}</div>
+                    </div>
+                    <div>
+                        <span>Expired</span>
+                        <div className="mt-1 text-2xl normal-case tracking-normal text-red-300">{summary.expired_quantity}</div>
+                    </div>
+                </div>
+            )}
+
             {filmStocks.length === 0 ? (
                 <div className="glass-panel--soft px-10 py-16 text-center text-gray-400 tracking-[0.3em] uppercase">
                     No film stocks yet · Add your first roll
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { galleriesAPI } from '../services/api';
+import { galleriesAPI, filmStocksAPI } from '../services/api';
 import Button from '../components/Button';
 import Modal from '../components/Modal';
 import Loading from '../components/Loading';
@@ -9,13 +9,22 @@ export default function Galleries() {
     const [galleries, setGalleries] = useState([]);
     const [loading, setLoading] = useState(true);
     const [showModal, setShowModal] = useState(false);
-    const [formData, setFormData] = useState({ name: '', description: '' });
+    const [formData, setFormData] = useState({ name: '', description: '', film_stock_id: '' });
+    const [filmStocks, setFilmStocks] = useState([]);
     const navigate = useNavigate();
 
     useEffect(() => {
         fetchGalleries();
     }, []);
 
+    // Stocks to take the roll from, loaded when the form opens so quantities are current
+    useEffect(() => {
+        if (!showModal) return;
+        filmStocksAPI.getAll()
+            .then((response) => setFilmStocks(response.data))
+            .catch((error) => console.error('Failed to fetch film stocks:', error));
+    }, [showModal]);
+
     const fetchGalleries = async () => {
         try {
             const response = await galleriesAPI.getAll();
@@ -30,13 +39,16 @@ export default function Galleries() {
     const handleSubmit = async (e) => {
         e.preventDefault();
         try {
-            const response = await galleriesAPI.create(formData);
+            const response = await galleriesAPI.create({
+                ...formData,
+                film_stock_id: formData.film_stock_id ? Number(formData.film_stock_id) : null,
+            });
             setShowModal(false);
-            setFormData({ name: '', description: '' });
+            setFormData({ name: '', description: '', film_stock_id: '' });
             navigate(`/galleries/${response.data.id}`);
         } catch (error) {
             console.error('Failed to create gallery:', error);
-            alert('Failed to create gallery');
+            alert(error.response?.status === 409 ? 'That film stock is out of rolls' : 'Failed to create gallery');
         }
     };
 
@@ -117,6 +129,23 @@ export default function Galleries() {
                             className="w-full bg-white/5 px-5 py-3 text-sm text-white placeholder:text-gray-500 border border-white/10 focus:outline-none focus:border-white/40 focus:ring-0"
                         />
                     </div>
+                    <div>
+                        <label className="block text-xs uppercase tracking-[0.35em] text-gray-400 mb-3">
+                            Film Stock
+                        </label>
+                        <select
+                            value={formData.film_stock_id}
+                            onChange={(e) => setFormData({ ...formData, film_stock_id: e.target.value })}
+                            className="w-full bg-white/5 px-5 py-3 text-sm text-white border border-white/10 focus:outline-none focus:border-white/40 focus:ring-0"
+                        >
+                            <option value="">None</option>
+                            {filmStocks.map((stock) => (
+                                <option key={stock.id} value={stock.id} disabled={stock.quantity <= 0}>
+                                    {stock.model}{stock.format ? ` · ${stock.format}` : ''} ({stock.quantity} left)
+                                </option>
+                            ))}
+                        </select>
+                    </div>
                     <div className="flex flex-wrap gap-3 justify-end">
                         <Button variant="secondary" onClick={() => setShowModal(false)}>
                             Cancel
@@ -1,11 +1,15 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useDropzone } from 'react-dropzone';
-import { galleriesAPI } from '../services/api';
+import { galleriesAPI, backendUrl } from '../services/api';
 import Button from '../components/Button';
 import Modal from '../components/Modal';
 import Loading from '../components/Loading';
 import ImageViewer from '../components/ImageViewer';
+import ContactSheet from '../components/ContactSheet';
+
+// Files above this size use the chunked, resumable upload path
+const RESUMABLE_THRESHOLD = 8 * 1024 * 1024;
 
 export default function GalleryDetail() {
     const { id } = useParams();
@@ -16,6 +20,7 @@ export default function GalleryDetail() {
     const [uploading, setUploading] = useState(false);
     const [uploadProgress, setUploadProgress] = useState({ current: 0, total: 0 });
     const [viewingImage, setViewingImage] = useState(null);
+    const [showContactSheet, setShowContactSheet] = useState(false);
     const [showEditModal, setShowEditModal] = useState(false);
     const [showUploadModal, setShowUploadModal] = useState(false);
     const [editFormData, setEditFormData] = useState({ name: '', description: '' });
@@ -45,13 +50,28 @@ export default function GalleryDetail() {
         }
     };
 
+    // The server answers 429 while it is busy decoding other large scans
+    const withBusyRetry = async (upload, attempts = 4) => {
+        for (let attempt = 1; ; attempt++) {
+            try {
+                return await upload();
+            } catch (error) {
+                if (error.response?.status !== 429 || attempt >= attempts) throw error;
+                const retryAfter = Number(error.response.headers['retry-after']) || 5;
+                await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+            }
+        }
+    };
+
     const onDrop = async (acceptedFiles) => {
         setUploading(true);
         setUploadProgress({ current: 0, total: acceptedFiles.length });
 
         for (let i = 0; i < acceptedFiles.length; i++) {
             try {
-                await galleriesAPI.uploadPhoto(id, acceptedFiles[i]);
+                await withBusyRetry(() => (acceptedFiles[i].size > RESUMABLE_THRESHOLD
+                    ? galleriesAPI.uploadPhotoResumable(id, acceptedFiles[i])
+                    : galleriesAPI.uploadPhoto(id, acceptedFiles[i])));
                 setUploadProgress({ current: i + 1, total: acceptedFiles.length });
             } catch (error) {
                 console.error(`Failed to upload ${acceptedFiles[i].name}:`, error);
@@ -80,6 +100,30 @@ export default function GalleryDetail() {
         return url;
     };
 
+    // Renditions come sorted by width, smallest first
+    const renditionsIn = (photo, format) =>
+        (photo.renditions || []).filter((rendition) => rendition.format === format);
+
+    const buildSrcSet = (photo, format) =>
+        renditionsIn(photo, format)
+            .map((rendition) => `${normalizeImageUrl(rendition.url)} ${rendition.width}w`)
+            .join(', ');
+
+    const largestRendition = (photo) => {
+        const renditions = renditionsIn(photo, 'jpeg');
+        return renditions.length ? renditions[renditions.length - 1] : null;
+    };
+
+    const openPhoto = (photoId) => {
+        const photo = photos.find((candidate) => candidate.id === photoId);
+        if (!photo) return;
+        setViewingImage({
+            src: normalizeImageUrl(largestRendition(photo)?.url || photo.original_url),
+            fallback: normalizeImageUrl(photo.thumbnail_url || photo.original_url),
+            tilesPhotoId: photo.tile_manifest_url ? photo.id : null,
+        });
+    };
+
     const handleDelete = async () => {
         if (!confirm('Delete this gallery and all photos?')) return;
 
@@ -179,6 +223,14 @@ export default function GalleryDetail() {
                         <Button onClick={() => setShowUploadModal(true)}>
                             Add Photos
                         </Button>
+                        {gallery.contact_sheet_url && (
+                            <Button variant="secondary" onClick={() => setShowContactSheet(!showContactSheet)}>
+                                {showContactSheet ? 'Grid' : 'Contact Sheet'}
+                            </Button>
+                        )}
+                        <Button variant="secondary" onClick={() => { window.location.href = galleriesAPI.exportUrl(id); }}>
+                            Download
+                        </Button>
                         <Button variant="secondary" onClick={handleEdit}>
                             Edit
                         </Button>
@@ -193,23 +245,55 @@ export default function GalleryDetail() {
                 <div className="glass-panel--soft px-10 py-16 text-center text-gray-400 tracking-[0.3em] uppercase">
                     No photos yet · Use Add Photos to begin the story
                 </div>
+            ) : showContactSheet && gallery.contact_sheet_url ? (
+                <ContactSheet
+                    url={normalizeImageUrl(gallery.contact_sheet_url)}
+                    map={gallery.contact_sheet_map}
+                    onSelect={openPhoto}
+                />
             ) : (
                 <div className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6 fade-in-up">
                     {photos.map((photo, index) => {
                         const previewUrl = normalizeImageUrl(photo.thumbnail_url || photo.original_url);
-                        const fullUrl = normalizeImageUrl(photo.original_url || photo.thumbnail_url);
-                        const isCover = normalizedCoverImageUrl && (normalizedCoverImageUrl === fullUrl || normalizedCoverImageUrl === previewUrl);
+                        const originalUrl = normalizeImageUrl(photo.original_url || photo.thumbnail_url);
+                        const fullUrl = normalizeImageUrl(largestRendition(photo)?.url) || originalUrl;
+                        // A server-cropped square fits the cell exactly; otherwise pick a rendition
+                        const squareUrl = backendUrl(photo.square_url);
+                        const srcSet = squareUrl ? '' : buildSrcSet(photo, 'jpeg');
+                        const modernSources = squareUrl ? [] : ['avif', 'webp']
+                            .map((format) => ({ type: `image/${format}`, srcSet: buildSrcSet(photo, format) }))
+                            .filter((source) => source.srcSet);
+                        const gridSizes = '(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 50vw';
+                        // Shown from the JSON payload alone while the thumbnail loads
+                        const placeholderStyle = {
+                            backgroundColor: photo.dominant_color || undefined,
+                            backgroundImage: photo.placeholder ? `url(${photo.placeholder})` : undefined,
+                            backgroundSize: 'cover',
+                            backgroundPosition: 'center',
+                        };
+                        const isCover = normalizedCoverImageUrl && (normalizedCoverImageUrl === originalUrl || normalizedCoverImageUrl === previewUrl);
                         return (
                             <div
                                 key={photo.id}
+                                style={placeholderStyle}
                                 className={`group relative aspect-square overflow-hidden border border-white/10 bg-white/5 backdrop-blur-xl shadow-lg shadow-black/30 transition-all duration-700 hover:-translate-y-2 hover:shadow-[0_35px_65px_rgba(0,0,0,0.55)] fade-in-up ${isCover ? 'outline outline-2 outline-white/70' : ''} ${index % 4 === 1 ? 'fade-in-delay' : index % 4 === 2 ? 'fade-in-delay-lg' : ''}`}
                             >
-                                <img
-                                    src={previewUrl}
-                                    alt=""
-                                    className="absolute inset-0 h-full w-full object-cover transition-transform duration-700 ease-out group-hover:scale-110"
-                                    onClick={() => setViewingImage({ src: fullUrl, fallback: previewUrl })}
-                                />
+                                <picture>
+                                    {modernSources.map((source) => (
+                                        <source key={source.type} type={source.type} srcSet={source.srcSet} sizes={gridSizes} />
+                                    ))}
+                                    <img
+                                        src={squareUrl || previewUrl}
+                                        srcSet={srcSet || undefined}
+                                        sizes={srcSet ? gridSizes : undefined}
+                                        width={photo.width || undefined}
+                                        height={photo.height || undefined}
+                                        loading="lazy"
+                                        alt=""
+                                        className="absolute inset-0 h-full w-full object-cover transition-transform duration-700 ease-out group-hover:scale-110"
+                                        onClick={() => setViewingImage({ src: fullUrl, fallback: previewUrl, tilesPhotoId: photo.tile_manifest_url ? photo.id : null })}
+                                    />
+                                </picture>
                                 <div className="absolute inset-0 bg-gradient-to-t from-black/70 via-black/20 to-black/60 opacity-0 group-hover:opacity-100 transition-opacity duration-500" />
                                 {isCover && (
                                     <div className="absolute top-3 left-3 bg-white/15 px-4 py-1 text-[10px] uppercase tracking-[0.35em] text-white backdrop-blur">
@@ -219,7 +303,7 @@ export default function GalleryDetail() {
                                 <div className="absolute inset-0 flex flex-col items-center justify-center gap-3 px-4 text-center">
                                     <div className="flex flex-wrap gap-2 justify-center">
                                         <button
-                                            onClick={() => setViewingImage({ src: fullUrl, fallback: previewUrl })}
+                                            onClick={() => setViewingImage({ src: fullUrl, fallback: previewUrl, tilesPhotoId: photo.tile_manifest_url ? photo.id : null })}
                                             className="opacity-0 group-hover:opacity-100 border border-white/40 bg-white/5 px-4 py-2 text-[10px] uppercase tracking-[0.35em] text-white transition-all hover:bg-white hover:text-black"
                                         >
                                             View
@@ -0,0 +1,111 @@
+import { useState, useEffect } from 'react';
+import { useNavigate, useSearchParams } from 'react-router-dom';
+import { searchAPI } from '../services/api';
+import Button from '../components/Button';
+
+const PAGE_SIZE = 20;
+
+const TYPE_LABELS = {
+    gallery: 'Gallery',
+    trip: 'Trip',
+    trip_image: 'Trip Image',
+    film_stock: 'Film Stock',
+};
+
+const resultPath = (result) => {
+    switch (result.type) {
+        case 'gallery':
+            return `/galleries/${result.id}`;
+        case 'trip':
+            return `/trips/${result.id}`;
+        case 'trip_image':
+            return `/trips/${result.parent_id}`;
+        default:
+            return '/film-stocks';
+    }
+};
+
+export default function Search() {
+    const [searchParams, setSearchParams] = useSearchParams();
+    const [query, setQuery] = useState(searchParams.get('q') || '');
+    const [results, setResults] = useState([]);
+    const [total, setTotal] = useState(0);
+    const [loading, setLoading] = useState(false);
+    const navigate = useNavigate();
+
+    // Debounced so typing does not fire a request per keystroke
+    useEffect(() => {
+        const q = query.trim();
+        setSearchParams(q ? { q } : {}, { replace: true });
+        if (!q) {
+            setResults([]);
+            setTotal(0);
+            return;
+        }
+        const timer = setTimeout(() => fetchResults(q, 0), 250);
+        return () => clearTimeout(timer);
+    }, [query]);
+
+    const fetchResults = async (q, offset) => {
+        setLoading(true);
+        try {
+            const response = await searchAPI.search(q, { limit: PAGE_SIZE, offset });
+            setResults((previous) => (offset ? [...previous, ...response.data.results] : response.data.results));
+            setTotal(response.data.total);
+        } catch (error) {
+            console.error('Search failed:', error);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    return (
+        <div className="space-y-10 fade-in">
+            <div className="gradient-panel px-8 py-7 space-y-5">
+                <h2 className="text-2xl font-semibold tracking-[0.35em] uppercase text-gray-100">Search</h2>
+                <input
+                    type="search"
+                    value={query}
+                    onChange={(e) => setQuery(e.target.value)}
+                    placeholder="Galleries, trips, captions, film stocks"
+                    autoFocus
+                    className="w-full bg-white/5 border border-white/20 px-4 py-3 text-sm text-gray-100 placeholder-gray-500 focus:outline-none focus:border-white/50"
+                />
+                {query.trim() && !loading && (
+                    <p className="text-xs uppercase tracking-[0.35em] text-gray-400">{total} results</p>
+                )}
+            </div>
+
+            <div className="space-y-3 fade-in-up">
+                {results.map((result) => (
+                    <div
+                        key={`${result.type}-${result.id}`}
+                        onClick={() => navigate(resultPath(result))}
+                        className="glass-panel--soft flex items-center gap-5 px-6 py-4 cursor-pointer transition-colors hover:bg-white/10"
+                    >
+                        {result.image_url && (
+                            <img src={result.image_url} alt="" loading="lazy" className="h-14 w-14 object-cover" />
+                        )}
+                        <div className="min-w-0 flex-1">
+                            <div className="text-[10px] uppercase tracking-[0.35em] text-gray-500">
+                                {TYPE_LABELS[result.type]}
+                            </div>
+                            <div className="truncate text-sm text-white">{result.title || 'Untitled'}</div>
+                            {result.subtitle && (
+                                <div className="truncate text-xs text-gray-400">{result.subtitle}</div>
+                            )}
+                        </div>
+                    </div>
+                ))}
+            </div>
+
+            {results.length < total && (
+                <div className="text-center">
+                    <Button variant="secondary" disabled={loading} onClick={() => fetchResults(query.trim(), results.length)}>
+                        {loading ? 'Loading' : 'More'}
+                    </Button>
+                </div>
+            )}
+        </div>
+    );
+}
@@ -195,13 +195,23 @@ export default function TripDetail() {
                         {trip.images.map((image, index) => {
                             const previewUrl = normalizeImageUrl(image.thumbnail_url || image.image_url);
                             const fullUrl = normalizeImageUrl(image.image_url || image.thumbnail_url);
+                            const placeholderStyle = {
+                                backgroundColor: image.dominant_color || undefined,
+                                backgroundImage: image.placeholder ? `url(${image.placeholder})` : undefined,
+                                backgroundSize: 'cover',
+                                backgroundPosition: 'center',
+                            };
                             return (
                             <div
                                 key={image.id}
+                                style={placeholderStyle}
                                 className={`group relative overflow-hidden border border-white/10 bg-white/5 backdrop-blur-xl shadow-lg shadow-black/30 transition-all duration-700 hover:-translate-y-2 hover:shadow-[0_35px_65px_rgba(0,0,0,0.55)] fade-in-up ${index % 4 === 1 ? 'fade-in-delay' : index % 4 === 2 ? 'fade-in-delay-lg' : ''}`}
                             >
                                 <img
                                     src={previewUrl}
+                                    width={image.width || undefined}
+                                    height={image.height || undefined}
+                                    loading="lazy"
                                     alt={image.caption || ''}
                                     className="h-full w-full object-cover transition-transform duration-700 ease-out group-hover:scale-110"
                                     onClick={() => setViewingImage({ src: fullUrl, fallback: previewUrl })}
@@ -7,6 +7,7 @@ import Loading from '../components/Loading';
 
 export default function Trips() {
     const [trips, setTrips] = useState([]);
+    const [weather, setWeather] = useState({});
     const [loading, setLoading] = useState(true);
     const [showModal, setShowModal] = useState(false);
     const [formData, setFormData] = useState({
@@ -31,6 +32,10 @@ export default function Trips() {
         } finally {
             setLoading(false);
         }
+        // Forecasts are extra: the list renders without waiting for them
+        tripsAPI.getUpcomingWeather()
+            .then((response) => setWeather(response.data))
+            .catch((error) => console.error('Failed to fetch weather:', error));
     };
 
     const handleSubmit = async (e) => {
@@ -91,6 +96,16 @@ export default function Trips() {
                                                 </div>
                                             </div>
                                         )}
+                                        {weather[trip.id]?.weather && (
+                                            <div className="uppercase tracking-[0.25em] text-gray-400">
+                                                Forecast
+                                                <div className="mt-1 text-sm normal-case tracking-normal text-gray-100">
+                                                    {weather[trip.id].weather.description} ·{' '}
+                                                    {Math.round(weather[trip.id].weather.temperature_min)}° / {Math.round(weather[trip.id].weather.temperature_max)}°
+                                                    {weather[trip.id].sun_times && ` · Golden hour ${weather[trip.id].sun_times.golden_hour_evening.start}`}
+                                                </div>
+                                            </div>
+                                        )}
                                         {trip.description && (
                                             <div className="text-sm text-gray-300/90 leading-relaxed line-clamp-2">
                                                 {trip.description}
@@ -9,6 +9,9 @@ const api = axios.create({
     },
 });
 
+// Server-relative paths in payloads (e.g. signed /img/... URLs) resolve against the API host
+export const backendUrl = (path) => (path ? new URL(path, API_BASE_URL).toString() : path);
+
 // Galleries API
 export const galleriesAPI = {
     getAll: () => api.get('/galleries/'),
@@ -18,7 +21,8 @@ export const galleriesAPI = {
     delete: (id) => api.delete(`/galleries/${id}/`),
 
     // Photos
-    getPhotos: (galleryId) => api.get(`/galleries/${galleryId}/photos/`),
+    // params: { sort: 'display_order' | 'taken_at' | 'camera', camera }
+    getPhotos: (galleryId, params = {}) => api.get(`/galleries/${galleryId}/photos/`, { params }),
     uploadPhoto: (galleryId, file) => {
         const formData = new FormData();
         formData.append('file', file);
@@ -26,13 +30,92 @@ export const galleriesAPI = {
             headers: { 'Content-Type': 'multipart/form-data' },
         });
     },
+    // Large scans go up in chunks so a dropped connection resumes instead of restarting.
+    // No trailing slashes here: a redirect would resend the chunk body.
+    uploadPhotoResumable: async (galleryId, file, onProgress) => {
+        const CHUNK_SIZE = 5 * 1024 * 1024;
+        const MAX_RETRIES = 5;
+        const base = `/galleries/${galleryId}/uploads`;
+        const { data: session } = await api.post(base, { filename: file.name, size: file.size });
+        const sessionUrl = `${base}/${session.id}`;
+
+        let offset = session.offset;
+        let retries = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + CHUNK_SIZE);
+            try {
+                const response = await api.patch(sessionUrl, chunk, {
+                    headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': offset },
+                });
+                offset = Number(response.headers['upload-offset']);
+                retries = 0;
+                if (onProgress) onProgress(offset / file.size);
+            } catch (error) {
+                if (++retries > MAX_RETRIES) throw error;
+                await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** retries));
+                // Ask the server how much arrived before resuming
+                const response = await api.head(sessionUrl);
+                offset = Number(response.headers['upload-offset']);
+            }
+        }
+        return api.post(`${sessionUrl}/complete`);
+    },
+    // Import progress is streamed as NDJSON: onEntry gets each entry as it finishes,
+    // and the promise resolves with the final { imported, failed, skipped } summary.
+    importArchive: async (galleryId, file, onEntry) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        const response = await fetch(`${API_BASE_URL}/galleries/${galleryId}/import`, {
+            method: 'POST',
+            body: formData,
+        });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.detail || `Import failed (${response.status})`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        let summary = null;
+        for (;;) {
+            const { done, value } = await reader.read();
+            buffered += decoder.decode(value, { stream: !done });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            for (const line of lines) {
+                if (!line) continue;
+                const message = JSON.parse(line);
+                if (message.done) summary = message;
+                else if (onEntry) onEntry(message);
+            }
+            if (done) return summary;
+        }
+    },
     deletePhoto: (galleryId, photoId) => api.delete(`/galleries/${galleryId}/photos/${photoId}/`),
     setCoverPhoto: (galleryId, photoId) => api.put(`/galleries/${galleryId}/cover/${photoId}/`),
+    reorderPhotos: (galleryId, photoIds) => api.put(`/galleries/${galleryId}/photos/order/`, { photo_ids: photoIds }),
+    rebuildContactSheet: (galleryId) => api.post(`/galleries/${galleryId}/contact-sheet/`),
+    exportUrl: (galleryId, size) =>
+        `${API_BASE_URL}/galleries/${galleryId}/export.zip${size ? `?size=${size}` : ''}`,
+    getDuplicates: (galleryId, maxDistance) =>
+        api.get(`/galleries/${galleryId}/duplicates/`, { params: maxDistance != null ? { max_distance: maxDistance } : {} }),
+};
+
+// Photos API
+export const photosAPI = {
+    getSimilar: (photoId, params = {}) => api.get(`/photos/${photoId}/similar/`, { params }),
+    getTiles: (photoId) => api.get(`/photos/${photoId}/tiles/`),
 };
 
 // Film Stocks API
 export const filmStocksAPI = {
     getAll: () => api.get('/film-stocks/'),
+    getSummary: (expiringWithinDays = 30) =>
+        api.get('/film-stocks/summary/', { params: { expiring_within_days: expiringWithinDays } }),
+    getUsage: () => api.get('/film-stocks/usage/'),
+    getMonthlyUsage: (params = {}) => api.get('/film-stocks/usage/monthly/', { params }),
+    getLedger: (id, params = {}) => api.get(`/film-stocks/${id}/ledger/`, { params }),
     getOne: (id) => api.get(`/film-stocks/${id}/`),
     create: (data) => api.post('/film-stocks/', data),
     update: (id, data) => api.put(`/film-stocks/${id}/`, data),
@@ -63,6 +146,13 @@ export const tripsAPI = {
         const params = date ? { date } : {};
         return api.get(`/trips/${tripId}/weather/`, { params });
     },
+    // Map of trip id -> weather for every upcoming trip, in one request
+    getUpcomingWeather: () => api.get('/trips/weather/', { params: { upcoming: true } }),
+};
+
+// Search API
+export const searchAPI = {
+    search: (q, params = {}) => api.get('/search/', { params: { q, ...params } }),
 };
 
 export default api;